@@ -1,8 +1,18 @@
 /*
  * Arduino Servo Controller for Laser Tracker
- * Receives commands from Raspberry Pi via Serial
- * Format: T<tilt>P<pan>\n
- * Example: T90P120\n (Tilt=90°, Pan=120°)
+ * Receives commands from Raspberry Pi / laptop via Serial (115200 baud)
+ *
+ * Binary command (tracking/servo_link.py):
+ *   A5 5A <seq> <tilt> <pan> <checksum>     checksum = (seq + tilt + pan) & 0xFF
+ *   Reply: A5 5B <seq> <tilt> <pan> <checksum>
+ *
+ * Text command (serial monitor / debugging):
+ *   T<tilt>P<pan>\n   e.g. T90P120\n (Tilt=90°, Pan=120°)
+ *   Reply: OK: T90 P120
+ *
+ * Nothing in loop() blocks: bytes are parsed as they arrive and servos step
+ * toward the latest target every STEP_MS, so a new command interrupts the
+ * current move instead of queueing behind it.
  */
 
 #include <Servo.h>
@@ -22,110 +32,142 @@ const int TILT_MAX = 180;
 const int PAN_MIN = 0;
 const int PAN_MAX = 180;
 
-// Current positions
+// Serial protocol
+const long BAUD_RATE = 115200;
+const byte SYNC = 0xA5;
+const byte CMD = 0x5A;
+const byte ACK = 0x5B;
+
+// Smooth movement: STEPS increments, STEP_MS apart (same 10 x 5 ms as before)
+const int STEPS = 10;
+const unsigned long STEP_MS = 5;
+
+// Current positions and the move in progress
 int currentTilt = 90;
 int currentPan = 90;
+int startTilt = 90, startPan = 90;
+int targetTilt = 90, targetPan = 90;
+int stepIndex = STEPS;
+unsigned long lastStep = 0;
+
+// Binary parser state: 0 = want SYNC, 1 = want CMD, 2.. = payload
+byte binState = 0;
+byte binBuf[4];
 
-// Serial communication
-String inputString = "";
-boolean stringComplete = false;
+// Text command buffer
+char textBuf[16];
+byte textLen = 0;
 
 void setup() {
   // Initialize serial communication
-  Serial.begin(9600);
-  
+  Serial.begin(BAUD_RATE);
+
   // Attach servos
   tiltServo.attach(TILT_PIN);
   panServo.attach(PAN_PIN);
-  
+
   // Initialize laser pin (optional)
   pinMode(LASER_PIN, OUTPUT);
   digitalWrite(LASER_PIN, HIGH); // Turn on laser
-  
+
   // Center servos
   tiltServo.write(90);
   panServo.write(90);
-  
-  // Reserve space for input string
-  inputString.reserve(50);
-  
+
   Serial.println("Arduino Servo Controller Ready");
-  Serial.println("Format: T<tilt>P<pan>");
-  Serial.println("Example: T90P120");
+  Serial.println("Format: T<tilt>P<pan> or binary A5 5A seq tilt pan sum");
 }
 
 void loop() {
-  // Check for serial commands
-  if (stringComplete) {
-    processCommand(inputString);
-    inputString = "";
-    stringComplete = false;
-  }
+  readSerial();
+  stepServos();
 }
 
-// Serial event handler (called automatically when data is received)
-void serialEvent() {
+// Consume whatever bytes are available without waiting for more
+void readSerial() {
   while (Serial.available()) {
-    char inChar = (char)Serial.read();
-    
-    if (inChar == '\n') {
-      stringComplete = true;
+    byte b = Serial.read();
+
+    if (binState == 0) {
+      if (b == SYNC) {
+        binState = 1;
+      } else {
+        readText(b);
+      }
+    } else if (binState == 1) {
+      // A repeated SYNC may be the real start of a frame after a stray one
+      binState = (b == CMD) ? 2 : (b == SYNC ? 1 : 0);
     } else {
-      inputString += inChar;
+      binBuf[binState - 2] = b;
+      binState++;
+      if (binState == 6) {
+        binState = 0;
+        processBinary(binBuf[0], binBuf[1], binBuf[2], binBuf[3]);
+      }
     }
   }
 }
 
-// Process incoming command
-void processCommand(String cmd) {
-  // Parse command: T<tilt>P<pan>
-  int tiltIndex = cmd.indexOf('T');
-  int panIndex = cmd.indexOf('P');
-  
-  if (tiltIndex >= 0 && panIndex > tiltIndex) {
-    // Extract tilt value
-    String tiltStr = cmd.substring(tiltIndex + 1, panIndex);
-    int tiltValue = tiltStr.toInt();
-    
-    // Extract pan value
-    String panStr = cmd.substring(panIndex + 1);
-    int panValue = panStr.toInt();
-    
-    // Constrain values to safe range
-    tiltValue = constrain(tiltValue, TILT_MIN, TILT_MAX);
-    panValue = constrain(panValue, PAN_MIN, PAN_MAX);
-    
-    // Move servos
-    moveServos(tiltValue, panValue);
-    
+void processBinary(byte seq, byte tilt, byte pan, byte sum) {
+  if ((byte)(seq + tilt + pan) != sum) {
+    return; // Corrupt frame: drop it, the host will send a newer target
+  }
+  setTarget(tilt, pan);
+
+  byte ack[6] = {SYNC, ACK, seq, (byte)targetTilt, (byte)targetPan,
+                 (byte)(seq + targetTilt + targetPan)};
+  Serial.write(ack, 6);
+}
+
+void readText(byte c) {
+  if (c == '\n') {
+    textBuf[textLen] = '\0';
+    processCommand(textBuf);
+    textLen = 0;
+  } else if (c != '\r' && textLen < sizeof(textBuf) - 1) {
+    textBuf[textLen++] = c;
+  }
+}
+
+// Process a text command: T<tilt>P<pan>
+void processCommand(const char* cmd) {
+  const char* t = strchr(cmd, 'T');
+  const char* p = strchr(cmd, 'P');
+
+  if (t && p && p > t) {
+    setTarget(atoi(t + 1), atoi(p + 1));
+
     // Send acknowledgment
     Serial.print("OK: T");
-    Serial.print(tiltValue);
+    Serial.print(targetTilt);
     Serial.print(" P");
-    Serial.println(panValue);
+    Serial.println(targetPan);
   } else {
     Serial.println("ERROR: Invalid command format");
   }
 }
 
-// Move servos to specified positions
-void moveServos(int tilt, int pan) {
-  // Smooth movement (optional - prevents jerky motion)
-  int steps = 10;
-  
-  for (int i = 1; i <= steps; i++) {
-    int intermediateTilt = currentTilt + ((tilt - currentTilt) * i) / steps;
-    int intermediatePan = currentPan + ((pan - currentPan) * i) / steps;
-    
-    tiltServo.write(intermediateTilt);
-    panServo.write(intermediatePan);
-    
-    delay(5); // Small delay for smooth motion
+// Start a smooth move from wherever the servos are now
+void setTarget(int tilt, int pan) {
+  targetTilt = constrain(tilt, TILT_MIN, TILT_MAX);
+  targetPan = constrain(pan, PAN_MIN, PAN_MAX);
+  startTilt = currentTilt;
+  startPan = currentPan;
+  stepIndex = 0;
+}
+
+// Advance the current move by at most one step
+void stepServos() {
+  if (stepIndex >= STEPS || millis() - lastStep < STEP_MS) {
+    return;
   }
-  
-  // Update current positions
-  currentTilt = tilt;
-  currentPan = pan;
+  lastStep = millis();
+  stepIndex++;
+
+  currentTilt = startTilt + ((targetTilt - startTilt) * stepIndex) / STEPS;
+  currentPan = startPan + ((targetPan - startPan) * stepIndex) / STEPS;
+  tiltServo.write(currentTilt);
+  panServo.write(currentPan);
 }
 
 // Optional: Function to toggle laser
@@ -135,6 +177,6 @@ void toggleLaser() {
 
 // Optional: Function to center servos
 void centerServos() {
-  moveServos(90, 90);
+  setTarget(90, 90);
   Serial.println("Servos centered");
-}
\ No newline at end of file
+}
@@ -0,0 +1,105 @@
+"""
+Microbenchmark: legacy MJPEG parser vs MJPEGStreamReader
+
+Record a stream from the Pi first (10 s is plenty):
+    curl -s --max-time 10 http://172.20.10.3:8000/stream.mjpg -o stream.mjpg
+    python3 object_tracker/bench_mjpeg.py stream.mjpg
+
+Without a recording, a synthetic 640x480 multipart stream is generated.
+"""
+
+import argparse
+import io
+import time
+
+import cv2
+import numpy as np
+
+from mjpeg_reader import MJPEGStreamReader
+
+
+def synthetic_stream(frames=300, width=640, height=480, quality=85):
+    """Build an in-memory multipart MJPEG stream like Picamera2's server sends"""
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    base = cv2.GaussianBlur(base, (0, 0), 3)  # Camera-like, compressible texture
+    out = io.BytesIO()
+    for i in range(frames):
+        img = np.roll(base, i * 4, axis=1)
+        cv2.circle(img, (i * 5 % width, height // 2), 40, (0, 0, 255), -1)
+        ok, jpg = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        out.write(b'--FRAME\r\nContent-Type: image/jpeg\r\n'
+                  b'Content-Length: %d\r\n\r\n' % len(jpg))
+        out.write(jpg.tobytes())
+        out.write(b'\r\n')
+    return out.getvalue()
+
+
+def legacy_jpegs(stream):
+    """The original object_tracker.py parser, minus the decode"""
+    bytes_data = b''
+    while True:
+        chunk = stream.read(1024)
+        if not chunk:
+            return
+        bytes_data += chunk
+        while True:
+            a = bytes_data.find(b'\xff\xd8')
+            b = bytes_data.find(b'\xff\xd9')
+            if a != -1 and b != -1:
+                jpg = bytes_data[a:b+2]
+                bytes_data = bytes_data[b+2:]
+                yield jpg
+            else:
+                break
+
+
+def reader_jpegs(stream, chunk_size):
+    reader = MJPEGStreamReader(stream, chunk_size=chunk_size)
+    while True:
+        jpg = reader.read_jpeg()
+        if jpg is None:
+            return
+        yield jpg
+
+
+def run(name, frames_iter, decode):
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    count = 0
+    for jpg in frames_iter:
+        if decode:
+            cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_COLOR)
+        count += 1
+    wall = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    print(f"{name:<28} {count:6d} frames  {wall * 1000:8.1f} ms  "
+          f"{count / wall:9.1f} fps  {cpu / max(count, 1) * 1e6:8.1f} us cpu/frame")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('recording', nargs='?', help="Raw MJPEG stream captured from the camera")
+    parser.add_argument('--chunk', type=int, default=64 * 1024, help="Reader chunk size in bytes")
+    parser.add_argument('--decode', action='store_true', help="Include cv2.imdecode in the timing")
+    args = parser.parse_args()
+
+    if args.recording:
+        with open(args.recording, 'rb') as f:
+            data = f.read()
+        print(f"Recording: {args.recording} ({len(data) / 1e6:.1f} MB)")
+    else:
+        data = synthetic_stream()
+        print(f"Synthetic 640x480 stream ({len(data) / 1e6:.1f} MB)")
+
+    legacy = run("legacy (1 KB, rescan)", legacy_jpegs(io.BytesIO(data)), args.decode)
+    new = run(f"MJPEGStreamReader ({args.chunk // 1024} KB)",
+              reader_jpegs(io.BytesIO(data), args.chunk), args.decode)
+    if legacy != new:
+        print(f"WARNING: frame counts differ ({legacy} vs {new})")
+
+
+if __name__ == '__main__':
+    main()
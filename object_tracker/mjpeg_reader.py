@@ -0,0 +1,120 @@
+import cv2
+import numpy as np
+
+SOI = b'\xff\xd8'  # JPEG start-of-image marker
+EOI = b'\xff\xd9'  # JPEG end-of-image marker
+
+
+class MJPEGStreamReader:
+    """Incremental MJPEG frame extractor for an HTTP (or file) byte stream.
+
+    Bytes are read in large chunks into one preallocated buffer. The marker
+    search resumes where the previous scan stopped instead of rescanning from
+    offset 0, and complete JPEGs are returned as memoryviews into the buffer,
+    so nothing is copied between the socket and cv2.imdecode.
+    """
+
+    def __init__(self, stream, chunk_size=64 * 1024, buffer_size=1024 * 1024):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buf = bytearray(max(buffer_size, 2 * chunk_size))
+        self.view = memoryview(self.buf)
+        self.start = 0   # First unconsumed byte
+        self.end = 0     # One past the last valid byte
+        self.scan = 0    # Where the next marker search resumes
+        self.soi = -1    # Offset of the current frame's SOI, -1 if not found yet
+        self.bytes_read = 0
+        self.frames = 0
+
+        # Prefer reads that fill our buffer directly and return after a single
+        # socket read, so a large chunk size does not add a frame of latency
+        if hasattr(stream, 'readinto1'):
+            self._readinto = stream.readinto1
+        elif hasattr(stream, 'readinto'):
+            self._readinto = stream.readinto
+        else:
+            self._readinto = self._readinto_copy
+
+    def _readinto_copy(self, view):
+        data = self.stream.read(len(view))
+        view[:len(data)] = data
+        return len(data)
+
+    def _make_room(self):
+        """Ensure at least chunk_size free bytes after self.end"""
+        if len(self.buf) - self.end >= self.chunk_size:
+            return
+        pending = self.end - self.start
+        if pending + self.chunk_size > len(self.buf):
+            # Frame larger than the buffer: move to a bigger one. A fresh
+            # bytearray is needed because exported views block resizing.
+            new_buf = bytearray(max(2 * len(self.buf), pending + self.chunk_size))
+            new_buf[:pending] = self.view[self.start:self.end]
+            self.buf = new_buf
+            self.view = memoryview(new_buf)
+        else:
+            # Only the partial frame left after the last EOI is moved
+            self.buf[:pending] = self.view[self.start:self.end]
+        shift = self.start
+        self.start = 0
+        self.end = pending
+        self.scan -= shift
+        if self.soi >= 0:
+            self.soi -= shift
+
+    def _fill(self):
+        """Read one chunk from the stream. Returns False at end of stream."""
+        self._make_room()
+        n = self._readinto(self.view[self.end:self.end + self.chunk_size])
+        if not n:
+            return False
+        self.end += n
+        self.bytes_read += n
+        return True
+
+    def read_jpeg(self):
+        """Return a memoryview of the next complete JPEG, or None at end of stream.
+
+        The view points into the internal buffer and is only valid until the
+        next call to read_jpeg()/read_frame().
+        """
+        while True:
+            if self.soi < 0:
+                # Back up one byte in case a marker straddles two chunks
+                idx = self.buf.find(SOI, max(self.scan - 1, self.start), self.end)
+                if idx < 0:
+                    self.scan = self.end
+                    # Nothing before the last byte can start a frame
+                    self.start = max(self.start, self.end - 1)
+                else:
+                    self.soi = idx
+                    self.start = idx
+                    self.scan = idx + 2
+            if self.soi >= 0:
+                idx = self.buf.find(EOI, max(self.scan - 1, self.soi + 2), self.end)
+                if idx >= 0:
+                    jpg = self.view[self.soi:idx + 2]
+                    self.start = self.scan = idx + 2
+                    self.soi = -1
+                    self.frames += 1
+                    return jpg
+                self.scan = self.end
+            if not self._fill():
+                return None
+
+    def read_frame(self, flags=cv2.IMREAD_COLOR):
+        """Read and decode the next frame. Returns None at end of stream."""
+        while True:
+            jpg = self.read_jpeg()
+            if jpg is None:
+                return None
+            frame = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), flags)
+            if frame is not None:
+                return frame
+
+    def __iter__(self):
+        while True:
+            frame = self.read_frame()
+            if frame is None:
+                return
+            yield frame
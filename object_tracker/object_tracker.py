@@ -1,19 +1,30 @@
 import cv2
 import numpy as np
+import os
 import urllib.request
-import serial
+import sys
+import threading
 import time
-
-url = 'http://172.20.10.3:8000/stream.mjpg'  # Picamera2 MJPEG server endpoint
-
-# ---- Arduino setup ----
-try:
-    arduino = serial.Serial('COM9', 9600, timeout=1)  # Edit port for Windows/Linux as needed
-    time.sleep(2)
-    print("✓ Connected to Arduino.")
-except:
-    print("ERROR: Could not connect to Arduino. Check COM port!")
-    arduino = None
+from mjpeg_reader import MJPEGStreamReader
+from pipeline import LatestFrameSlot, Stage, StageStats, format_stats
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tracking'))
+from servo_link import ServoChannel
+from trackers import default_tracker
+from scaled_tracker import make_tracker
+from session_log import SessionRecorder
+
+# Picamera2 MJPEG server endpoint (or tracking/synthetic_video.py serve, for testing)
+url = os.environ.get('DISRUPTOR_STREAM_URL', 'http://172.20.10.3:8000/stream.mjpg')
+PIPELINE_MODE = '--pipeline' in sys.argv  # Capture/decode, tracking and display on separate threads
+STATS_INTERVAL = 5.0  # Seconds between per-stage throughput reports in pipeline mode
+TRACKER_TYPE = default_tracker('CSRT')  # Override with DISRUPTOR_TRACKER=KCF etc.
+TRACK_MODE = 'full'  # 'scale' / 'roi': track a downscaled frame / a crop around the target
+TRACK_BUDGET = 1 / 30  # Seconds per tracker update that 'scale'/'roi' adapt toward
+RECORD_PATH = os.environ.get('DISRUPTOR_RECORD')  # Save the session here (tests/replay_session.py)
+
+arduino = None  # Connected when run as a script, so tests/replay_session.py can import track()
+recorder = None  # SessionRecorder when RECORD_PATH is set
+frame_number = 0  # Recorder's number for the last captured frame
 
 TILT_MIN, TILT_MAX = 0, 180
 PAN_MIN, PAN_MAX = 0, 180
@@ -28,14 +39,16 @@ def smooth_angle(current, target, factor):
     return int(current + (target - current) * factor)
 
 def send_servo_command(tilt, pan):
+    if recorder:
+        recorder.servo(tilt, pan, frame_number)
     if arduino:
-        command = f"T{tilt}P{pan}\n"
-        arduino.write(command.encode())
+        arduino.send(tilt, pan)  # Coalesced; written by the channel's own thread
 
-cv2.namedWindow('Camera')
 tracking = False
 tracker = None
 bbox = None
+pending_click = None  # Set by the mouse handler, applied by track() on the next frame
+click_lock = threading.Lock()  # Guards pending_click: with --pipeline, track() runs off the GUI thread
 
 kalman = cv2.KalmanFilter(4, 2)
 kalman.measurementMatrix = np.eye(2,4, dtype=np.float32)
@@ -47,39 +60,29 @@ kalman.processNoiseCov = np.eye(4, dtype=np.float32) * 0.10
 kalman.measurementNoiseCov = np.eye(2, dtype=np.float32) * 1.5
 
 def mouse_handler(event, x, y, flags, param):
-    global bbox, tracking, tracker
+    global pending_click
     if event == cv2.EVENT_LBUTTONDOWN:
+        with click_lock:
+            pending_click = (x, y)
+
+def track(frame):
+    """Tracker + Kalman + servo angles for one frame.
+    Returns (frame, result) where result is None or (x_show, y_show, w_box, h_box, pred_x, pred_y, tilt, pan)"""
+    global bbox, tracking, tracker, pending_click, prev_tilt, prev_pan
+    with click_lock:
+        click, pending_click = pending_click, None  # Taken whole: a click landing now waits for the next frame
+    if click is not None:
+        x, y = click
+        if recorder:
+            recorder.click(x, y, frame_number)  # Logged when applied: it inits on this frame
         w, h = 80, 80
         bbox = (x - w//2, y - h//2, w, h)
         tracking = True
-        tracker = cv2.legacy.TrackerCSRT.create()
-        if param is not None:
-            tracker.init(param, bbox)
+        tracker = make_tracker(TRACKER_TYPE, TRACK_MODE, TRACK_BUDGET, previous=tracker)
+        tracker.init(frame, bbox)
         kalman.statePre = np.array([[x], [y], [0], [0]], dtype=np.float32)
         kalman.statePost = np.array([[x], [y], [0], [0]], dtype=np.float32)
 
-cv2.setMouseCallback('Camera', mouse_handler)
-
-stream = urllib.request.urlopen(url)
-bytes_data = b''
-frame = None  # Global var for mouse_handler
-
-while True:
-    # --- MJPEG HTTP Stream Parsing ---
-    while True:
-        bytes_data += stream.read(1024)
-        a = bytes_data.find(b'\xff\xd8')
-        b = bytes_data.find(b'\xff\xd9')
-        if a != -1 and b != -1:
-            jpg = bytes_data[a:b+2]
-            bytes_data = bytes_data[b+2:]
-            frame = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_COLOR)
-            break
-    if frame is None: continue
-
-    # Let mouse handler access current frame for tracker init
-    cv2.setMouseCallback('Camera', mouse_handler, param=frame)
-
     h, w, c = frame.shape
     if tracking and bbox and tracker:
         ok, bbox = tracker.update(frame)
@@ -89,53 +92,120 @@ while True:
             measurement = np.array([[cx], [cy]], dtype=np.float32)
             kalman.correct(measurement)
             prediction = kalman.predict()
-            pred_x, pred_y = int(prediction[0]), int(prediction[1])
+            pred_x, pred_y = int(prediction[0, 0]), int(prediction[1, 0])
             x_show, y_show = pred_x - w_box//2, pred_y - h_box//2
-            cv2.rectangle(frame, (x_show, y_show), (x_show + w_box, y_show + h_box), (0, 255, 255), 2)
             # --- Servo logic ---
             target_pan = map_range(pred_x, 0, w, PAN_MIN, PAN_MAX)
             target_tilt = map_range(pred_y, 0, h, TILT_MAX, TILT_MIN)
             prev_pan = smooth_angle(prev_pan, target_pan, smooth_factor)
             prev_tilt = smooth_angle(prev_tilt, target_tilt, smooth_factor)
-            send_servo_command(prev_tilt, prev_pan)
-            cv2.putText(frame, f"Tilt: {prev_tilt} Pan: {prev_pan}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-            cv2.putText(frame, f"Tracking ({pred_x}, {pred_y})", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+            return frame, (x_show, y_show, w_box, h_box, pred_x, pred_y, prev_tilt, prev_pan)
         else:
             tracking = False
+    return frame, None
 
-    cv2.imshow('Camera', frame)
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-cv2.destroyAllWindows()
-if arduino:
-    arduino.close()
-print("\nProgram ended (Remote MJPEG tracking + Arduino)")
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+def output(frame, result):
+    """Servo write, overlays and display. Returns False when the user quits."""
+    if result is not None:
+        x_show, y_show, w_box, h_box, pred_x, pred_y, tilt, pan = result
+        send_servo_command(tilt, pan)
+        cv2.rectangle(frame, (x_show, y_show), (x_show + w_box, y_show + h_box), (0, 255, 255), 2)
+        cv2.putText(frame, f"Tilt: {tilt} Pan: {pan}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        cv2.putText(frame, f"Tracking ({pred_x}, {pred_y})", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
 
+    cv2.imshow('Camera', frame)
+    return not (cv2.waitKey(1) & 0xFF == ord('q'))
 
+def decode(jpg):
+    return cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_COLOR)
 
+def capture(reader):
+    """Next JPEG from the stream, saved byte-for-byte when recording"""
+    global frame_number
+    jpg = reader.read_jpeg()
+    if recorder and jpg is not None:
+        frame_number = recorder.jpeg(jpg)
+    return jpg
 
+def run_sequential(reader):
+    while True:
+        # --- MJPEG HTTP Stream Parsing ---
+        jpg = capture(reader)
+        if jpg is None:
+            print("Stream ended")
+            break
+        frame = decode(jpg)
+        if frame is None:
+            continue  # Corrupt frame; skipped like MJPEGStreamReader.read_frame does
+        if not output(*track(frame)):
+            break
 
+def run_pipeline(reader):
+    """Capture/decode -> track -> display/servo, linked by latest-frame-wins slots.
+    Stale frames are dropped at each handoff so tracking always sees the freshest frame.
+    A recording made in this mode holds every captured frame, so its replay is approximate."""
+    decoded = LatestFrameSlot()
+    tracked = LatestFrameSlot()
+    capture_stage = Stage('capture', lambda: capture(reader), decode, decoded)
+    track_stage = Stage('track', decoded, track, tracked)
+    output_stats = StageStats('output')
+    capture_stage.start()
+    track_stage.start()
+    print("✓ Pipeline mode: capture/decode, tracking and display on separate threads")
+
+    last_report = time.monotonic()
+    while True:
+        item = tracked.get(timeout=0.5)
+        if item is None:
+            if tracked.closed:
+                print("Stream ended")
+                break
+            cv2.waitKey(1)  # Keep the window responsive while waiting
+            continue
+        start = time.perf_counter()
+        keep_going = output(*item)
+        output_stats.record(time.perf_counter() - start)
+        if not keep_going:
+            break
 
+        if time.monotonic() - last_report >= STATS_INTERVAL:
+            print(format_stats([capture_stage.stats, track_stage.stats, output_stats],
+                               {'decode->track': decoded, 'track->output': tracked}))
+            if arduino:
+                print(f"Servo link: {arduino.stats()}")
+            last_report = time.monotonic()
+
+    capture_stage.stop()
+    track_stage.stop()
+
+if __name__ == '__main__':
+    # ---- Arduino setup ----
+    try:
+        arduino = ServoChannel('COM9')  # Edit port for Windows/Linux as needed
+        print("✓ Connected to Arduino.")
+    except:
+        print("ERROR: Could not connect to Arduino. Check COM port!")
+        arduino = None
+    if RECORD_PATH:
+        recorder = SessionRecorder(RECORD_PATH, meta={'source': 'object_tracker', 'tracker': TRACKER_TYPE,
+                                                      'mode': TRACK_MODE, 'pipeline': PIPELINE_MODE})
+        print(f"✓ Recording session to {RECORD_PATH}")
+
+    cv2.namedWindow('Camera')
+    cv2.setMouseCallback('Camera', mouse_handler)
+
+    stream = urllib.request.urlopen(url)
+    reader = MJPEGStreamReader(stream)
+
+    if PIPELINE_MODE:
+        run_pipeline(reader)
+    else:
+        run_sequential(reader)
+
+    cv2.destroyAllWindows()
+    if recorder:
+        recorder.close()
+    if arduino:
+        print(f"Servo link: {arduino.stats()}")  # Command->ACK round trip, drops
+        arduino.close()
+    print("\nProgram ended (Remote MJPEG tracking + Arduino)")
@@ -0,0 +1,120 @@
+import threading
+import time
+
+
+class LatestFrameSlot:
+    """Single-slot "latest frame wins" handoff between two pipeline stages.
+
+    put() never blocks: a new item overwrites one the consumer has not taken
+    yet, and the overwritten item is counted as dropped. get() waits for an
+    item newer than the one the consumer saw last.
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.item = None
+        self.seq = 0
+        self.taken_seq = 0
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, item):
+        with self.cond:
+            if self.seq > self.taken_seq:
+                self.dropped += 1
+            self.item = item
+            self.seq += 1
+            self.cond.notify_all()
+
+    def get(self, timeout=None):
+        """Return the newest item, or None on timeout/close"""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.seq > self.taken_seq or self.closed, timeout):
+                return None
+            if self.seq == self.taken_seq:
+                return None  # Closed with nothing new
+            self.taken_seq = self.seq
+            return self.item
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class StageStats:
+    """Frame counter for one pipeline stage, reported as frames/second"""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.busy = 0.0  # Seconds spent doing work (not waiting on input)
+        self.last_count = 0
+        self.last_busy = 0.0
+        self.last_time = time.monotonic()
+
+    def record(self, busy):
+        self.count += 1
+        self.busy += busy
+
+    def rate(self):
+        """Return (fps, busy fraction) since the previous call"""
+        now = time.monotonic()
+        dt = max(now - self.last_time, 1e-9)
+        fps = (self.count - self.last_count) / dt
+        load = (self.busy - self.last_busy) / dt
+        self.last_count, self.last_busy, self.last_time = self.count, self.busy, now
+        return fps, load
+
+
+class Stage(threading.Thread):
+    """Worker thread that pulls the latest item from `source`, applies `func`
+    and publishes the result to `sink`.
+
+    `source` is either a LatestFrameSlot or a zero-argument callable that
+    blocks for the next item (e.g. a stream reader). Returning None from the
+    callable ends the stage; returning None from `func` skips the item.
+    """
+
+    def __init__(self, name, source, func, sink):
+        super().__init__(name=name, daemon=True)
+        self.source = source
+        self.func = func
+        self.sink = sink
+        self.stats = StageStats(name)
+        self.running = True
+
+    def run(self):
+        try:
+            while self.running:
+                if isinstance(self.source, LatestFrameSlot):
+                    item = self.source.get(timeout=0.5)
+                    if item is None:
+                        if self.source.closed:
+                            break
+                        continue
+                else:
+                    item = self.source()
+                    if item is None:
+                        break
+                start = time.perf_counter()
+                result = self.func(item)
+                self.stats.record(time.perf_counter() - start)
+                if result is not None:
+                    self.sink.put(result)
+        finally:
+            self.sink.close()
+
+    def stop(self):
+        self.running = False
+
+
+def format_stats(stats, slots):
+    """One-line throughput report: fps and busy% per stage, drops per slot"""
+    parts = []
+    for stage_stats in stats:
+        fps, load = stage_stats.rate()
+        parts.append(f"{stage_stats.name}: {fps:5.1f} fps ({load * 100:3.0f}% busy)")
+    for name, slot in slots.items():
+        parts.append(f"{name} dropped: {slot.dropped}")
+    return " | ".join(parts)
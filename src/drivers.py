@@ -1,5 +1,11 @@
-import RPi.GPIO as GPIO
+from hal import GPIO
+import heapq
+import itertools
+import threading
 import time
+from collections import deque
+
+DEADLINE_MISS = 0.002  # Seconds late before a duty change counts as a missed deadline
 
 class EmitterDriver:
     def __init__(self, pin, freq=1000):
@@ -12,8 +18,109 @@ class EmitterDriver:
         self.pwm.ChangeDutyCycle(duty_cycle)
 
     def pulse(self, duration, duty=50):
+        """Blocking pulse; use EmitterScheduler.pulse() from control loops"""
         self.set_power(duty)
         time.sleep(duration)
         self.set_power(0)
 
-# In modes: e.g., laser = EmitterDriver(18); laser.pulse(0.15, 80)  # 80% for 15m range
\ No newline at end of file
+class EmitterScheduler:
+    """Runs timed duty-cycle segments for several emitters from one timer thread.
+
+    pulse()/schedule() return immediately; segments on different emitters may
+    overlap. Deadlines are on the monotonic clock and every duty change records
+    how late it fired, so jitter and missed deadlines can be reported.
+    """
+
+    def __init__(self, history=1000):
+        self.cond = threading.Condition()
+        self.events = []  # Heap of (deadline, seq, driver, duty, segment id)
+        self.seq = itertools.count()
+        self.owner = {}   # driver -> segment id currently holding it on
+        self.lateness = deque(maxlen=history)  # Seconds late, per fired event
+        self.fired = 0
+        self.misses = 0
+        self.thread = threading.Thread(target=self._run, name='emitter-scheduler', daemon=True)
+        self.thread.start()
+
+    def pulse(self, driver, duration, duty=50, delay=0.0):
+        """Turn `driver` on at `duty` after `delay` s for `duration` s. Returns the end time."""
+        start = time.monotonic() + delay
+        segment = next(self.seq)
+        with self.cond:
+            heapq.heappush(self.events, (start, next(self.seq), driver, duty, segment))
+            heapq.heappush(self.events, (start + duration, next(self.seq), driver, 0, segment))
+            self.cond.notify()
+        return start + duration
+
+    def schedule(self, segments):
+        """Queue several (driver, delay, duration, duty) segments. Returns the last end time."""
+        return max(self.pulse(driver, duration, duty, delay)
+                   for driver, delay, duration, duty in segments)
+
+    def busy(self):
+        """True while any segment is pending or running"""
+        with self.cond:
+            return bool(self.events)
+
+    def cancel(self):
+        """Drop pending segments and switch every emitter we touched off.
+
+        Safe against a segment firing concurrently: _run applies duty changes
+        with self.cond held, so anything it switched on is switched off here.
+        """
+        with self.cond:
+            drivers = {event[2] for event in self.events} | set(self.owner)
+            self.events.clear()
+            self.owner.clear()
+        for driver in drivers:
+            driver.set_power(0)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.events:
+                    self.cond.wait()
+                deadline = self.events[0][0]
+                now = time.monotonic()
+                if deadline > now:
+                    self.cond.wait(deadline - now)
+                    continue  # Re-check: an earlier event may have been queued
+                _, _, driver, duty, segment = heapq.heappop(self.events)
+                if duty:
+                    self.owner[driver] = segment
+                elif self.owner.get(driver) == segment:
+                    del self.owner[driver]
+                else:
+                    continue  # A newer segment owns this emitter; leave it on
+                # Still under the lock: a cancel() between the pop and this write
+                # would otherwise switch the emitter off first and leave it on here
+                driver.set_power(duty)
+            late = time.monotonic() - deadline
+            self.lateness.append(late)
+            self.fired += 1
+            if late > DEADLINE_MISS:
+                self.misses += 1
+
+    def stats(self):
+        """Lateness of fired duty changes in ms (mean/p95/max) and missed-deadline count"""
+        samples = sorted(self.lateness)
+        if not samples:
+            return {'fired': 0, 'misses': 0}
+        return {
+            'fired': self.fired,
+            'misses': self.misses,
+            'mean_ms': sum(samples) / len(samples) * 1000,
+            'p95_ms': samples[int(0.95 * (len(samples) - 1))] * 1000,
+            'max_ms': samples[-1] * 1000,
+        }
+
+_scheduler = None
+
+def get_scheduler():
+    """Shared emitter scheduler, started on first use"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = EmitterScheduler()
+    return _scheduler
+
+# In modes: e.g., laser = EmitterDriver(18); get_scheduler().pulse(laser, 0.15, duty=80)  # 80% for 15m range
@@ -0,0 +1,21 @@
+"""
+Hardware backend selection
+
+Control modules import GPIO, serial and w1thermsensor from here instead of
+directly, so the same code runs on the Pi or against the simulator:
+    DISRUPTOR_BACKEND=sim python3 src/main.py
+The default ('real') uses RPi.GPIO, pyserial and w1thermsensor.
+"""
+
+import os
+
+BACKEND = os.environ.get('DISRUPTOR_BACKEND', 'real')
+
+if BACKEND == 'sim':
+    from hal_sim import GPIO, serial, w1thermsensor
+elif BACKEND == 'real':
+    import RPi.GPIO as GPIO
+    import serial
+    import w1thermsensor
+else:
+    raise ValueError(f"Unknown DISRUPTOR_BACKEND '{BACKEND}' (use 'real' or 'sim')")
@@ -0,0 +1,316 @@
+"""
+Simulated GPIO / UART / 1-Wire backend for running src/ on an ordinary Linux box
+
+Mirrors the parts of RPi.GPIO, pyserial and w1thermsensor the control code
+uses. Inputs are scripted on a timeline relative to start() (pin levels,
+UART byte streams, temperatures), and every PWM duty change is recorded
+with its monotonic timestamp in GPIO.duty_log.
+
+A scenario can also be loaded from JSON (DISRUPTOR_SIM_SCENARIO=file.json):
+    {"pins": {"21": [[0, 1], [5.0, 0]]},
+     "serial": {"/dev/ttyAMA0": [[0.5, "aaff0300..."]]},
+     "temperature": [[0, 30.0], [10.0, 45.0]]}
+"""
+
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+
+class Timeline:
+    """Runs scripted callbacks at fixed offsets from start() on one thread"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.events = []
+        self.seq = itertools.count()
+        self.t0 = None
+        self.thread = None
+
+    def start(self):
+        with self.cond:
+            if self.t0 is None:
+                self.t0 = time.monotonic()
+                self.thread = threading.Thread(target=self._run, name='sim-timeline', daemon=True)
+                self.thread.start()
+        return self.t0
+
+    def elapsed(self):
+        return 0.0 if self.t0 is None else time.monotonic() - self.t0
+
+    def at(self, offset, func, *args):
+        with self.cond:
+            heapq.heappush(self.events, (offset, next(self.seq), func, args))
+            self.cond.notify()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.events:
+                    self.cond.wait()
+                offset, _, func, args = self.events[0]
+                delay = self.t0 + offset - time.monotonic()
+                if delay > 0:
+                    self.cond.wait(delay)
+                    continue
+                heapq.heappop(self.events)
+            func(*args)
+
+
+timeline = Timeline()
+
+
+class SimPWM:
+    def __init__(self, gpio, pin, freq):
+        self.gpio = gpio
+        self.pin = pin
+        self.freq = freq
+        self.duty = 0
+
+    def start(self, duty):
+        self.ChangeDutyCycle(duty)
+
+    def ChangeDutyCycle(self, duty):
+        self.duty = duty
+        self.gpio._record_duty(self.pin, duty)
+
+    def ChangeFrequency(self, freq):
+        self.freq = freq
+
+    def stop(self):
+        self.ChangeDutyCycle(0)
+
+
+class SimGPIO:
+    """Stand-in for the RPi.GPIO module"""
+
+    BCM, BOARD = 11, 10
+    IN, OUT = 1, 0
+    LOW, HIGH = 0, 1
+    PUD_OFF, PUD_DOWN, PUD_UP = 20, 21, 22
+    RISING, FALLING, BOTH = 31, 32, 33
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.mode = None
+        self.levels = {}     # pin -> current level (inputs and outputs)
+        self.directions = {}
+        self.callbacks = {}  # pin -> (edge, callback, bouncetime s, last fire time)
+        self.duty_log = []   # (monotonic time, pin, duty) for every PWM change
+        self.output_log = []  # (monotonic time, pin, level) for every GPIO.output
+        self.duty_listeners = []
+
+    # --- RPi.GPIO API ---
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pins, direction, pull_up_down=None, initial=None):
+        for pin in (pins if isinstance(pins, (list, tuple)) else [pins]):
+            self.directions[pin] = direction
+            if direction == self.OUT:
+                self.levels[pin] = initial if initial is not None else self.LOW
+            elif pin not in self.levels:
+                self.levels[pin] = self.HIGH if pull_up_down == self.PUD_UP else self.LOW
+
+    def input(self, pin):
+        return self.levels.get(pin, self.LOW)
+
+    def output(self, pins, value):
+        for pin in (pins if isinstance(pins, (list, tuple)) else [pins]):
+            self.levels[pin] = value
+            self.output_log.append((time.monotonic(), pin, value))
+
+    def PWM(self, pin, freq):
+        return SimPWM(self, pin, freq)
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=0):
+        self.callbacks[pin] = [edge, callback, bouncetime / 1000.0, -1e9]
+
+    def add_event_callback(self, pin, callback):
+        self.callbacks[pin][1] = callback
+
+    def remove_event_detect(self, pin):
+        self.callbacks.pop(pin, None)
+
+    def cleanup(self, pins=None):
+        self.callbacks.clear()
+        self.directions.clear()
+
+    # --- Simulation controls ---
+    def set_input(self, pin, level):
+        """Drive an input pin now, firing edge callbacks like the real interrupt thread"""
+        with self.lock:
+            old = self.levels.get(pin, self.LOW)
+            self.levels[pin] = level
+            entry = self.callbacks.get(pin)
+        if entry is None or old == level:
+            return
+        edge, callback, bounce, last = entry
+        wanted = (edge == self.BOTH or (edge == self.RISING and level == self.HIGH)
+                  or (edge == self.FALLING and level == self.LOW))
+        now = time.monotonic()
+        if wanted and callback and now - last >= bounce:
+            entry[3] = now
+            callback(pin)
+
+    def pulse_input(self, pin, width=0.0005, active=LOW):
+        """Short active pulse on an input (e.g. a LiDAR hit on the photodiode)"""
+        idle = self.HIGH if active == self.LOW else self.LOW
+        self.set_input(pin, active)
+        if width:
+            time.sleep(width)
+        self.set_input(pin, idle)
+
+    def script_pin(self, pin, events):
+        """events: [(offset s, level), ...] relative to timeline start"""
+        for offset, level in events:
+            timeline.at(offset, self.set_input, pin, level)
+
+    def _record_duty(self, pin, duty):
+        stamp = time.monotonic()
+        self.duty_log.append((stamp, pin, duty))
+        for listener in self.duty_listeners:
+            listener(stamp, pin, duty)
+
+
+GPIO = SimGPIO()
+
+
+class SerialException(IOError):
+    pass
+
+
+class SimSerialPort:
+    """Byte stream behind one simulated device path"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.rx = bytearray()
+        self.written = bytearray()
+
+    def feed(self, data):
+        with self.cond:
+            self.rx += data
+            self.cond.notify_all()
+
+
+serial_ports = {}
+
+
+def serial_port(path):
+    if path not in serial_ports:
+        serial_ports[path] = SimSerialPort()
+    return serial_ports[path]
+
+
+class SimSerial:
+    """Stand-in for serial.Serial backed by a scripted SimSerialPort"""
+
+    def __init__(self, port=None, baudrate=9600, timeout=None, **kwargs):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.dev = serial_port(port)
+        self.is_open = True
+
+    @property
+    def in_waiting(self):
+        return len(self.dev.rx)
+
+    def read(self, size=1):
+        if not self.is_open:
+            raise SerialException("Port not open")
+        with self.dev.cond:
+            self.dev.cond.wait_for(lambda: len(self.dev.rx) >= size, self.timeout)
+            data = bytes(self.dev.rx[:size])
+            del self.dev.rx[:size]
+        return data
+
+    def readline(self):
+        with self.dev.cond:
+            self.dev.cond.wait_for(lambda: b'\n' in self.dev.rx, self.timeout)
+            end = self.dev.rx.find(b'\n') + 1 or len(self.dev.rx)
+            data = bytes(self.dev.rx[:end])
+            del self.dev.rx[:end]
+        return data
+
+    def write(self, data):
+        if not self.is_open:
+            raise SerialException("Port not open")
+        self.dev.written += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        with self.dev.cond:
+            self.dev.rx.clear()
+
+    def close(self):
+        self.is_open = False
+
+
+def script_serial(path, chunks):
+    """chunks: [(offset s, bytes), ...] delivered to the port's receive buffer"""
+    dev = serial_port(path)
+    for offset, data in chunks:
+        timeline.at(offset, dev.feed, data)
+
+
+serial = SimpleNamespace(Serial=SimSerial, SerialException=SerialException)
+
+
+class SimW1ThermSensor:
+    """Stand-in for w1thermsensor.W1ThermSensor returning the scripted temperature"""
+
+    temperature = 25.0
+    conversion_time = 0.0  # Real DS18B20 at 12-bit: ~0.75 s
+
+    def get_temperature(self):
+        if self.conversion_time:
+            time.sleep(self.conversion_time)
+        if self.temperature is None:
+            raise IOError("Simulated sensor not found")
+        return self.temperature
+
+
+def set_temperature(value):
+    SimW1ThermSensor.temperature = value
+
+
+def script_temperature(points):
+    """points: [(offset s, °C), ...]; None simulates a missing sensor"""
+    for offset, value in points:
+        timeline.at(offset, set_temperature, value)
+
+
+w1thermsensor = SimpleNamespace(W1ThermSensor=SimW1ThermSensor)
+
+
+def load_scenario(path):
+    """Schedule pins/serial/temperature scripts from a JSON file"""
+    with open(path) as f:
+        scenario = json.load(f)
+    for pin, events in scenario.get('pins', {}).items():
+        GPIO.script_pin(int(pin), [(t, level) for t, level in events])
+    for port, chunks in scenario.get('serial', {}).items():
+        script_serial(port, [(t, bytes.fromhex(data)) for t, data in chunks])
+    script_temperature([(t, value) for t, value in scenario.get('temperature', [])])
+
+
+def start():
+    """Start the scripted timeline (offsets count from here)"""
+    return timeline.start()
+
+
+if os.environ.get('DISRUPTOR_SIM_SCENARIO'):
+    load_scenario(os.environ['DISRUPTOR_SIM_SCENARIO'])
+    start()
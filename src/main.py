@@ -1,33 +1,96 @@
-import RPi.GPIO as GPIO
+from hal import GPIO
+import threading
 import time
+from collections import deque
 
 # GPIO setup first
 GPIO.setmode(GPIO.BCM)
 MODE_PIN = 21  # Toggle switch
 GPIO.setup(MODE_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+SWITCH_BOUNCE_MS = 50  # Debounce for the toggle switch edge interrupt
+SAFETY_RETRY = 0.1     # Seconds to wait before re-entering a mode after a safety stop
 
 from smoke_mode import smoke_bomb_mode
-from smart_mode import smart_obstacle_mode
+from smart_mode import smart_obstacle_mode, LIDAR_PIN, CAM_PIN
+from drivers import EmitterDriver, get_scheduler
+from temp_monitor import get_sampler
+from utils import get_radar, get_photodiode
+
+class ModeController:
+    """Owns the emitters and sensors for the whole run and switches modes on toggle edges"""
+
+    def __init__(self):
+        # Created once; modes borrow them instead of building new PWM objects
+        self.laser = EmitterDriver(LIDAR_PIN)
+        self.cam = EmitterDriver(CAM_PIN)
+        get_sampler()
+        get_radar()
+        get_photodiode()
+
+        self.stop_event = threading.Event()  # Set by the switch interrupt to end the running mode
+        self.edge_time = None
+        self.switch_latency = deque(maxlen=100)  # Seconds from switch edge to new mode running
+        GPIO.add_event_detect(MODE_PIN, GPIO.BOTH, callback=self._on_switch,
+                              bouncetime=SWITCH_BOUNCE_MS)
+
+    def _on_switch(self, channel):
+        self.edge_time = time.monotonic()
+        self.stop_event.set()
+
+    def read_mode(self):
+        return 'smoke' if GPIO.input(MODE_PIN) == GPIO.HIGH else 'smart'
+
+    def run(self):
+        current_mode = None
+        while True:
+            # Clear before reading the pin so an edge after the read is never lost
+            edge_time, self.edge_time = self.edge_time, None
+            self.stop_event.clear()
+            mode = self.read_mode()
+            if mode != current_mode:
+                if current_mode is not None and edge_time is not None:
+                    latency = time.monotonic() - edge_time
+                    self.switch_latency.append(latency)
+                    print(f"Switch latency: {latency * 1000:.1f} ms")
+                print("Switching to Smoke Bomb Mode" if mode == 'smoke' else "Switching to Smart Obstacle Mode")
+                current_mode = mode
+
+            if mode == 'smoke':
+                smoke_bomb_mode(self.laser, self.cam, self.stop_event)
+            else:
+                smart_obstacle_mode(self.laser, self.cam, self.stop_event)
+
+            if not self.stop_event.is_set():
+                # Mode returned on a safety stop: wait for a switch or retry shortly
+                self.stop_event.wait(SAFETY_RETRY)
+
+    def switch_stats(self):
+        """Mode-switch latency in ms (count/mean/max)"""
+        samples = list(self.switch_latency)
+        if not samples:
+            return {'count': 0}
+        return {
+            'count': len(samples),
+            'mean_ms': sum(samples) / len(samples) * 1000,
+            'max_ms': max(samples) * 1000,
+        }
+
+    def shutdown(self):
+        get_scheduler().cancel()
+        GPIO.remove_event_detect(MODE_PIN)
 
 def main():
-    current_mode = 'smart'  # Default
     print("Starting Dual-Mode AV Disruptor...")
-    while True:
-        if GPIO.input(MODE_PIN) == GPIO.HIGH:  # Smoke mode
-            if current_mode != 'smoke':
-                print("Switching to Smoke Bomb Mode")
-                current_mode = 'smoke'
-            smoke_bomb_mode()
-        else:  # Smart mode
-            if current_mode != 'smart':
-                print("Switching to Smart Obstacle Mode")
-                current_mode = 'smart'
-            smart_obstacle_mode()
-        time.sleep(0.1)  # Poll switch
+    controller = ModeController()
+    try:
+        controller.run()
+    finally:
+        controller.shutdown()
+        print(f"Mode switches: {controller.switch_stats()}")
 
 if __name__ == "__main__":
     try:
         main()
     except KeyboardInterrupt:
         print("Shutting down...")
-        GPIO.cleanup()
\ No newline at end of file
+        GPIO.cleanup()
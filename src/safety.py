@@ -1,5 +1,5 @@
-import RPi.GPIO as GPIO
-from temp_monitor import get_temperature
+from hal import GPIO
+from temp_monitor import get_cached_temperature
 
 FAN_PIN = 24  # Fan control
 FUSE_PIN = 25  # Fuse status (active low if blown)
@@ -8,8 +8,11 @@ GPIO.setup(FUSE_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
 
 def check_safety():
     """Check temp and fuse; control fan"""
-    temp = get_temperature()
-    if temp and temp > 40:
+    temp, age, stale = get_cached_temperature()
+    if stale:
+        # No fresh reading (sensor missing or still warming up): cool anyway
+        GPIO.output(FAN_PIN, GPIO.HIGH)
+    elif temp and temp > 40:
         GPIO.output(FAN_PIN, GPIO.HIGH)  # Fan on
     else:
         GPIO.output(FAN_PIN, GPIO.LOW)   # Fan off
@@ -22,4 +25,4 @@ def check_safety():
         print("Fuse blown: Shutting down")
         return False
 
-    return True
\ No newline at end of file
+    return True
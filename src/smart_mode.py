@@ -1,7 +1,7 @@
-import RPi.GPIO as GPIO
+from hal import GPIO
 import time
 from utils import detect_signal
-from drivers import EmitterDriver
+from drivers import get_scheduler
 from temp_monitor import check_overheat
 from safety import check_safety
 
@@ -11,19 +11,25 @@ CAM_PIN = 19
 MANUAL_TRIGGER_PIN = 26  # Manual trigger if detection fails
 GPIO.setup([LIDAR_PIN, CAM_PIN], GPIO.OUT)
 GPIO.setup(MANUAL_TRIGGER_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+POLL_INTERVAL = 0.01     # Loop period while emissions run in the background
+TRIGGER_COOLDOWN = 0.68  # Laser 0.15s + gap 0.05s + LEDs 0.08s + 0.4s rest (low duty cycle)
 
-def smart_obstacle_mode():
-    """Targeted spoofing to mimic obstacles"""
-    MODE_PIN = 21
-    laser = EmitterDriver(LIDAR_PIN)
-    cam = EmitterDriver(CAM_PIN)
-    while GPIO.input(MODE_PIN) == GPIO.LOW:
+def smart_obstacle_mode(laser, cam, stop_event):
+    """Targeted spoofing to mimic obstacles. Runs until stop_event is set (mode switch) or safety trips."""
+    scheduler = get_scheduler()
+    next_trigger = 0.0
+    while not stop_event.is_set():
         if not check_safety() or check_overheat():
+            scheduler.cancel()
             print("Stopping due to safety/overheat")
             return
         # Detection or manual trigger (GPIO 26 button)
-        if detect_signal() or GPIO.input(MANUAL_TRIGGER_PIN) == GPIO.LOW:
-            laser.pulse(0.15, duty=80)  # Fake wall at 15m
-            time.sleep(0.05)
-            cam.pulse(0.08, duty=60)   # Dazzle
-            time.sleep(0.4)  # Low duty cycle
\ No newline at end of file
+        detected = detect_signal() or GPIO.input(MANUAL_TRIGGER_PIN) == GPIO.LOW
+        now = time.monotonic()
+        if detected and now >= next_trigger:
+            # Queued on the scheduler thread; this loop keeps checking safety meanwhile
+            scheduler.schedule([(laser, 0.0, 0.15, 80),   # Fake wall at 15m
+                                (cam, 0.20, 0.08, 60)])   # Dazzle
+            next_trigger = now + TRIGGER_COOLDOWN
+        stop_event.wait(POLL_INTERVAL)  # Wakes immediately on a mode switch
+    scheduler.cancel()
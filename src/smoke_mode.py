@@ -1,7 +1,7 @@
-import RPi.GPIO as GPIO
+from hal import GPIO
 import time
 import numpy as np
-from drivers import EmitterDriver
+from drivers import get_scheduler
 from temp_monitor import check_overheat
 from safety import check_safety
 
@@ -9,16 +9,26 @@ from safety import check_safety
 LIDAR_PIN = 18  # IR laser
 CAM_PIN = 19    # LED array
 GPIO.setup([LIDAR_PIN, CAM_PIN], GPIO.OUT)
+POLL_INTERVAL = 0.01  # Loop period while emissions run in the background
 
-def smoke_bomb_mode():
-    """Chaotic emissions to overwhelm AV sensors"""
-    MODE_PIN = 21
-    laser = EmitterDriver(LIDAR_PIN)
-    cam = EmitterDriver(CAM_PIN)
-    while GPIO.input(MODE_PIN) == GPIO.HIGH:
+def smoke_bomb_mode(laser, cam, stop_event):
+    """Chaotic emissions to overwhelm AV sensors. Runs until stop_event is set (mode switch) or safety trips."""
+    scheduler = get_scheduler()
+    next_burst = 0.0
+    while not stop_event.is_set():
         if not check_safety() or check_overheat():
+            scheduler.cancel()
             print("Stopping due to safety/overheat")
             return
-        for driver in [laser, cam]:
-            driver.pulse(np.random.uniform(0.1, 0.5), duty=80)  # Random pulse, high power
-            time.sleep(0.05)
\ No newline at end of file
+        now = time.monotonic()
+        if now >= next_burst:
+            offset = 0.0
+            segments = []
+            for driver in [laser, cam]:
+                duration = np.random.uniform(0.1, 0.5)  # Random pulse, high power
+                segments.append((driver, offset, duration, 80))
+                offset += duration + 0.05
+            scheduler.schedule(segments)
+            next_burst = now + offset
+        stop_event.wait(POLL_INTERVAL)  # Wakes immediately on a mode switch
+    scheduler.cancel()
@@ -1,20 +1,80 @@
-import w1thermsensor
+from hal import w1thermsensor
+import threading
 import time
 
+SAMPLE_INTERVAL = 1.0  # Seconds between background DS18B20 conversions
+STALE_AFTER = 5.0      # Cached readings older than this are flagged stale
+
+_sensor = None  # One W1ThermSensor handle, reused for every read
+
 def get_temperature():
-    """Read DS18B20 temperature (GPIO 23, 1-Wire)"""
+    """Read DS18B20 temperature (GPIO 23, 1-Wire). Blocks for a full conversion."""
+    global _sensor
     try:
-        sensor = w1thermsensor.W1ThermSensor()
-        temp = sensor.get_temperature()
+        if _sensor is None:
+            _sensor = w1thermsensor.W1ThermSensor()
+        temp = _sensor.get_temperature()
         return temp
     except Exception as e:
         print(f"Temp sensor error: {e}")
+        _sensor = None  # Re-discover the sensor on the next read
         return None
 
+class TemperatureSampler:
+    """Reads the DS18B20 on a background thread so control loops never block on 1-Wire"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL, stale_after=STALE_AFTER):
+        self.interval = interval
+        self.stale_after = stale_after
+        self.latest = (None, None)  # (temp °C, monotonic timestamp); swapped atomically
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name='temp-sampler', daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=self.interval + 1)
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            start = time.monotonic()
+            temp = get_temperature()
+            if temp is not None:
+                self.latest = (temp, time.monotonic())
+            self.stop_event.wait(max(0.0, self.interval - (time.monotonic() - start)))
+
+    def read(self):
+        """Return (temp, age_seconds, stale). temp/age are None before the first good read."""
+        temp, stamp = self.latest
+        if stamp is None:
+            return None, None, True
+        age = time.monotonic() - stamp
+        return temp, age, age > self.stale_after
+
+_sampler = None
+
+def get_sampler():
+    """Shared sampler, started on first use"""
+    global _sampler
+    if _sampler is None:
+        _sampler = TemperatureSampler().start()
+    return _sampler
+
+def get_cached_temperature():
+    """Latest background reading as (temp, age_seconds, stale); never blocks"""
+    return get_sampler().read()
+
 def check_overheat(threshold=50):
     """Check if temp exceeds threshold"""
-    temp = get_temperature()
+    temp, age, stale = get_cached_temperature()
     if temp and temp > threshold:
-        print(f"Overheat detected: {temp}°C")
+        print(f"Overheat detected: {temp}°C ({age:.1f}s old)")
         return True
-    return False
\ No newline at end of file
+    return False
@@ -1,8 +1,12 @@
 import numpy as np
 from scipy.fft import fft  # Kept for potential future signal analysis
-import serial
-import RPi.GPIO as GPIO
+from hal import GPIO, serial
+import math
+from array import array
+import struct
+import threading
 import time
+from collections import deque, namedtuple
 
 # Setup for mmWave UART (e.g., RD-03D)
 UART_PORT = '/dev/ttyAMA0'  # Or '/dev/ttyS0' on Pi 5
@@ -10,28 +14,210 @@ BAUDRATE = 256000  # From mmWave docs
 PHOTODIODE_PIN = 22  # For LiDAR pulse detection
 GPIO.setup(PHOTODIODE_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)  # Pull-up for stability
 
+# RD-03D report frame: AA FF 03 00 | 3 targets x 8 bytes | 55 CC
+RD03D_HEADER = b'\xAA\xFF\x03\x00'
+RD03D_FOOTER = b'\x55\xCC'
+RD03D_FRAME_LEN = 30
+RD03D_MULTI_TARGET_CMD = b'\xFD\xFC\xFB\xFA\x02\x00\x90\x00\x04\x03\x02\x01'
+RADAR_HISTORY = 64   # Targets kept in the ring buffer
+RADAR_WINDOW = 0.2   # Seconds a target counts as "recent" for detect_signal
+PULSE_HISTORY = 1024  # Photodiode edge timestamps kept (power of two)
+
+# range in mm, speed in cm/s (negative = approaching), angle in degrees (0 = boresight)
+RadarTarget = namedtuple('RadarTarget', ['timestamp', 'x', 'y', 'range', 'speed', 'angle'])
+
+def _rd03d_signed(raw):
+    """RD-03D encodes sign in bit 15 (set = positive) and magnitude in the rest"""
+    return raw - 0x8000 if raw & 0x8000 else -raw
+
+def parse_rd03d_frame(frame, timestamp):
+    """Decode one 30-byte RD-03D frame into RadarTargets (empty slots skipped)"""
+    targets = []
+    for i in range(3):
+        raw_x, raw_y, raw_speed, _resolution = struct.unpack_from('<HHHH', frame, 4 + 8 * i)
+        if raw_x == 0 and raw_y == 0 and raw_speed == 0:
+            continue
+        x, y = _rd03d_signed(raw_x), _rd03d_signed(raw_y)
+        targets.append(RadarTarget(timestamp, x, y, math.hypot(x, y),
+                                   _rd03d_signed(raw_speed), math.degrees(math.atan2(x, y))))
+    return targets
+
+class RadarSession:
+    """Long-lived mmWave UART session: owns the port and parses frames on a background thread"""
+
+    def __init__(self, port=UART_PORT, baudrate=BAUDRATE, history=RADAR_HISTORY):
+        self.port = port
+        self.baudrate = baudrate
+        self.targets = deque(maxlen=history)  # Bounded ring buffer of RadarTargets
+        self.frames = 0
+        self.bad_frames = 0
+        self.ser = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name='mmwave-reader', daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=1)
+        self._close()
+
+    def _open(self):
+        self.ser = serial.Serial(self.port, self.baudrate, timeout=0.05)
+        self.ser.write(RD03D_MULTI_TARGET_CMD)  # Report up to 3 targets per frame
+
+    def _close(self):
+        if self.ser:
+            try:
+                self.ser.close()
+            except Exception:
+                pass
+            self.ser = None
+
+    def _run(self):
+        buf = bytearray()
+        reported = False
+        while not self.stop_event.is_set():
+            try:
+                if self.ser is None:
+                    self._open()
+                    buf.clear()
+                    reported = False
+                data = self.ser.read(max(1, self.ser.in_waiting))
+            except Exception as e:
+                if not reported:
+                    print(f"mmWave error: {e}")
+                    reported = True
+                self._close()
+                self.stop_event.wait(1.0)  # Retry the port once a second
+                continue
+            if data:
+                buf += data
+                self._parse(buf)
+
+    def _parse(self, buf):
+        """Consume every complete frame in buf, keeping any trailing partial frame"""
+        now = time.monotonic()
+        while True:
+            start = buf.find(RD03D_HEADER)
+            if start < 0:
+                del buf[:max(0, len(buf) - len(RD03D_HEADER) + 1)]
+                return
+            if len(buf) - start < RD03D_FRAME_LEN:
+                del buf[:start]
+                return
+            frame = buf[start:start + RD03D_FRAME_LEN]
+            if frame[-2:] != RD03D_FOOTER:
+                self.bad_frames += 1
+                del buf[:start + 1]  # Resync on the next header
+                continue
+            self.frames += 1
+            self.targets.extend(parse_rd03d_frame(frame, now))
+            del buf[:start + RD03D_FRAME_LEN]
+
+    def recent(self, max_age=RADAR_WINDOW):
+        """Targets reported within the last max_age seconds, newest last"""
+        cutoff = time.monotonic() - max_age
+        return [t for t in list(self.targets) if t.timestamp >= cutoff]
+
+_radar = None
+
+def get_radar():
+    """Shared radar session, started on first use"""
+    global _radar
+    if _radar is None:
+        _radar = RadarSession().start()
+    return _radar
+
+class PhotodiodeMonitor:
+    """Interrupt-driven photodiode capture: falling-edge timestamps in a ring buffer.
+
+    The GPIO callback thread is the only writer; it stores the timestamp and
+    then bumps `count`, so readers can snapshot without taking a lock.
+    """
+
+    def __init__(self, pin=PHOTODIODE_PIN, history=PULSE_HISTORY):
+        if history < 1 or history & (history - 1):
+            raise ValueError(f"Photodiode history must be a power of two, got {history}")
+        self.pin = pin
+        self.mask = history - 1
+        self.stamps = array('d', [0.0]) * history  # Preallocated, never resized
+        self.count = 0  # Total edges seen; next write goes to stamps[count & mask]
+        self.started = False
+
+    def start(self):
+        if not self.started:
+            GPIO.add_event_detect(self.pin, GPIO.FALLING, callback=self._on_edge)
+            self.started = True
+        return self
+
+    def stop(self):
+        if self.started:
+            GPIO.remove_event_detect(self.pin)
+            self.started = False
+
+    def _on_edge(self, channel):
+        self.stamps[self.count & self.mask] = time.monotonic()
+        self.count += 1
+
+    def edges(self, window=None):
+        """Edge timestamps (oldest first), optionally only those in the last `window` seconds"""
+        count = self.count
+        n = min(count, self.mask + 1)
+        out = [self.stamps[i & self.mask] for i in range(count - n, count)]
+        if window is not None:
+            cutoff = time.monotonic() - window
+            out = [t for t in out if t >= cutoff]
+        return out
+
+    def last_edge_age(self):
+        """Seconds since the most recent edge, or None if none seen yet"""
+        if self.count == 0:
+            return None
+        return time.monotonic() - self.stamps[(self.count - 1) & self.mask]
+
+    def pulse_rate(self, window=1.0):
+        """Edges per second over the last `window` seconds"""
+        return len(self.edges(window)) / window
+
+    def interval_stats(self, window=1.0):
+        """Inter-pulse interval statistics (seconds) over the last `window`, or None"""
+        stamps = self.edges(window)
+        if len(stamps) < 2:
+            return None
+        intervals = np.diff(stamps)
+        return {
+            'count': len(intervals),
+            'mean': float(intervals.mean()),
+            'min': float(intervals.min()),
+            'max': float(intervals.max()),
+            'std': float(intervals.std()),
+        }
+
+_photodiode = None
+
+def get_photodiode():
+    """Shared photodiode monitor, started on first use"""
+    global _photodiode
+    if _photodiode is None:
+        _photodiode = PhotodiodeMonitor().start()
+    return _photodiode
+
 def detect_signal(duration=0.1):
-    """Detect AV sensors: mmWave for radar/motion, photodiode for LiDAR pulses"""
-    detected = False
-
-    # mmWave radar detection (proxy for AV radar)
-    try:
-        ser = serial.Serial(UART_PORT, BAUDRATE, timeout=0.1)
-        ser.write(b'\xFF\xFF\xFF\xFF')  # Wakeup/init command if needed (check module docs)
-        data = ser.read(100)  # Read raw bytes
-        ser.close()
-        # Parse for motion/presence (simplified; use module library if available)
-        if b'motion' in data or len(data) > 10:  # Placeholder parse; refine with actual protocol
-            detected = True
-    except Exception as e:
-        print(f"mmWave error: {e}")
-
-    # LiDAR pulse detection (IR photodiode)
-    start_time = time.time()
-    while time.time() - start_time < duration:
-        if GPIO.input(PHOTODIODE_PIN) == GPIO.LOW:  # Pulse detected (active low with amp)
-            detected = True
-            break
-        time.sleep(0.001)  # Poll rate
-
-    return detected
\ No newline at end of file
+    """Detect AV sensors: mmWave for radar/motion, photodiode for LiDAR pulses.
+    Returns immediately; `duration` is how far back (s) recent activity counts."""
+    # mmWave radar detection (proxy for AV radar): query the background session
+    if get_radar().recent():
+        return True
+
+    # LiDAR pulse detection (IR photodiode): any edge in the window, or held low now
+    age = get_photodiode().last_edge_age()
+    if age is not None and age <= duration:
+        return True
+    return GPIO.input(PHOTODIODE_PIN) == GPIO.LOW  # Pulse detected (active low with amp)
@@ -0,0 +1,368 @@
+"""
+Asyncio server mode for the tracker UI: the routes and page of test.py's Flask app, one event loop
+
+    python3 tests/test.py --async
+
+The Flask server spends a thread per /video_feed viewer, each parked in a
+blocking socket write; every viewer's thread competes with the tracker for the
+GIL and a click waits for a free thread. Here each viewer is a coroutine:
+
+  - frames come from the same FrameBroadcaster (one capture, track and encode
+    per frame, shared by every viewer); its producer thread wakes the loop
+    through broadcaster.listeners
+  - writes never block: StreamWriter.write queues the chunk and drain() only
+    waits while more than WRITE_BUFFER bytes are still queued for that viewer.
+    Frames published meanwhile are skipped, and the time spent in drain()
+    feeds the same per-client level control as the threaded server
+  - /click, /stop and /center run on the loop between frame writes. The calls
+    that can take tens of milliseconds (tracker init on click, the servo write
+    of /center) go to a small thread pool so streams keep flowing meanwhile
+
+The page also opens a WebSocket on /ws, a persistent control channel:
+
+  browser -> server  {"cmd": "click", "x": .., "y": .., "width": .., "height": .., "id": 7}
+                     {"cmd": "stop", "id": 8}   {"cmd": "center", ...}   {"cmd": "ping", ...}
+  server -> browser  {"type": "ack", "id": 7, "cmd": "click", "frame": 1234, "success": true, ...}
+                     {"type": "state", "frame": 1235, "status": "tracking", "bbox": [..],
+                      "center": [..], "predicted": [..], "pan": 97, "tilt": 84, ...}
+
+one state message per processed frame (LaserTracker.track_state()), so the
+page draws the overlays itself and the tracker can skip drawing them into the
+video (overlays=False). A state message is dropped rather than queued when
+the socket still has WRITE_BUFFER bytes pending. The page times each command
+from send to its ack: the end-to-end control round trip.
+
+Only the bit of HTTP/1.1 the page and tests/load_test.py use is spoken:
+GET/POST with Content-Length bodies, keep-alive and the WebSocket upgrade
+(unfragmented text frames).
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from frame_broadcaster import frame_coordinates
+from metrics import REGISTRY  # tracking/, on the path via frame_broadcaster
+
+WRITE_BUFFER = 64 * 1024  # Bytes queued per viewer before drain() waits (about two 640x480 frames)
+MAX_BODY = 64 * 1024      # Largest request body accepted
+FRAME_TIMEOUT = 2.0       # Seconds a viewer waits for a frame before re-checking the broadcaster
+WS_MAX_MESSAGE = 4096     # Largest WebSocket message accepted from a browser
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'  # RFC 6455 handshake constant
+
+# WebSocket opcodes
+OP_CONTINUATION, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large'}
+
+
+class HttpError(Exception):
+    def __init__(self, status):
+        super().__init__(REASONS[status])
+        self.status = status
+
+
+async def read_request(reader):
+    """(method, path, headers, body) of the next request on the connection, None once the client closed it"""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, _ = line.decode('latin-1').split(' ', 2)
+    except ValueError:
+        raise HttpError(400)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length') or 0)
+    if length > MAX_BODY:
+        raise HttpError(413)
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target.split('?', 1)[0], headers, body
+
+
+def response(status, body, content_type='application/json', keep_alive=True):
+    """Complete HTTP/1.1 response bytes"""
+    if not isinstance(body, bytes):
+        body = body.encode()
+    head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode() + body
+
+
+def json_response(data, keep_alive=True):
+    return response(200, json.dumps(data), keep_alive=keep_alive)
+
+
+def ws_accept(key):
+    """Sec-WebSocket-Accept value for a client's Sec-WebSocket-Key"""
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+
+def ws_frame(payload, opcode=OP_TEXT, mask=None):
+    """One final WebSocket frame; mask: 4 bytes (clients must mask, servers must not)"""
+    if isinstance(payload, str):
+        payload = payload.encode()
+    n = len(payload)
+    bit = 0x80 if mask else 0
+    if n < 126:
+        head = struct.pack('!BB', 0x80 | opcode, bit | n)
+    elif n < 1 << 16:
+        head = struct.pack('!BBH', 0x80 | opcode, bit | 126, n)
+    else:
+        head = struct.pack('!BBQ', 0x80 | opcode, bit | 127, n)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        head += mask
+    return head + payload
+
+
+async def ws_read(reader, limit=WS_MAX_MESSAGE):
+    """(opcode, payload) of the next frame; fragmented or oversized messages read as OP_CLOSE"""
+    first, second = await reader.readexactly(2)
+    n = second & 0x7F
+    if n == 126:
+        n, = struct.unpack('!H', await reader.readexactly(2))
+    elif n == 127:
+        n, = struct.unpack('!Q', await reader.readexactly(8))
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    if n > limit or not first & 0x80:
+        return OP_CLOSE, b''
+    payload = await reader.readexactly(n)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return first & 0x0F, payload
+
+
+class AsyncTrackerServer:
+    def __init__(self, tracker, broadcaster, index_html, registry=REGISTRY):
+        """index_html: the rendered templates/index.html (test.py renders it with Flask's url_for)"""
+        self.tracker = tracker
+        self.broadcaster = broadcaster
+        self.index_html = index_html.encode()
+        self.pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='control')
+        self.loop = None
+        self.frame_ready = None  # Future resolved (and replaced) each time the broadcaster publishes
+        self.control_seconds = registry.histogram('tracker_control_seconds',
+                                                  "Time to handle each control command (POST or WebSocket)",
+                                                  label='command')
+        self.state_dropped = registry.counter('tracker_ws_states_dropped_total',
+                                              "State messages not sent to a WebSocket client that was behind").labels()
+        self.ws_clients = registry.gauge('tracker_ws_clients', "Connected /ws control channels").labels()
+        self.commands = {
+            'click': self.handle_click,
+            'stop': self.stop_tracking,
+            'center': self.center_servos,
+            'ping': self.ping,
+        }
+        self.routes = {
+            ('GET', '/'): self.index,
+            ('GET', '/clients'): self.stream_clients,
+            ('GET', '/metrics'): self.metrics,
+            ('POST', '/click'): self.post,
+            ('POST', '/stop'): self.post,
+            ('POST', '/center'): self.post,
+        }
+
+    # ---- Broadcaster -> loop ----
+
+    def _published(self):
+        """Producer thread: a frame (or shutdown) is ready"""
+        self.loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        future, self.frame_ready = self.frame_ready, self.loop.create_future()
+        future.set_result(None)
+
+    async def next_frame(self):
+        """Wait for the broadcaster's next publish; False on timeout"""
+        try:
+            # shield: a viewer going away must not cancel the future every viewer shares
+            await asyncio.wait_for(asyncio.shield(self.frame_ready), FRAME_TIMEOUT)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    # ---- Routes ----
+
+    async def index(self, path, body):
+        return response(200, self.index_html, 'text/html; charset=utf-8')
+
+    async def stream_clients(self, path, body):
+        return json_response(self.broadcaster.clients())
+
+    async def metrics(self, path, body):
+        return response(200, REGISTRY.render(), 'text/plain; version=0.0.4')
+
+    async def post(self, path, body):
+        """POST /click, /stop, /center: the command of that name with the JSON body"""
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            raise HttpError(400)
+        return json_response(await self.command(path.lstrip('/'), data))
+
+    # ---- Commands (POST routes and /ws messages) ----
+
+    async def command(self, name, data):
+        start = time.perf_counter()
+        result = await self.commands[name](data)
+        self.control_seconds.labels(name).observe(time.perf_counter() - start)
+        return result
+
+    async def handle_click(self, data):
+        x, y = frame_coordinates(data, self.tracker.frame_size())
+        success = await self.loop.run_in_executor(self.pool, self.tracker.start_tracking, x, y)
+        return {'success': success, 'x': x, 'y': y}
+
+    async def stop_tracking(self, data):
+        self.tracker.stop_tracking()  # Flag flip under the tracker lock
+        return {'success': True}
+
+    async def center_servos(self, data):
+        await self.loop.run_in_executor(self.pool, self.tracker.center_servos)
+        return {'success': True}
+
+    async def ping(self, data):
+        """No-op, for measuring the channel's own round trip"""
+        return {'success': True}
+
+    # ---- Streams ----
+
+    async def video_feed(self, reader, writer, client):
+        """Multipart MJPEG to one viewer until it disconnects or the broadcaster stops"""
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER)
+        writer.write(b"HTTP/1.1 200 OK\r\n"
+                     b"Content-Type: multipart/x-mixed-replace; boundary=frame\r\n"
+                     b"Cache-Control: no-cache\r\n"
+                     b"Connection: close\r\n\r\n")
+        sub = self.broadcaster.join(client)
+        try:
+            # A viewer that closed its end shows up as EOF on the reader (nothing else is ever read)
+            while self.broadcaster.running and not reader.at_eof() and not writer.is_closing():
+                chunk = sub.poll()
+                if chunk is None:
+                    await self.next_frame()
+                    continue
+                start = time.perf_counter()
+                writer.write(chunk)
+                await writer.drain()  # Returns at once unless WRITE_BUFFER is exceeded
+                sub.sent(len(chunk), start, time.perf_counter())
+        finally:
+            sub.close()
+
+    async def control_channel(self, reader, writer, headers):
+        """/ws: commands in, an ack per command and a state message per frame out"""
+        key = headers.get('sec-websocket-key')
+        if headers.get('upgrade', '').lower() != 'websocket' or not key:
+            raise HttpError(400)
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER)
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\n"
+                      "Upgrade: websocket\r\n"
+                      "Connection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {ws_accept(key)}\r\n\r\n").encode())
+        writer.write(ws_frame(json.dumps({'type': 'hello', 'overlays': self.tracker.overlays})))
+        self.ws_clients.inc()
+        push = asyncio.create_task(self.push_state(writer))
+        try:
+            while True:
+                opcode, payload = await ws_read(reader)
+                if opcode == OP_CLOSE:
+                    writer.write(ws_frame(b'', OP_CLOSE))
+                    break
+                if opcode == OP_PING:
+                    writer.write(ws_frame(payload, OP_PONG))
+                    continue
+                if opcode != OP_TEXT:
+                    continue
+                data = name = None
+                try:
+                    data = json.loads(payload)
+                    name = data['cmd']
+                    result = await self.command(name, data)
+                except (ValueError, KeyError, TypeError):
+                    result = {'success': False, 'error': 'bad command'}
+                # Acks are never dropped; the frame id tells the page which states reflect the command
+                ack = {'type': 'ack', 'id': data.get('id') if isinstance(data, dict) else None, 'cmd': name,
+                       'frame': self.tracker.frame_id}
+                ack.update(result)
+                writer.write(ws_frame(json.dumps(ack)))
+                await writer.drain()
+        finally:
+            push.cancel()
+            self.ws_clients.inc(-1)
+
+    async def push_state(self, writer):
+        """Send track_state() after every published frame; drop it if the socket is still behind"""
+        last = None
+        while not writer.is_closing():
+            await self.next_frame()
+            state = self.tracker.track_state()
+            if state is None or state['frame'] == last:
+                continue
+            last = state['frame']
+            if writer.transport.get_write_buffer_size() > WRITE_BUFFER:
+                self.state_dropped.inc()
+                continue
+            writer.write(ws_frame(json.dumps(dict(state, type='state'))))
+
+    # ---- Connections ----
+
+    async def handle(self, reader, writer):
+        client = (writer.get_extra_info('peername') or ('?',))[0]
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    method, path, headers, body = request
+                    keep_alive = headers.get('connection', '').lower() != 'close'
+                    if (method, path) == ('GET', '/video_feed'):
+                        await self.video_feed(reader, writer, client)
+                        break
+                    if (method, path) == ('GET', '/ws'):
+                        await self.control_channel(reader, writer, headers)
+                        break
+                    route = self.routes.get((method, path))
+                    if route is None:
+                        status = 405 if any(p == path for _, p in self.routes) else 404
+                        raise HttpError(status)
+                    out = await route(path, body)
+                except HttpError as e:
+                    out, keep_alive = response(e.status, json.dumps({'error': str(e)}), keep_alive=False), False
+                writer.write(out)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        self.loop = asyncio.get_running_loop()
+        self.frame_ready = self.loop.create_future()
+        self.broadcaster.listeners.append(self._published)
+        server = await asyncio.start_server(self.handle, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.broadcaster.listeners.remove(self._published)
+            self.pool.shutdown(wait=False)
+
+
+def serve(tracker, broadcaster, index_html, host='0.0.0.0', port=8080):
+    """Run the asyncio server until Ctrl+C (KeyboardInterrupt propagates, as with app.run)"""
+    asyncio.run(AsyncTrackerServer(tracker, broadcaster, index_html).serve(host, port))
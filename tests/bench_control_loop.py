@@ -0,0 +1,238 @@
+"""
+Detection-to-emission latency and loop-jitter benchmark for src/
+
+Runs smart_obstacle_mode unmodified on the simulated backend (src/hal_sim.py),
+injects photodiode edges and RD-03D radar frames, and measures:
+  - latency from each injected detection to the first non-zero ChangeDutyCycle
+  - loop period and its jitter, and CPU time per loop iteration
+  - time spent in check_safety / check_overheat / detect_signal per call
+
+    python3 tests/bench_control_loop.py --trials 20 --json results.json
+    python3 tests/bench_control_loop.py --compare results.json   # diff against a saved run
+"""
+
+import argparse
+import json
+import os
+import platform
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+os.environ['DISRUPTOR_BACKEND'] = 'sim'
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import hal_sim  # noqa: E402
+from hal_sim import GPIO  # noqa: E402
+import utils  # noqa: E402
+import smart_mode  # noqa: E402
+from drivers import EmitterDriver, get_scheduler  # noqa: E402
+
+PERCENTILES = (50, 95, 99)
+
+
+def summarize(samples, scale=1000.0):
+    """p50/p95/p99/mean/max in ms (scale=1000) of a list of seconds"""
+    arr = np.asarray(samples, dtype=float) * scale
+    if not arr.size:
+        return {'count': 0}
+    out = {'count': len(arr), 'mean': float(arr.mean()), 'max': float(arr.max())}
+    for p in PERCENTILES:
+        out[f'p{p}'] = float(np.percentile(arr, p))
+    return out
+
+
+def rd03d_frame(x=-100, y=1500, speed=-20):
+    def enc(v):
+        return (v | 0x8000) if v >= 0 else -v
+    return (utils.RD03D_HEADER + struct.pack('<HHHH', enc(x), enc(y), enc(speed), 360)
+            + bytes(16) + utils.RD03D_FOOTER)
+
+
+class LoopProbe:
+    """Wraps a function the mode loop calls to time it; optionally marks loop iterations"""
+
+    def __init__(self, func, marks_iteration=False):
+        self.func = func
+        self.marks_iteration = marks_iteration
+        self.durations = []
+        self.iter_starts = []
+        self.iter_cpu = []
+
+    def __call__(self, *args, **kwargs):
+        if self.marks_iteration:
+            self.iter_starts.append(time.perf_counter())
+            self.iter_cpu.append(time.thread_time())
+        start = time.perf_counter()
+        try:
+            return self.func(*args, **kwargs)
+        finally:
+            self.durations.append(time.perf_counter() - start)
+
+
+class EmissionWatch:
+    """Records the first non-zero duty change after each injected detection"""
+
+    def __init__(self):
+        self.armed_at = None
+        self.latencies = []
+        self.done = threading.Event()
+        GPIO.duty_listeners.append(self._on_duty)
+
+    def arm(self):
+        self.done.clear()
+        self.armed_at = time.perf_counter()
+        return self.armed_at
+
+    def _on_duty(self, stamp, pin, duty):
+        if duty and self.armed_at is not None:
+            self.latencies.append(time.perf_counter() - self.armed_at)
+            self.armed_at = None
+            self.done.set()
+
+
+def run(trials, conversion_time):
+    hal_sim.SimW1ThermSensor.conversion_time = conversion_time  # Realistic DS18B20 stall
+    hal_sim.start()
+    GPIO.setup(21, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+    GPIO.set_input(21, GPIO.LOW)  # Smart mode
+    radar_port = hal_sim.serial_port(utils.UART_PORT)
+
+    # Instrument the functions the mode loop calls on every pass
+    safety_probe = LoopProbe(smart_mode.check_safety, marks_iteration=True)
+    overheat_probe = LoopProbe(smart_mode.check_overheat)
+    detect_probe = LoopProbe(smart_mode.detect_signal)
+    smart_mode.check_safety = safety_probe
+    smart_mode.check_overheat = overheat_probe
+    smart_mode.detect_signal = detect_probe
+
+    laser = EmitterDriver(smart_mode.LIDAR_PIN)
+    cam = EmitterDriver(smart_mode.CAM_PIN)
+    utils.get_radar()
+    utils.get_photodiode()
+    time.sleep(conversion_time + 0.2)  # First temperature sample
+
+    stop_event = threading.Event()
+    watch = EmissionWatch()
+    mode = threading.Thread(target=smart_mode.smart_obstacle_mode, args=(laser, cam, stop_event), daemon=True)
+    mode.start()
+
+    spacing = smart_mode.TRIGGER_COOLDOWN + utils.RADAR_WINDOW + 0.05
+    results = {}
+    for source in ('photodiode', 'radar'):
+        watch.latencies = []
+        missed = 0
+        for _ in range(trials):
+            time.sleep(spacing)
+            watch.arm()
+            if source == 'photodiode':
+                GPIO.pulse_input(utils.PHOTODIODE_PIN, width=0)
+            else:
+                radar_port.feed(rd03d_frame())
+            if not watch.done.wait(1.0):
+                missed += 1
+        results[source] = dict(summarize(watch.latencies), missed=missed)
+
+    stop_event.set()
+    mode.join(timeout=1)
+
+    starts = np.asarray(safety_probe.iter_starts)
+    periods = np.diff(starts)
+    cpu = np.diff(np.asarray(safety_probe.iter_cpu))
+    return {
+        'detection_to_emission_ms': results,
+        'loop_period_ms': summarize(periods),
+        'loop_jitter_ms': float(np.std(periods) * 1000) if len(periods) else None,
+        'loop_period_target_ms': smart_mode.POLL_INTERVAL * 1000,
+        'cpu_per_iteration_us': summarize(cpu, scale=1e6),
+        'call_ms': {
+            'check_safety': summarize(safety_probe.durations),
+            'check_overheat': summarize(overheat_probe.durations),
+            'detect_signal': summarize(detect_probe.durations),
+        },
+        'scheduler': get_scheduler().stats(),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def print_report(report):
+    def line(name, stats, unit='ms'):
+        if not stats.get('count'):
+            print(f"  {name:<28} (no samples)")
+            return
+        text = "  ".join(f"p{p}={stats[f'p{p}']:.2f}" for p in PERCENTILES)
+        print(f"  {name:<28} {text} {unit}")
+
+    print("Detection -> first ChangeDutyCycle")
+    for source, stats in report['detection_to_emission_ms'].items():
+        line(source, stats)
+        if stats.get('missed'):
+            print(f"  {'':<28} missed: {stats['missed']}")
+    print("Control loop")
+    line('period', report['loop_period_ms'])
+    print(f"  {'jitter (std)':<28} {report['loop_jitter_ms']:.3f} ms "
+          f"(target period {report['loop_period_target_ms']:.0f} ms)")
+    line('cpu per iteration', report['cpu_per_iteration_us'], unit='us')
+    for name, stats in report['call_ms'].items():
+        line(name, stats)
+    print(f"Scheduler: {report['scheduler']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trials', type=int, default=20, help="Injected detections per source")
+    parser.add_argument('--conversion-time', type=float, default=0.75,
+                        help="Simulated DS18B20 conversion time in seconds")
+    parser.add_argument('--json', help="Save results here (default: not saved)")
+    parser.add_argument('--compare', help="Previous results JSON to diff against")
+    args = parser.parse_args()
+
+    report = run(args.trials, args.conversion_time)
+    report['_meta'] = {
+        'git': git_revision(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'trials': args.trials,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report)
+    if baseline:
+        print("\nChange in p95 vs baseline:")
+        pairs = [('loop period', report['loop_period_ms'], baseline['loop_period_ms'])]
+        pairs += [(f"{s} latency", report['detection_to_emission_ms'][s],
+                   baseline['detection_to_emission_ms'].get(s, {}))
+                  for s in report['detection_to_emission_ms']]
+        pairs += [(name, report['call_ms'][name], baseline['call_ms'].get(name, {}))
+                  for name in report['call_ms']]
+        for name, new, old in pairs:
+            if new.get('count') and old.get('count'):
+                print(f"  {name:<28} {old['p95']:8.2f} -> {new['p95']:8.2f} ms "
+                      f"({new['p95'] - old['p95']:+.2f})")
+        print(f"  (baseline {baseline.get('_meta', {}).get('git', '?')})")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved {args.json}")
+
+
+if __name__ == '__main__':
+    main()
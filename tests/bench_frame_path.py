@@ -0,0 +1,131 @@
+"""
+Per-frame allocation and time: LaserTracker.process_frame and the cam_test colour mask
+
+Each path runs before (allocating, as originally written) and after (reused
+buffers) on synthetic 640x480 frames. Allocations are measured with
+tracemalloc, which sees every numpy/OpenCV output array.
+
+    python3 tests/bench_frame_path.py --frames 300
+"""
+
+import argparse
+import contextlib
+import io
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+import laser_tracker
+from laser_tracker import LaserTracker
+from synthetic_video import SyntheticCapture, SyntheticVideo  # tracking/, on the path via laser_tracker
+
+
+def legacy_process_frame(tracker):
+    """The original process_frame array handling: fresh read, flip and copy every frame"""
+    ret, frame = tracker.camera.read()
+    frame = cv2.flip(frame, 1)
+    h, w = frame.shape[:2]
+    with tracker.lock:
+        tracker.frame = frame.copy()
+        if tracker.tracking and tracker.tracker:
+            success, bbox = tracker.tracker.update(frame)
+            x, y, width, height = [int(v) for v in bbox]
+            cv2.rectangle(frame, (x, y), (x + width, y + height), (0, 255, 0), 3)
+    cv2.line(frame, (w//2 - 30, h//2), (w//2 + 30, h//2), (255, 0, 0), 2)
+    return frame
+
+
+def legacy_colour(camera, lower, upper):
+    ret, frame = camera.read()
+    frame = cv2.flip(frame, 1)
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    mask = cv2.inRange(hsv, lower, upper)
+    kernel = np.ones((5, 5), np.uint8)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    mask_small = cv2.resize(mask, (160, 120))
+    cv2.cvtColor(mask_small, cv2.COLOR_GRAY2BGR)
+
+
+class ColourBuffers:
+    """The cam_test.py loop body after: every output goes to a reused buffer"""
+
+    def __init__(self, camera):
+        self.camera = camera
+        self.kernel = np.ones((5, 5), np.uint8)
+        self.raw = None
+        self.frame = self.hsv = self.mask = self.mask_tmp = None
+        self.mask_small = np.empty((120, 160), np.uint8)
+        self.mask_color = np.empty((120, 160, 3), np.uint8)
+
+    def __call__(self, lower, upper):
+        ret, self.raw = self.camera.read(self.raw)
+        if self.frame is None:
+            self.frame = np.empty_like(self.raw)
+            self.hsv = np.empty_like(self.raw)
+            self.mask = np.empty(self.raw.shape[:2], np.uint8)
+            self.mask_tmp = np.empty(self.raw.shape[:2], np.uint8)
+        cv2.flip(self.raw, 1, dst=self.frame)
+        cv2.cvtColor(self.frame, cv2.COLOR_BGR2HSV, dst=self.hsv)
+        cv2.inRange(self.hsv, lower, upper, dst=self.mask)
+        cv2.morphologyEx(self.mask, cv2.MORPH_OPEN, self.kernel, dst=self.mask_tmp)
+        cv2.morphologyEx(self.mask_tmp, cv2.MORPH_CLOSE, self.kernel, dst=self.mask)
+        cv2.resize(self.mask, (160, 120), dst=self.mask_small)
+        cv2.cvtColor(self.mask_small, cv2.COLOR_GRAY2BGR, dst=self.mask_color)
+
+
+def measure(name, step, frames):
+    """Time per frame, plus peak bytes allocated while processing one frame (tracemalloc)"""
+    for _ in range(10):  # Warm up: first-frame buffer allocation is not steady state
+        step()
+    peaks = []
+    tracemalloc.start()
+    for _ in range(frames):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        step()
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    # Timing without tracemalloc overhead
+    start = time.perf_counter()
+    for _ in range(frames):
+        step()
+    per_frame = (time.perf_counter() - start) / frames
+    print(f"  {name:<10} {per_frame * 1000:7.3f} ms/frame   "
+          f"{np.median(peaks) / 1024:9.1f} KiB peak alloc/frame (median)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--no-track', action='store_true', help="Skip tracker.update (array path only)")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):  # Silence the tracker's startup banner
+        tracker = LaserTracker(camera=SyntheticCapture(SyntheticVideo(trajectory='linear')))
+    tracker.send_servo_command = lambda tilt, pan: None  # Simulation mode prints every command
+    tracker.process_frame()
+    if not args.no_track:
+        with contextlib.redirect_stdout(io.StringIO()):
+            tracker.start_tracking(320, 240)  # The clip's target starts centred
+
+    print("LaserTracker.process_frame" + ("" if args.no_track else f" (tracking, {laser_tracker.TRACKER_TYPE})"))
+    measure('before', lambda: legacy_process_frame(tracker), args.frames)
+    tracker.lock.holds.clear()  # The legacy path holds the lock across tracker.update
+    tracker.lock.waits.clear()
+    measure('after', tracker.process_frame, args.frames)
+    print(f"  lock       {tracker.lock_stats()}")
+
+    lower, upper = np.array([0, 100, 100]), np.array([10, 255, 255])
+    camera = SyntheticCapture(SyntheticVideo(trajectory='linear', target='color'))
+    after = ColourBuffers(camera)
+    print("cam_test colour mask")
+    measure('before', lambda: legacy_colour(camera, lower, upper), args.frames)
+    measure('after', lambda: after(lower, upper), args.frames)
+
+
+if __name__ == '__main__':
+    main()
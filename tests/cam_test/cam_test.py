@@ -1,18 +1,27 @@
 import cv2
 import numpy as np
-import serial
+import os
+import sys
 import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'tracking'))
+from servo_link import ServoChannel
+from color_tracker import ColorTracker, color_range, hue_range
+from metrics import SampledLog
+
+# Track this OpenCV hue (0-179) from the first frame instead of waiting for a click,
+# e.g. 0 for the red disc of tracking/synthetic_video.py run --headless --target color
+TRACK_HUE = os.environ.get('DISRUPTOR_TRACK_HUE')
 
 # Initialize Arduino serial connection
 # Change 'COM3' to your Arduino's COM port
 try:
-    arduino = serial.Serial('COM5', 9600, timeout=1)
-    time.sleep(2)
+    arduino = ServoChannel('COM5')
     print("✓ Connected to Arduino on COM5")
-except:
-    print("ERROR: Could not connect to Arduino!")
+except Exception:
+    print("⚠ Could not connect to Arduino! Running in SIMULATION mode")
     print("Check COM port in Arduino IDE under Tools > Port")
-    exit()
+    arduino = None
+log = SampledLog()  # Simulated servo output, at most once a second
 
 # Initialize webcam
 cap = cv2.VideoCapture(0)
@@ -35,10 +44,13 @@ prev_tilt = 90
 prev_pan = 90
 smooth_factor = 0.3
 
-# Color range (will be set when user presses 's')
-lower_color = None
-upper_color = None
+# Color range (will be set when user presses 's'); searched near the last position
+color_tracker = ColorTracker()
 color_selected = False
+if TRACK_HUE is not None:
+    color_tracker.set_color(*hue_range(int(TRACK_HUE)))
+    color_selected = True
+    print(f"✓ Tracking hue {TRACK_HUE}")
 
 def map_range(value, in_min, in_max, out_min, out_max):
     """Map value from one range to another"""
@@ -49,18 +61,6 @@ def smooth_angle(current, target, factor):
     """Smooth servo movement"""
     return int(current + (target - current) * factor)
 
-def select_color(frame, x, y):
-    """Select color from clicked position"""
-    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-    color = hsv[y, x]
-
-    # Create color range with tolerance
-    tolerance = 20
-    lower = np.array([max(0, color[0] - tolerance), 100, 100])
-    upper = np.array([min(179, color[0] + tolerance), 255, 255])
-
-    return lower, upper
-
 # Mouse callback for color selection
 click_x, click_y = -1, -1
 def mouse_callback(event, x, y, flags, param):
@@ -71,84 +71,73 @@ def mouse_callback(event, x, y, flags, param):
 cv2.namedWindow('Color Tracking - Servo Control')
 cv2.setMouseCallback('Color Tracking - Servo Control', mouse_callback)
 
+# Per-frame buffers: built on the first frame and reused, so the loop allocates no images
+raw = frame = None
+mask_small = np.empty((120, 160), np.uint8)
+mask_color = np.empty((120, 160, 3), np.uint8)
+
 while True:
-    ret, frame = cap.read()
+    ret, raw = cap.read(raw)
     if not ret:
         print("Failed to grab frame")
         break
 
-    frame = cv2.flip(frame, 1)
+    if frame is None or frame.shape != raw.shape:
+        frame = np.empty_like(raw)
+    cv2.flip(raw, 1, dst=frame)
     h, w, c = frame.shape
 
     # Handle mouse click for color selection
     if click_x != -1 and click_y != -1:
-        lower_color, upper_color = select_color(frame, click_x, click_y)
+        color_tracker.set_color(*color_range(frame, click_x, click_y))
         color_selected = True
         print(f"✓ Color selected at ({click_x}, {click_y})")
         click_x, click_y = -1, -1
 
-    if color_selected and lower_color is not None:
-        # Convert to HSV
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-
-        # Create mask for selected color
-        mask = cv2.inRange(hsv, lower_color, upper_color)
-
-        # Remove noise
-        kernel = np.ones((5, 5), np.uint8)
-        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
-        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
-
-        # Find contours
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        if contours:
-            # Find largest contour
-            largest_contour = max(contours, key=cv2.contourArea)
-            area = cv2.contourArea(largest_contour)
-
-            if area > 500:  # Minimum area threshold
-                # Get center of contour
-                M = cv2.moments(largest_contour)
-                if M["m00"] != 0:
-                    cx = int(M["m10"] / M["m00"])
-                    cy = int(M["m01"] / M["m00"])
-
-                    # Draw contour and center
-                    cv2.drawContours(frame, [largest_contour], -1, (0, 255, 0), 2)
-                    cv2.circle(frame, (cx, cy), 10, (0, 255, 0), -1)
-
-                    # Map position to servo angles
-                    target_pan = map_range(cx, 0, w, PAN_MIN, PAN_MAX)
-                    target_tilt = map_range(cy, 0, h, TILT_MAX, TILT_MIN)
-
-                    # Smooth movement
-                    prev_pan = smooth_angle(prev_pan, target_pan, smooth_factor)
-                    prev_tilt = smooth_angle(prev_tilt, target_tilt, smooth_factor)
-
-                    # Send to Arduino
-                    command = f"T{prev_tilt}P{prev_pan}\n"
-                    arduino.write(command.encode())
-
-                    # Display info
-                    cv2.putText(frame, f"Tilt: {prev_tilt}", (10, 30),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                    cv2.putText(frame, f"Pan: {prev_pan}", (10, 60),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                    cv2.putText(frame, f"Tracking at ({cx}, {cy})", (10, 90),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-                    cv2.putText(frame, "TRACKING", (10, h - 20),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+    if color_selected:
+        # HSV convert, threshold, clean and label, all within the search window
+        blob = color_tracker.update(frame)
+        wx, wy, ww, wh = color_tracker.window
+        cv2.rectangle(frame, (wx, wy), (wx + ww - 1, wy + wh - 1), (255, 255, 0), 1)
+
+        if blob:
+            cx, cy = blob.cx, blob.cy
+            bx, by, bw, bh = blob.bbox
+
+            # Draw blob and center
+            cv2.rectangle(frame, (bx, by), (bx + bw, by + bh), (0, 255, 0), 2)
+            cv2.circle(frame, (cx, cy), 10, (0, 255, 0), -1)
+
+            # Map position to servo angles
+            target_pan = map_range(cx, 0, w, PAN_MIN, PAN_MAX)
+            target_tilt = map_range(cy, 0, h, TILT_MAX, TILT_MIN)
+
+            # Smooth movement
+            prev_pan = smooth_angle(prev_pan, target_pan, smooth_factor)
+            prev_tilt = smooth_angle(prev_tilt, target_tilt, smooth_factor)
+
+            # Send to Arduino
+            if arduino:
+                arduino.send(prev_tilt, prev_pan)
             else:
-                cv2.putText(frame, "Object too small", (10, h - 20),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+                log(f"🎯 SIMULATED: Tilt={prev_tilt}° Pan={prev_pan}°")
+
+            # Display info
+            cv2.putText(frame, f"Tilt: {prev_tilt}", (10, 30),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            cv2.putText(frame, f"Pan: {prev_pan}", (10, 60),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            cv2.putText(frame, f"Tracking at ({cx}, {cy})", (10, 90),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+            cv2.putText(frame, "TRACKING", (10, h - 20),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
         else:
-            cv2.putText(frame, "Color not detected", (10, h - 20),
+            cv2.putText(frame, "Color not detected - widening search", (10, h - 20),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
 
-        # Show mask in corner
-        mask_small = cv2.resize(mask, (160, 120))
-        mask_color = cv2.cvtColor(mask_small, cv2.COLOR_GRAY2BGR)
+        # Show the search window's mask in corner
+        cv2.resize(color_tracker.window_mask, (160, 120), dst=mask_small)
+        cv2.cvtColor(mask_small, cv2.COLOR_GRAY2BGR, dst=mask_color)
         frame[10:130, w-170:w-10] = mask_color
     else:
         cv2.putText(frame, "Click on a COLORED OBJECT or press 's'", (10, 30),
@@ -171,17 +160,18 @@ while True:
         break
     elif key == ord('s'):
         # Select color at center of frame
-        lower_color, upper_color = select_color(frame, w//2, h//2)
+        color_tracker.set_color(*color_range(frame, w//2, h//2))
         color_selected = True
         print("✓ Color selected at center")
     elif key == ord('r'):
         color_selected = False
-        lower_color = None
-        upper_color = None
+        color_tracker.set_color(None, None)
         print("Color selection reset")
 
 # Cleanup
 cap.release()
 cv2.destroyAllWindows()
-arduino.close()
+if arduino:
+    print(f"Servo link: {arduino.stats()}")  # Command->ACK round trip, drops
+    arduino.close()
 print("\nProgram ended")
\ No newline at end of file
@@ -1,16 +1,22 @@
 import cv2
-import serial
+import os
+import sys
 import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'tracking'))
+from servo_link import ServoChannel
+from trackers import create_tracker, default_tracker
+
+TRACKER_TYPE = default_tracker('MIL')  # Override with DISRUPTOR_TRACKER=KCF etc.
 
 # Initialize Arduino serial connection
 # Change 'COM3' to your Arduino's COM port
 try:
-    arduino = serial.Serial('COM9', 9600, timeout=1)
-    time.sleep(2)  # Wait for Arduino to initialize
+    arduino = ServoChannel('COM9')  # Waits for the Arduino to reset
     print("✓ Connected to Arduino on COM9")
 except:
     print("ERROR: Could not connect to Arduino. Check COM port!")
     print("Find your COM port in Arduino IDE under Tools > Port")
+    arduino = None
     #exit()
 
 # Tracking variables
@@ -40,9 +46,9 @@ def smooth_angle(current, target, factor):
     return int(current + (target - current) * factor)
 
 def send_servo_command(tilt, pan):
-    """Send command to Arduino in T##P## format"""
-    command = f"T{tilt}P{pan}\n"
-    arduino.write(command.encode())
+    """Send target to Arduino (binary frame, see tracking/servo_link.py)"""
+    if arduino:
+        arduino.send(tilt, pan)
 
 def mouse_handler(event, x, y, flags, param):
     global drawing, ix, iy, bbox, tracker, tracking, temp_frame
@@ -68,7 +74,7 @@ def mouse_handler(event, x, y, flags, param):
             frame_copy = temp_frame.copy()
             cv2.rectangle(frame_copy, (x0, y0), (x0 + w, y0 + h), (0, 255, 0), 2)
             cv2.imshow('Object Tracking - Servo Control', frame_copy)
-            tracker = cv2.TrackerMIL_create()
+            tracker = create_tracker(TRACKER_TYPE)
             tracker.init(temp_frame, bbox)
             tracking = True
             print(f'✓ Tracker locked on target at ({x0}, {y0}, {w}, {h})')
@@ -170,5 +176,7 @@ while True:
 # Cleanup
 cap.release()
 cv2.destroyAllWindows()
-arduino.close()
+if arduino:
+    print(f"Servo link: {arduino.stats()}")  # Command->ACK round trip, drops
+    arduino.close()
 print("\nProgram ended")
\ No newline at end of file
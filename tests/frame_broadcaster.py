@@ -0,0 +1,302 @@
+"""
+Single-producer MJPEG broadcaster for the Flask tracker
+
+One background thread captures and tracks each frame once, then JPEG-encodes it
+once per stream level that has clients; every /video_feed client reads the
+newest encoding at its level. A slow client skips the frames it missed instead
+of stalling the producer or other clients.
+
+A level is a (quality, scale, frame step) rung of LEVELS. Each client starts at
+level 0 (full resolution, jpeg_quality, every frame). The time its socket write
+takes, relative to the time between its frames, is how busy its link is: above
+BUSY_HIGH it steps to a leaner level, below BUSY_LOW back up, at most once per
+ADAPT_INTERVAL. Clients at the same level share one encode.
+
+Encode time (per frame and per level), produced frames, frames each client
+skipped and each client's level are reported to tracking/metrics.py's REGISTRY.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tracking'))
+from metrics import REGISTRY, SampledLog
+
+# (JPEG quality, resolution scale, send every Nth frame), best first; level 0's quality is jpeg_quality
+LEVELS = (
+    (None, 1.0, 1),
+    (70, 1.0, 1),
+    (60, 0.75, 1),
+    (50, 0.5, 1),
+    (40, 0.5, 2),
+    (30, 0.25, 3),
+)
+BUSY_HIGH = 0.7        # Fraction of a client's frame interval spent writing; above it, go leaner
+BUSY_LOW = 0.25        # Below it, go back up a level
+ADAPT_INTERVAL = 1.0   # Seconds between level changes of one client
+SMOOTHING = 0.3        # Weight of the newest sample in the busy average
+
+
+class ClientRate:
+    """How busy one client's link is, and the stream level that fits it"""
+
+    def __init__(self, adaptive=True):
+        self.adaptive = adaptive
+        self.level = 0
+        self.busy = 0.0
+        self.last_start = None
+        self.changed = time.monotonic()
+        self.bytes = 0
+        self.write_seconds = 0.0
+
+    def sent(self, nbytes, start, end):
+        """Record one chunk written from start to end; returns the level for the next one"""
+        self.bytes += nbytes
+        self.write_seconds += end - start
+        if self.last_start is not None and start > self.last_start:
+            sample = min(1.0, (end - start) / (start - self.last_start))
+            self.busy += SMOOTHING * (sample - self.busy)
+        self.last_start = start
+        if self.adaptive and end - self.changed >= ADAPT_INTERVAL:
+            if self.busy > BUSY_HIGH and self.level < len(LEVELS) - 1:
+                self.level += 1
+            elif self.busy < BUSY_LOW and self.level > 0:
+                self.level -= 1
+            else:
+                return self.level
+            self.changed = end
+            self.busy = (BUSY_HIGH + BUSY_LOW) / 2  # Re-measure at the new level before moving again
+        return self.level
+
+    def drain_rate(self):
+        """Bytes per second the client's socket has accepted while being written to"""
+        return self.bytes / self.write_seconds if self.write_seconds else 0.0
+
+
+def frame_coordinates(data, size):
+    """Click (x, y) from a /click body, mapped from the client's possibly downscaled image to a (w, h) frame"""
+    x, y = int(data.get('x', 0)), int(data.get('y', 0))
+    width, height = data.get('width'), data.get('height')
+    if width and height and size:
+        x, y = x * size[0] // int(width), y * size[1] // int(height)
+    return x, y
+
+
+class FrameBroadcaster:
+    def __init__(self, produce, jpeg_quality=85, adaptive=True, registry=REGISTRY, release=None):
+        """produce: callable returning the next processed BGR frame (or None).
+        adaptive: False keeps every client at level 0, i.e. one encode per frame.
+        release: optional callable run once a produced frame is encoded; False (the frame
+        changed while being encoded, e.g. FrameRing.release()) drops that encode.
+        """
+        self.produce = produce
+        self.release = release
+        self.jpeg_quality = jpeg_quality
+        self.adaptive = adaptive
+        self.cond = threading.Condition()
+        self.variants = {}  # level -> (seq, multipart chunk) of the newest frame encoded at that level
+        self.seq = 0
+        self.subscribers = 0
+        self.level_clients = Counter()  # level -> connected clients at it
+        self.client_rates = {}  # metrics label -> ClientRate, for clients()
+        self.subscriptions = 0  # Subscriptions so far; numbers each client's metrics label
+        self.frames_skipped = 0  # Frames missed by slow subscribers, summed over all clients
+        self.running = False
+        self.thread = None
+        self.scaled = {}  # level -> reused resize buffer
+        self.listeners = []  # Called from the producer thread after each published frame (and on stop)
+        self.log = SampledLog()
+
+        self.encode_seconds = registry.histogram(
+            'tracker_stage_seconds', "Seconds spent per frame in each frame path stage", label='stage').labels('encode')
+        self.level_seconds = registry.histogram('tracker_encode_seconds', "Resize + JPEG encode time per stream level",
+                                                label='level')
+        self.frames = registry.counter('tracker_frames_total', "Frames captured, processed and encoded").labels()
+        self.dropped = registry.counter('tracker_frames_dropped_total',
+                                        "Frames skipped by slow clients, summed over all clients").labels()
+        self.client_dropped = registry.counter('tracker_client_frames_dropped_total',
+                                               "Frames skipped by each connected client", label='client')
+        self.client_level = registry.gauge('tracker_client_level', "Stream level (index into LEVELS) of each client",
+                                           label='client')
+        self.connected = registry.gauge('tracker_clients', "Connected /video_feed clients").labels()
+
+    def start(self):
+        with self.cond:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._run, name='frame-broadcaster', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        self._notify()
+        if self.thread:
+            self.thread.join(timeout=2)
+
+    def _encode(self, frame, level):
+        """One multipart chunk of frame at level"""
+        quality, scale, _ = LEVELS[level]
+        if scale != 1.0:
+            h, w = frame.shape[:2]
+            size = (max(1, int(w * scale)), max(1, int(h * scale)))
+            buf = self.scaled.get(level)
+            if buf is None or buf.shape[1::-1] != size:
+                buf = None
+            frame = self.scaled[level] = cv2.resize(frame, size, dst=buf, interpolation=cv2.INTER_AREA)
+        ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality or self.jpeg_quality])
+        if not ret:
+            return None
+        return (b'--frame\r\n'
+                b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+
+    def _run(self):
+        while True:
+            with self.cond:
+                # Idle (camera untouched) while nobody is watching
+                self.cond.wait_for(lambda: self.subscribers > 0 or not self.running)
+                if not self.running:
+                    return
+                seq = self.seq + 1
+                # Only levels someone is at, and only on the frames that level sends
+                levels = [level for level, n in self.level_clients.items() if n and seq % LEVELS[level][2] == 0]
+            try:
+                frame = self.produce()
+                if frame is None:
+                    time.sleep(0.005)
+                    continue
+                encoded = {}
+                total = time.perf_counter()
+                for level in levels:
+                    start = time.perf_counter()
+                    chunk = self._encode(frame, level)
+                    self.level_seconds.labels(level).observe(time.perf_counter() - start)
+                    if chunk is not None:
+                        encoded[level] = (seq, chunk)
+                self.encode_seconds.observe(time.perf_counter() - total)
+                if self.release is not None and not self.release():
+                    continue
+            except Exception as e:
+                self.log(f"Broadcaster error: {e}")
+                time.sleep(0.1)
+                continue
+            with self.cond:
+                self.variants.update(encoded)
+                self.seq = seq
+                self.cond.notify_all()
+            self._notify()
+            self.frames.inc()
+
+    def _notify(self):
+        for listener in self.listeners:
+            listener()
+
+    def _set_level(self, old, new):
+        """Move one client between levels; called with self.cond held"""
+        self.level_clients[old] -= 1
+        self.level_clients[new] += 1
+
+    def clients(self):
+        """Per connected client: level, its (quality, scale, frame step), link busy fraction and drain rate"""
+        with self.cond:
+            rates = list(self.client_rates.items())
+        return [{'client': label, 'level': r.level, 'quality': LEVELS[r.level][0] or self.jpeg_quality,
+                 'scale': LEVELS[r.level][1], 'every': LEVELS[r.level][2], 'busy': round(r.busy, 3),
+                 'drain_kib_s': round(r.drain_rate() / 1024, 1)} for label, r in rates]
+
+    def join(self, client=None):
+        """Register one /video_feed client (client: name for its metrics label); starts the producer"""
+        self.start()
+        return Subscription(self, client)
+
+    def subscribe(self, timeout=2.0, client=None):
+        """Generator of multipart MJPEG chunks for one client (client: name for its metrics label)"""
+        sub = self.join(client)
+        try:
+            while True:
+                with self.cond:
+                    if not self.cond.wait_for(lambda: sub.ready() or not self.running, timeout):
+                        continue
+                    if not self.running:
+                        return
+                    chunk = sub.take()
+                # Socket write happens outside the lock so a slow client
+                # never holds up the producer or other clients. The generator
+                # resumes once the server has written the chunk.
+                start = time.perf_counter()
+                yield chunk
+                sub.sent(len(chunk), start, time.perf_counter())
+        finally:
+            sub.close()
+
+
+class Subscription:
+    """One client's place in a FrameBroadcaster: its level, the last frame it got and its metrics.
+
+    subscribe() drives one from a server thread; async_server.py drives one from a coroutine.
+    """
+
+    def __init__(self, broadcaster, client=None):
+        self.broadcaster = b = broadcaster
+        self.rate = ClientRate(b.adaptive)
+        with b.cond:
+            b.subscribers += 1
+            b.subscriptions += 1
+            self.label = f"{client} #{b.subscriptions}" if client else f"#{b.subscriptions}"
+            b.client_rates[self.label] = self.rate
+            b.level_clients[self.rate.level] += 1
+            b.connected.set(b.subscribers)
+            b.cond.notify_all()
+            self.last_seq = b.seq
+        self.dropped = b.client_dropped.labels(self.label)
+        self.level_gauge = b.client_level.labels(self.label)
+        self.level_gauge.set(self.rate.level)
+
+    def ready(self):
+        """A frame newer than the last one taken is waiting at this client's level; call with cond held"""
+        return self.broadcaster.variants.get(self.rate.level, (0, None))[0] > self.last_seq
+
+    def take(self):
+        """Newest chunk at this client's level, counting the frames it skipped; call with cond held, after ready()"""
+        b = self.broadcaster
+        level = self.rate.level
+        seq, chunk = b.variants[level]
+        # Frames beyond the ones this level skips on purpose
+        skipped = (seq - self.last_seq) // LEVELS[level][2] - 1
+        if skipped > 0:
+            b.frames_skipped += skipped
+            b.dropped.inc(skipped)
+            self.dropped.inc(skipped)
+        self.last_seq = seq
+        return chunk
+
+    def poll(self):
+        """take() if a newer frame is waiting, else None; never blocks on more than the lock"""
+        with self.broadcaster.cond:
+            return self.take() if self.ready() else None
+
+    def sent(self, nbytes, start, end):
+        """Record one chunk written from start to end; moves the client to the level that fits its link"""
+        level = self.rate.level
+        new_level = self.rate.sent(nbytes, start, end)
+        if new_level != level:
+            with self.broadcaster.cond:
+                self.broadcaster._set_level(level, new_level)
+            self.level_gauge.set(new_level)
+
+    def close(self):
+        b = self.broadcaster
+        with b.cond:
+            b.subscribers -= 1
+            b.level_clients[self.rate.level] -= 1
+            del b.client_rates[self.label]
+            b.connected.set(b.subscribers)
+        b.client_dropped.remove(self.label)
+        b.client_level.remove(self.label)
@@ -1,4 +1,4 @@
-import RPi.GPIO as GPIO
+from hal import GPIO
 import time
 from utils import detect_signal
 from drivers import EmitterDriver
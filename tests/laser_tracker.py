@@ -0,0 +1,491 @@
+"""
+LaserTracker: camera capture, click-to-track and servo output for the laptop tracker UI (test.py)
+"""
+
+import cv2
+import time
+import numpy as np
+from collections import deque, namedtuple
+from threading import Lock
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tracking'))
+from servo_link import ServoChannel, SERVO_BAUD, percentiles
+from trackers import default_tracker
+from scaled_tracker import make_tracker
+from session_log import SessionRecorder
+from metrics import REGISTRY, SampledLog
+
+# Configuration - LAPTOP MODE
+USE_ARDUINO = False  # Set to True if Arduino is connected
+ARDUINO_PORT = 'COM5'  # Windows: COM5, Linux/Mac: /dev/ttyACM0
+ARDUINO_BAUD = SERVO_BAUD  # Binary servo protocol (tracking/servo_link.py)
+CAMERA_INDEX = 0  # Laptop webcam
+FRAME_WIDTH = 640
+FRAME_HEIGHT = 480
+
+# Servo limits
+TILT_MIN, TILT_MAX = 0, 180
+PAN_MIN, PAN_MAX = 0, 180
+
+# Tracking parameters
+SMOOTH_FACTOR = 0.3
+TRACKER_TYPE = default_tracker('CSRT')  # CSRT, KCF, MOSSE, MEDIANFLOW, MIL...; see tracking/trackers.py
+TRACK_MODE = 'full'  # 'scale' / 'roi': track a downscaled frame / a crop around the target
+TRACK_BUDGET = 1 / 30  # Seconds per tracker update that 'scale'/'roi' adapt toward
+LOG_INTERVAL = 1.0  # Seconds between printed per-frame messages (simulated servo output, send errors)
+PREDICT_FRAMES = 1  # Frames ahead the predicted centre in track_state() is extrapolated (display latency)
+# Session frames: 'jpeg' (compact) or 'raw' (bit-exact replay); see session_recorder()
+RECORD_FORMAT = os.environ.get('DISRUPTOR_RECORD_FORMAT', 'jpeg')
+
+# What process_frame draws from: copied out of the lock, rendered outside it.
+# status is 'idle', 'tracking' or 'lost' (tracker failed on this frame)
+TrackState = namedtuple('TrackState', 'status bbox predicted pan tilt')
+
+# Per-stage frame path timings, served on test.py's /metrics (FrameBroadcaster adds 'encode')
+STAGES = ('capture', 'flip', 'update', 'overlay', 'serial')
+STAGE_SECONDS = REGISTRY.histogram('tracker_stage_seconds', "Seconds spent per frame in each frame path stage",
+                                   label='stage')
+
+
+class TimedLock:
+    """Lock that records how long each holder waited for it and how long it held it"""
+
+    def __init__(self, history=1000):
+        self._lock = Lock()
+        self.waits = deque(maxlen=history)  # Seconds; only appended while holding _lock
+        self.holds = deque(maxlen=history)
+        self.acquired = 0
+        self._since = 0.0
+
+    def __enter__(self):
+        start = time.perf_counter()
+        self._lock.acquire()
+        self._since = time.perf_counter()
+        self.waits.append(self._since - start)
+        self.acquired += 1
+        return self
+
+    def __exit__(self, *exc):
+        self.holds.append(time.perf_counter() - self._since)
+        self._lock.release()
+
+    def stats(self):
+        """Acquisition count plus hold/wait percentiles in ms over the recent history"""
+        with self._lock:
+            holds = [h * 1000 for h in self.holds]
+            waits = [w * 1000 for w in self.waits]
+            out = {'acquired': self.acquired}
+        out.update({f'hold_{k}_ms': round(v, 4) for k, v in percentiles(holds).items()})
+        out.update({f'wait_{k}_ms': round(v, 4) for k, v in percentiles(waits).items()})
+        if holds:
+            out['hold_max_ms'] = round(max(holds), 4)
+        return out
+
+
+class OverlayLayer:
+    """Static overlay rendered once, then stamped onto each frame through its mask"""
+
+    def __init__(self, shape, draw):
+        canvas = np.zeros(shape, np.uint8)
+        draw(canvas)
+        mask = canvas.any(axis=2).astype(np.uint8)
+        x, y, w, h = cv2.boundingRect(mask)
+        # Keep only the drawn region so apply() touches a small patch, not the whole frame
+        self.roi = (slice(y, y + h), slice(x, x + w))
+        self.patch = canvas[self.roi].copy()
+        self.mask = mask[self.roi][:, :, None].astype(bool)
+
+    def apply(self, frame):
+        np.copyto(frame[self.roi], self.patch, where=self.mask)
+
+
+def session_recorder(path, frame_format=RECORD_FORMAT):
+    """SessionRecorder for a LaserTracker session, replayable with tests/replay_session.py"""
+    return SessionRecorder(path, meta={'source': 'laser_tracker', 'tracker': TRACKER_TYPE, 'mode': TRACK_MODE},
+                           frame_format=frame_format)
+
+
+class LaserTracker:
+    def __init__(self, camera=None, recorder=None, overlays=True):
+        """camera: any object with VideoCapture's read()/isOpened()/release(); defaults to CAMERA_INDEX.
+        recorder: optional SessionRecorder that gets every camera frame, click, stop, centre and servo command.
+        overlays: False returns clean frames; the browser draws them from track_state() (async_server.py).
+        """
+        # Initialize Arduino (optional for testing)
+        self.arduino = None
+        if USE_ARDUINO:
+            try:
+                self.arduino = ServoChannel(ARDUINO_PORT, ARDUINO_BAUD)
+                print(f"✓ Connected to Arduino on {ARDUINO_PORT}")
+            except Exception as e:
+                print(f"⚠ Arduino not connected: {e}")
+                print("  Running in SIMULATION mode")
+        else:
+            print("⚠ Arduino disabled - Running in SIMULATION mode")
+
+        # Initialize camera
+        if camera is None:
+            camera = cv2.VideoCapture(CAMERA_INDEX)
+            camera.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
+            camera.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
+        self.camera = camera
+
+        # Verify camera opened
+        if not self.camera.isOpened():
+            print("ERROR: Could not open camera!")
+            raise Exception("Camera initialization failed")
+
+        # Tracking state
+        self.tracker = None
+        self.tracking = False
+        self.bbox = None
+        self.center = None  # Target centre on the previous tracked frame, for the velocity estimate
+        self.predicted = None
+        self.frame = None  # Latest clean (overlay-free) frame, for tracker init on click
+        self.frame_number = 0  # Recorder's number for self.frame (0 when not recording)
+        self.recorder = recorder
+        self.track_id = 0  # Bumped whenever the tracker is replaced or stopped
+        self.track_source = None  # (x, y, frame number) the current tracker was initialised at
+        self.seen_track_id = 0  # Newest track_id process_frame has acted on (and recorded)
+        self.updating = False  # A tracker is updating on the published frame; its state not yet applied
+        self.frame_id = 0  # Frames processed so far; identifies each track_state()
+        self.state = None  # track_state() of the newest frame, replaced whole each frame
+        self.overlays = overlays
+        # Guards only the tracking state above, self.frame and the servo angles; never
+        # held across tracker.update/init, drawing or serial I/O
+        self.lock = TimedLock()
+
+        # Reused per-frame buffers, built on the first frame (see _allocate_buffers)
+        self.raw = None
+        self.clean = None
+        self.back = 0
+        self.out = None
+        self.layers = {}  # Pre-rendered static overlays (see _build_layers)
+        self.timings = {stage: STAGE_SECONDS.labels(stage) for stage in STAGES}
+        self.log = SampledLog(LOG_INTERVAL)  # Per-frame console output, rate-limited
+
+        # Servo positions
+        self.prev_pan = 90
+        self.prev_tilt = 90
+
+        print("✓ Laptop camera initialized")
+        print(f"✓ Tracker type: {TRACKER_TYPE}")
+        print(f"✓ Resolution: {FRAME_WIDTH}x{FRAME_HEIGHT}")
+
+    def create_tracker(self):
+        """Create OpenCV tracker based on type (falls back if this OpenCV build lacks it)"""
+        return make_tracker(TRACKER_TYPE, TRACK_MODE, TRACK_BUDGET, previous=self.tracker)
+
+    def start_tracking(self, x, y, width=80, height=80):
+        """Initialize tracking at clicked position"""
+        prepared = self.prepare_tracker(x, y, width, height)
+        if prepared is None:
+            print("✗ Failed to initialize tracker")
+            return False
+        with self.lock:
+            self._set_tracker(*prepared)
+        print(f"✓ Tracking started at ({x}, {y})")
+        return True
+
+    def prepare_tracker(self, x, y, width=80, height=80, frame=None):
+        """Tracker initialised on the newest frame around (x, y), not yet installed.
+
+        frame: initialise on this clean (mirrored) frame instead, unrecorded (tests/replay_session.py).
+        Returns (tracker, bbox, (x, y, frame number)) or None if there is no frame or init failed.
+        """
+        number = None
+        if frame is None:
+            with self.lock:
+                if self.frame is None:
+                    return None
+                # Copy: the published buffer is refilled two frames from now, and tracker
+                # init can take longer than that
+                frame = self.frame.copy()
+                number = self.frame_number
+            if self.recorder:
+                self.recorder.click(x, y, number)
+
+        # Define bounding box around click point
+        h, w = frame.shape[:2]
+        x1 = max(0, x - width//2)
+        y1 = max(0, y - height//2)
+        x2 = min(w, x + width//2)
+        y2 = min(h, y + height//2)
+        bbox = (x1, y1, x2-x1, y2-y1)
+
+        # Initialize tracker outside the lock; the video loop keeps running meanwhile
+        tracker = self.create_tracker()
+        if not tracker.init(frame, bbox):
+            return None
+        return tracker, bbox, (x, y, number)
+
+    def _set_tracker(self, tracker, bbox=None, source=None):
+        """Install a prepared tracker, or stop with None; called with self.lock held"""
+        self.tracker = tracker
+        self.tracking = tracker is not None
+        self.bbox = bbox
+        self.track_source = source
+        self.center = self.predicted = None
+        self.track_id += 1
+
+    def stop_tracking(self):
+        """Stop tracking"""
+        with self.lock:
+            self._set_tracker(None)
+            number = self.frame_number
+        if self.recorder:
+            self.recorder.stop(number)
+        print("✓ Tracking stopped")
+
+    def center_servos(self):
+        """Point both servos at 90°"""
+        with self.lock:
+            self.prev_pan = 90
+            self.prev_tilt = 90
+            number = self.frame_number
+            during = self.updating
+        if self.recorder:
+            self.recorder.center(number, during)
+        self.send_servo_command(90, 90)
+
+    def frame_size(self):
+        """(width, height) of processed frames, None before the first one"""
+        return None if self.out is None else self.out.shape[1::-1]
+
+    def track_state(self):
+        """Tracking state of the newest frame as a JSON-able dict, None before the first frame:
+        frame id, frame size, status, bbox, centre, predicted centre and servo angles
+        """
+        return self.state
+
+    def lock_stats(self):
+        """Hold/wait times of self.lock, to check nothing slow runs under it"""
+        return self.lock.stats()
+
+    def map_range(self, value, in_min, in_max, out_min, out_max):
+        """Map value from one range to another"""
+        value = max(in_min, min(in_max, value))
+        return int((value - in_min) * (out_max - out_min) / (in_max - in_min) + out_min)
+
+    def smooth_angle(self, current, target, factor):
+        """Smooth servo movement"""
+        return int(current + (target - current) * factor)
+
+    def send_servo_command(self, tilt, pan):
+        """Send servo angles to Arduino"""
+        if self.arduino and self.arduino.is_open:
+            try:
+                self.arduino.send(tilt, pan)  # Newest target wins; no-op repeats are skipped
+            except Exception as e:
+                self.log(f"Error sending command: {e}")
+        else:
+            # Simulation mode - print a sample; printing every frame costs more than tracking
+            self.log(f"🎯 SIMULATED: Tilt={tilt}° Pan={pan}°")
+
+    def _allocate_buffers(self, shape):
+        """Build the per-frame buffers once; rebuilt only if the camera resolution changes"""
+        self.raw = np.empty(shape, np.uint8)  # camera.read() target
+        # Double-buffered clean frame: one is published as self.frame, the other is filled
+        self.clean = [np.empty(shape, np.uint8), np.empty(shape, np.uint8)]
+        self.back = 0
+        self.out = np.empty(shape, np.uint8)  # Clean frame + overlays, returned to the caller
+        self._build_layers(shape)
+
+    def _build_layers(self, shape):
+        """Pre-render the overlays that never change between frames"""
+        h, w = shape[:2]
+
+        def crosshair(img):
+            cv2.line(img, (w//2 - 30, h//2), (w//2 + 30, h//2), (255, 0, 0), 2)
+            cv2.line(img, (w//2, h//2 - 30), (w//2, h//2 + 30), (255, 0, 0), 2)
+            cv2.circle(img, (w//2, h//2), 5, (255, 0, 0), -1)
+
+        def idle(img):
+            cv2.putText(img, "Click on object to track", (10, 40),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 0), 2)
+            cv2.putText(img, "Laptop Camera Mode", (10, 80),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+
+        def lost(img):
+            cv2.putText(img, "⚠ TRACKING LOST", (10, 40),
+                       cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 3)
+            cv2.putText(img, "Click to re-track", (10, 80),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
+
+        def tracking(img):
+            cv2.putText(img, f"🎯 TRACKING", (10, 40),
+                       cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 3)
+            # Mode indicator
+            mode_text = "ARDUINO" if self.arduino else "SIMULATION"
+            cv2.putText(img, mode_text, (w - 180, 40),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+
+        self.layers = {name: OverlayLayer(shape, draw) for name, draw in
+                       (('crosshair', crosshair), ('idle', idle), ('lost', lost), ('tracking', tracking))}
+
+    def _track_change(self):
+        """(track_id, source) if the tracker changed since process_frame last looked, else None; lock held"""
+        if self.track_id == self.seen_track_id:
+            return None
+        self.seen_track_id = self.track_id
+        return self.track_id, self.track_source
+
+    def _update_state(self, track_id, success, bbox, w, h):
+        """Apply one tracker.update result and return the frame's status.
+
+        Called with self.lock held, so arithmetic only.
+        """
+        if track_id != self.track_id:
+            # Tracker was replaced or stopped while update ran; its result is stale
+            return 'tracking' if self.tracking else 'idle'
+        if not success:
+            self.tracking = False
+            return 'lost'
+        x, y, width, height = [int(v) for v in bbox]
+        self.bbox = (x, y, width, height)
+
+        # Constant-velocity guess of where the centre is PREDICT_FRAMES on
+        cx, cy = x + width // 2, y + height // 2
+        if self.center is not None:
+            vx, vy = cx - self.center[0], cy - self.center[1]
+            self.predicted = (cx + vx * PREDICT_FRAMES, cy + vy * PREDICT_FRAMES)
+        self.center = (cx, cy)
+
+        # Map center to servo angles
+        target_pan = self.map_range(x + width // 2, 0, w, PAN_MIN, PAN_MAX)
+        target_tilt = self.map_range(y + height // 2, 0, h, TILT_MAX, TILT_MIN)
+
+        # Smooth movement
+        self.prev_pan = self.smooth_angle(self.prev_pan, target_pan, SMOOTH_FACTOR)
+        self.prev_tilt = self.smooth_angle(self.prev_tilt, target_tilt, SMOOTH_FACTOR)
+        return 'tracking'
+
+    def _draw_overlays(self, frame, state):
+        """Render one TrackState onto frame; runs outside the lock"""
+        h, w = frame.shape[:2]
+        if state.status == 'tracking':
+            # Draw bounding box
+            x, y, width, height = state.bbox
+            cv2.rectangle(frame, (x, y), (x + width, y + height), (0, 255, 0), 3)
+
+            # Calculate center
+            cx = x + width // 2
+            cy = y + height // 2
+            cv2.circle(frame, (cx, cy), 8, (0, 255, 0), -1)
+            cv2.circle(frame, (cx, cy), 15, (0, 255, 0), 2)
+
+            # Draw line from center to target
+            cv2.line(frame, (w//2, h//2), (cx, cy), (0, 255, 0), 2)
+
+            # Display info
+            self.layers['tracking'].apply(frame)
+            cv2.putText(frame, f"Pan: {state.pan}° | Tilt: {state.tilt}°", (10, 80),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            cv2.putText(frame, f"Target: ({cx}, {cy})", (10, 110),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+            cv2.putText(frame, f"Size: {width}x{height}", (10, 140),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+        else:
+            self.layers[state.status].apply(frame)
+
+        # Crosshair at center
+        self.layers['crosshair'].apply(frame)
+
+    def process_frame(self):
+        """Main processing loop for each frame.
+
+        Steady state allocates no frame-sized arrays: capture, flip and the
+        overlay copy all write into reused buffers. The returned frame is
+        overwritten by the next call. self.lock is taken twice, each time
+        only to swap a few fields: tracker.update, the servo write and all
+        drawing happen outside it. Each stage's duration goes to self.timings.
+        With overlays off nothing is drawn or copied: the clean frame is
+        returned and self.state carries what the overlays would show.
+        """
+        timings = self.timings
+        start = time.perf_counter()
+        ret, raw = self.camera.read(self.raw)
+        timings['capture'].observe(time.perf_counter() - start)
+        if not ret:
+            return None
+        if self.out is None or raw.shape != self.out.shape:
+            self._allocate_buffers(raw.shape)
+        self.raw = raw  # Backends that ignore the buffer still hand theirs back for reuse
+        number = self.recorder.image(raw) if self.recorder else 0
+
+        start = time.perf_counter()
+        clean = self.clean[self.back]
+        cv2.flip(raw, 1, dst=clean)  # Mirror for intuitive control
+        frame = self.out
+        if self.overlays:
+            np.copyto(frame, clean)
+        h, w = frame.shape[:2]
+        timings['flip'].observe(time.perf_counter() - start)
+
+        with self.lock:
+            # Publish the filled buffer; the other one is written next frame. start_tracking
+            # only reads self.frame under this lock, so it never sees a half-written frame.
+            self.frame = clean
+            self.frame_number = number
+            tracker = self.tracker if self.tracking else None
+            track_id = self.track_id
+            change = self._track_change()
+            self.updating = tracker is not None
+            state = TrackState('idle', None, None, self.prev_pan, self.prev_tilt)
+        self.back ^= 1
+        self.frame_id += 1
+        if change and self.recorder:
+            self.recorder.track(number, *change, phase=0)
+
+        if tracker is not None:
+            # Update tracker; an installed tracker is only ever used from this thread
+            start = time.perf_counter()
+            success, bbox = tracker.update(clean)
+            timings['update'].observe(time.perf_counter() - start)
+            with self.lock:
+                status = self._update_state(track_id, success, bbox, w, h)
+                self.updating = False
+                state = TrackState(status, self.bbox, self.predicted, self.prev_pan, self.prev_tilt)
+                change = self._track_change()
+            if change and self.recorder:
+                # Changed during update: this frame's result was discarded, the next frame uses it
+                self.recorder.track(number, *change, phase=1)
+
+        if state.status == 'tracking':
+            # Send to Arduino
+            if self.recorder:
+                self.recorder.servo(state.tilt, state.pan, number)
+            start = time.perf_counter()
+            self.send_servo_command(state.tilt, state.pan)
+            timings['serial'].observe(time.perf_counter() - start)
+        self.state = self._state_message(state, w, h)
+        if not self.overlays:
+            return clean  # Encoded before the next call refills it, like self.out
+        start = time.perf_counter()
+        self._draw_overlays(frame, state)
+        timings['overlay'].observe(time.perf_counter() - start)
+        return frame
+
+    def _state_message(self, state, w, h):
+        """track_state() dict for one frame's TrackState"""
+        tracked = state.status == 'tracking'
+        x, y, width, height = state.bbox if tracked else (0, 0, 0, 0)
+        return {'frame': self.frame_id, 'width': w, 'height': h, 'status': state.status,
+                'bbox': [x, y, width, height] if tracked else None,
+                'center': [x + width // 2, y + height // 2] if tracked else None,
+                'predicted': list(state.predicted) if tracked and state.predicted else None,
+                'pan': state.pan, 'tilt': state.tilt, 'servo': 'ARDUINO' if self.arduino else 'SIMULATION'}
+
+    def cleanup(self):
+        """Release resources"""
+        self.camera.release()
+        if self.arduino and self.arduino.is_open:
+            print(f"✓ Servo link: {self.arduino.stats()}")
+            self.arduino.close()
+        print(f"✓ Tracker lock: {self.lock_stats()}")
+        print("✓ Frame path: " + "; ".join(f"{stage} {hist.summary()}" for stage, hist in self.timings.items()))
+        if self.recorder:
+            self.recorder.close()
+            print(f"✓ Session saved to {self.recorder.path} ({self.recorder.frames} frames)")
+        print("✓ Resources released")
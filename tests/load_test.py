@@ -0,0 +1,213 @@
+"""
+Load test for the tracker web UI: many /video_feed viewers plus timed control requests
+
+Opens --viewers concurrent MJPEG streams and, alongside them, sends a steady
+cycle of /click, /stop and /center requests over one keep-alive connection
+(--ws: as commands on the /ws control channel of the asyncio server, timed
+from send to ack). Reports frames per second each viewer received and
+control request latency, plus the rate of /ws state messages.
+Some viewers can be throttled (--slow, --slow-kib) to read like a phone on a
+weak link, which is what makes a thread-per-viewer server stall.
+
+Point it at either server mode, fed by the synthetic camera so runs compare:
+
+    python3 tracking/synthetic_video.py run tests/test.py --fps 30            # Flask, threads
+    python3 tracking/synthetic_video.py run tests/test.py --fps 30 --async    # asyncio
+    python3 tests/load_test.py --viewers 50 --slow 10 --seconds 20
+    python3 tests/load_test.py --viewers 50 --ws
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import time
+from urllib.parse import urlsplit
+
+from async_server import OP_CLOSE, OP_PING, OP_PONG, OP_TEXT, ws_accept, ws_frame, ws_read
+from servo_link import percentiles  # tracking/, on the path via async_server
+
+BOUNDARY = b'--frame'
+READ_SIZE = 16 * 1024
+
+
+class Viewer:
+    """One /video_feed stream; counts frame boundaries as they arrive"""
+
+    def __init__(self, host, port, kib_per_second=None):
+        self.host = host
+        self.port = port
+        self.delay = READ_SIZE / (kib_per_second * 1024) if kib_per_second else 0.0
+        self.frames = 0
+        self.bytes = 0
+        self.first = self.last = None
+        self.error = None
+
+    async def run(self, stop):
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        except OSError as e:
+            self.error = str(e)
+            return
+        try:
+            writer.write(f"GET /video_feed HTTP/1.1\r\nHost: {self.host}\r\n\r\n".encode())
+            await reader.readuntil(b'\r\n\r\n')
+            tail = b''
+            while not stop.is_set():
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    self.error = 'closed by server'
+                    break
+                now = time.perf_counter()
+                self.bytes += len(data)
+                # A boundary split over two reads is found in tail + data
+                found = (tail + data).count(BOUNDARY)
+                if found:
+                    self.frames += found
+                    self.first = self.first or now
+                    self.last = now
+                tail = data[-(len(BOUNDARY) - 1):]
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+        except (OSError, asyncio.IncompleteReadError) as e:
+            self.error = str(e) or type(e).__name__
+        finally:
+            writer.close()
+
+    def fps(self):
+        if self.frames < 2 or self.last <= self.first:
+            return 0.0
+        return (self.frames - 1) / (self.last - self.first)
+
+
+async def control_loop(host, port, interval, stop, latencies, click):
+    """Cycle click/stop/center requests every interval; latencies: route -> list of seconds"""
+    reader, writer = await asyncio.open_connection(host, port)
+    cycle = [('/click', json.dumps({'x': click[0], 'y': click[1]})), ('/stop', ''), ('/center', '')]
+    i = 0
+    try:
+        while not stop.is_set():
+            path, body = cycle[i % len(cycle)]
+            i += 1
+            request = (f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                       f"Content-Length: {len(body)}\r\n\r\n{body}").encode()
+            start = time.perf_counter()
+            writer.write(request)
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = 0
+            for line in head.split(b'\r\n'):
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':', 1)[1])
+            await reader.readexactly(length)
+            latencies.setdefault(path, []).append(time.perf_counter() - start)
+            if head.startswith(b'HTTP/1.0') or b'connection: close' in head.lower():  # Werkzeug: one per connection
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+            await asyncio.sleep(interval)
+    finally:
+        writer.close()
+
+
+async def ws_control_loop(host, port, interval, stop, latencies, click, states):
+    """control_loop over /ws; states: [state messages received]"""
+    reader, writer = await asyncio.open_connection(host, port)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write((f"GET /ws HTTP/1.1\r\nHost: {host}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                  f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = head.split(b'\r\n', 1)[0].decode()
+    if ' 101 ' not in status or ws_accept(key).encode() not in head:
+        raise ConnectionError(f"No WebSocket upgrade: {status}")
+    cycle = [('click', {'x': click[0], 'y': click[1]}), ('stop', {}), ('center', {})]
+    i = 0
+    try:
+        while not stop.is_set():
+            name, body = cycle[i % len(cycle)]
+            i += 1
+            start = time.perf_counter()
+            writer.write(ws_frame(json.dumps(dict(body, cmd=name, id=i)), mask=os.urandom(4)))
+            while True:  # State messages keep arriving while the ack is on its way
+                opcode, payload = await ws_read(reader, limit=1 << 20)
+                if opcode == OP_CLOSE:
+                    raise ConnectionError("Server closed the control channel")
+                if opcode == OP_PING:
+                    writer.write(ws_frame(payload, OP_PONG, mask=os.urandom(4)))
+                if opcode != OP_TEXT:
+                    continue
+                msg = json.loads(payload)
+                if msg['type'] == 'state':
+                    states[0] += 1
+                elif msg['type'] == 'ack' and msg['id'] == i:
+                    break
+            latencies.setdefault('/' + name, []).append(time.perf_counter() - start)
+            await asyncio.sleep(interval)
+    finally:
+        writer.close()
+
+
+async def run(args):
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    stop = asyncio.Event()
+    viewers = [Viewer(host, port, args.slow_kib if i < args.slow else None) for i in range(args.viewers)]
+    tasks = [asyncio.create_task(v.run(stop)) for v in viewers]
+    await asyncio.sleep(args.warmup)  # Let every stream connect before timing control requests
+    latencies, states = {}, [0]
+    if args.ws:
+        control = asyncio.create_task(ws_control_loop(host, port, args.interval, stop, latencies, args.click, states))
+    else:
+        control = asyncio.create_task(control_loop(host, port, args.interval, stop, latencies, args.click))
+    await asyncio.sleep(args.seconds)
+    stop.set()
+    await asyncio.wait(tasks + [control], timeout=5)
+    for task in tasks + [control]:
+        task.cancel()
+    if control.done() and not control.cancelled() and control.exception():
+        print(f"⚠ Control requests failed: {control.exception()}")
+    return viewers, latencies, states[0]
+
+
+def report(viewers, latencies, seconds, slow, states=None):
+    def line(name, group):
+        rates = [v.fps() for v in group]
+        if not rates:
+            return
+        kib = sum(v.bytes for v in group) / 1024 / seconds
+        errors = sum(v.error is not None for v in group)
+        print(f"  {name:<6} {len(group):4d} viewers  fps min {min(rates):5.1f}  mean {sum(rates) / len(rates):5.1f}  "
+              f"max {max(rates):5.1f}  {kib:8.0f} KiB/s total  {errors} errors")
+
+    print("Frame delivery:")
+    line('fast', viewers[slow:])
+    line('slow', viewers[:slow])
+    if states is not None:
+        print(f"State messages: {states / seconds:.1f} per second")
+    print("Control latency (ms):")
+    for path, samples in sorted(latencies.items()):
+        p = percentiles([s * 1000 for s in samples])
+        print(f"  {path:<8} n={len(samples):4d}  p50 {p['p50']:7.1f}  p95 {p['p95']:7.1f}  p99 {p['p99']:7.1f}  "
+              f"max {1000 * max(samples):7.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8080')
+    parser.add_argument('--viewers', type=int, default=20)
+    parser.add_argument('--slow', type=int, default=0, help="How many of the viewers read slowly")
+    parser.add_argument('--slow-kib', type=float, default=64, help="Read rate of a slow viewer, KiB/s")
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--warmup', type=float, default=1.0, help="Seconds between opening streams and timing")
+    parser.add_argument('--interval', type=float, default=0.2, help="Seconds between control requests")
+    parser.add_argument('--click', type=int, nargs=2, default=(320, 240), metavar=('X', 'Y'))
+    parser.add_argument('--ws', action='store_true', help="Send commands on the /ws control channel")
+    args = parser.parse_args()
+
+    print(f"{args.viewers} viewers ({args.slow} at {args.slow_kib:g} KiB/s) on {args.url} for {args.seconds:g} s")
+    viewers, latencies, states = asyncio.run(run(args))
+    report(viewers, latencies, args.seconds + args.warmup, args.slow, states if args.ws else None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Multi-camera click-to-track service: one worker process per stream, one Flask app
+
+Each source runs the full LaserTracker pipeline (capture, flip, track, overlays,
+servo) in its own process, pinned to its own core. Finished frames go to the
+Flask process through a FrameRing (tracking/frame_ring.py), and are encoded once
+per stream by a FrameBroadcaster there; a frame the worker overwrote mid-encode
+is dropped and counted as torn. Clicks, stops and centres go to the worker over
+a pipe, each tagged with an id its reply echoes.
+
+Sources: a device index (0), an MJPEG URL (http://pi:8000/stream.mjpg) or
+synthetic[:trajectory] (tracking/synthetic_video.py). Append @PORT to drive that
+stream's servos from an Arduino on PORT, e.g. 0@/dev/ttyACM0.
+
+--cpu-budget caps each worker at that fraction of its core: after each frame,
+the worker sleeps until its CPU time / wall time is back under the budget. The
+sleep shows up as throttled time. Per-stream fps, CPU use and throttling are on
+/streams (JSON) and /metrics.
+
+    python3 tests/multi_camera.py 0 1 http://172.20.10.3:8000/stream.mjpg --cpu-budget 0.8
+    python3 tests/multi_camera.py synthetic:circle synthetic:lissajous
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import signal
+import sys
+import threading
+import time
+
+import cv2
+from flask import Flask, render_template, Response, request, jsonify, abort
+
+import laser_tracker
+from frame_broadcaster import FrameBroadcaster, frame_coordinates
+from laser_tracker import LaserTracker, CAMERA_INDEX, FRAME_WIDTH, FRAME_HEIGHT
+from frame_ring import FrameRing  # tracking/, on the path via laser_tracker
+from metrics import REGISTRY
+from synthetic_video import SyntheticCapture, SyntheticVideo
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'object_tracker'))
+from mjpeg_reader import MJPEGStreamReader
+
+STATS_INTERVAL = 1.0  # Seconds between per-stream fps/CPU updates
+COMMAND_TIMEOUT = 5.0  # Seconds to wait for a worker to answer click/stop/center
+RING_SLOTS = 3  # One reader (the broadcaster): 3 slots keep the worker from ever waiting
+
+# Per-stream status, one row of doubles each in a shared array written by the worker
+FPS, CPU, THROTTLED, FRAMES, TRACKING, PAN, TILT = range(7)
+STATUS_FIELDS = 7
+
+
+class MJPEGCamera:
+    """VideoCapture-like reader for an MJPEG HTTP stream (object_tracker/mjpeg_reader.py)"""
+
+    def __init__(self, url):
+        import urllib.request
+        self.stream = urllib.request.urlopen(url)
+        self.reader = MJPEGStreamReader(self.stream)
+
+    def read(self, image=None):
+        frame = self.reader.read_frame()
+        return frame is not None, frame
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        self.stream.close()
+
+
+def parse_source(spec):
+    """'0@COM5' -> (0, 'COM5'); 'http://..' -> (url, None); 'synthetic:circle' -> ('synthetic:circle', None)"""
+    source, sep, port = spec.rpartition('@')
+    if not sep:
+        source, port = spec, None
+    return (int(source) if source.isdigit() else source), port
+
+
+def open_source(source):
+    if isinstance(source, int):
+        camera = cv2.VideoCapture(source)
+        camera.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
+        camera.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
+        return camera
+    if source.startswith('synthetic'):
+        _, _, trajectory = source.partition(':')
+        return SyntheticCapture(SyntheticVideo(width=FRAME_WIDTH, height=FRAME_HEIGHT,
+                                               trajectory=trajectory or 'circle'), fps=30)
+    return MJPEGCamera(source)
+
+
+def stream_worker(index, source, port, core, cpu_budget, conn, status):
+    """One stream's capture/track/servo loop; runs in its own process"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C reaches the whole group; the parent sends 'quit'
+    if core is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {core})
+    if port:
+        laser_tracker.USE_ARDUINO = True
+        laser_tracker.ARDUINO_PORT = port
+    tracker = LaserTracker(camera=open_source(source))
+    row = index * STATUS_FIELDS
+
+    frame = tracker.process_frame()
+    if frame is None:
+        conn.send(('error', f"no frames from {source!r}"))
+        tracker.cleanup()
+        return
+    ring = FrameRing.create(frame.shape, slots=RING_SLOTS, readers=1)
+    ring.write(frame)
+    conn.send(('ready', ring.name))
+
+    frames, throttled = 0, 0.0
+    last_time, last_cpu, last_frames, last_throttled = time.perf_counter(), time.process_time(), 0, 0.0
+    running = True
+    while running:
+        while conn.poll():
+            command_id, command, *args = conn.recv()  # Replies echo command_id (Stream.command)
+            if command == 'click':
+                conn.send((command_id, tracker.start_tracking(*args)))
+            elif command == 'stop':
+                tracker.stop_tracking()
+                conn.send((command_id, True))
+            elif command == 'center':
+                tracker.center_servos()
+                conn.send((command_id, True))
+            elif command == 'quit':
+                running = False
+
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        frame = tracker.process_frame()
+        if frame is None:
+            time.sleep(0.01)
+            continue
+        ring.write(frame)
+        frames += 1
+
+        if cpu_budget:
+            # Duty cycle: stretch this frame's wall time until its CPU time fits the budget
+            spent = time.process_time() - cpu_start
+            delay = spent / cpu_budget - (time.perf_counter() - wall_start)
+            if delay > 0:
+                time.sleep(delay)
+                throttled += delay
+
+        now = time.perf_counter()
+        if now - last_time >= STATS_INTERVAL:
+            cpu = time.process_time()
+            elapsed = now - last_time
+            status[row + FPS] = (frames - last_frames) / elapsed
+            status[row + CPU] = (cpu - last_cpu) / elapsed
+            status[row + THROTTLED] = (throttled - last_throttled) / elapsed
+            status[row + FRAMES] = frames
+            status[row + TRACKING] = tracker.tracking
+            status[row + PAN], status[row + TILT] = tracker.prev_pan, tracker.prev_tilt
+            last_time, last_cpu, last_frames, last_throttled = now, cpu, frames, throttled
+
+    ring.close()
+    frame = None
+    ring.detach()
+    tracker.cleanup()
+
+
+class Stream:
+    """Parent-side handle of one worker: its process, control pipe, frame ring and broadcaster"""
+
+    def __init__(self, index, spec, core, cpu_budget, status, ctx):
+        self.index = index
+        self.spec = spec
+        self.core = core
+        self.status = status
+        self.lock = threading.Lock()  # One command in flight per worker
+        self.command_id = 0  # Id of the newest command sent; the worker echoes it in the reply
+        source, port = parse_source(spec)
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=stream_worker, name=f'stream-{index}', daemon=True,
+                                   args=(index, source, port, core, cpu_budget, child, status))
+        self.process.start()
+        if not self.conn.poll(30):
+            raise RuntimeError(f"Stream {index} ({spec}) did not start")
+        reply = self.conn.recv()
+        if reply[0] != 'ready':
+            raise RuntimeError(f"Stream {index} ({spec}): {reply[1]}")
+        self.ring = FrameRing.attach(reply[1], reader=0)
+        self.torn = 0  # Frames overwritten while being encoded, dropped
+        self.broadcaster = FrameBroadcaster(self.next_frame, jpeg_quality=85, release=self.release_frame)
+
+    def next_frame(self):
+        """Newest frame from the worker, read in place; held until release_frame()"""
+        return self.ring.acquire(timeout=0.5)
+
+    def release_frame(self):
+        """Give the encoded frame's slot back; False if the worker overwrote it meanwhile"""
+        if self.ring.release():
+            return True
+        self.torn += 1
+        return False
+
+    def command(self, *command):
+        """Send one command and wait for its reply; False if the worker is gone or does not answer in time"""
+        with self.lock:
+            if not self.process.is_alive():
+                return False
+            self.command_id += 1
+            self.conn.send((self.command_id, *command))
+            deadline = time.monotonic() + COMMAND_TIMEOUT
+            while self.conn.poll(max(0.0, deadline - time.monotonic())):
+                command_id, result = self.conn.recv()
+                if command_id == self.command_id:
+                    return result
+                # Late answer to an earlier command that timed out: dropped
+            return False
+
+    def info(self):
+        row = self.status[self.index * STATUS_FIELDS:(self.index + 1) * STATUS_FIELDS]
+        return {
+            'index': self.index, 'source': self.spec, 'core': self.core, 'alive': self.process.is_alive(),
+            'fps': round(row[FPS], 1), 'cpu': round(row[CPU], 3), 'throttled': round(row[THROTTLED], 3),
+            'frames': int(row[FRAMES]), 'tracking': bool(row[TRACKING]), 'pan': int(row[PAN]), 'tilt': int(row[TILT]),
+            'clients': self.broadcaster.clients(), 'skipped': self.ring.missed, 'torn': self.torn,
+        }
+
+    def stop(self):
+        self.broadcaster.stop()
+        if self.process.is_alive():
+            with self.lock:
+                self.conn.send((0, 'quit'))
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.ring.release()
+        self.ring.detach()
+
+
+app = Flask(__name__)
+streams = []
+
+STREAM_FPS = REGISTRY.gauge('tracker_stream_fps', "Frames per second processed by each stream worker", label='stream')
+STREAM_CPU = REGISTRY.gauge('tracker_stream_cpu', "CPU cores used by each stream worker", label='stream')
+STREAM_THROTTLED = REGISTRY.gauge('tracker_stream_throttled', "Fraction of time each worker slept to stay in "
+                                  "its CPU budget", label='stream')
+
+
+def get_stream(index):
+    if not 0 <= index < len(streams):
+        abort(404)
+    return streams[index]
+
+
+@app.route('/')
+def index():
+    return render_template('multi_camera.html', streams=[s.info() for s in streams])
+
+
+@app.route('/video_feed/<int:stream>')
+def video_feed(stream):
+    return Response(get_stream(stream).broadcaster.subscribe(client=request.remote_addr),
+                    mimetype='multipart/x-mixed-replace; boundary=frame')
+
+
+@app.route('/click/<int:stream>', methods=['POST'])
+def handle_click(stream):
+    s = get_stream(stream)
+    x, y = frame_coordinates(request.json, s.ring.shape[1::-1])
+    success = s.command('click', x, y)
+    return jsonify({'success': bool(success), 'x': x, 'y': y})
+
+
+@app.route('/stop/<int:stream>', methods=['POST'])
+def stop_tracking(stream):
+    return jsonify({'success': bool(get_stream(stream).command('stop'))})
+
+
+@app.route('/center/<int:stream>', methods=['POST'])
+def center_servos(stream):
+    return jsonify({'success': bool(get_stream(stream).command('center'))})
+
+
+@app.route('/streams')
+def stream_status():
+    """Per-stream source, core, fps, CPU use and tracking state"""
+    return jsonify([s.info() for s in streams])
+
+
+@app.route('/metrics')
+def metrics():
+    for s in streams:
+        info = s.info()
+        STREAM_FPS.labels(s.index).set(info['fps'])
+        STREAM_CPU.labels(s.index).set(info['cpu'])
+        STREAM_THROTTLED.labels(s.index).set(info['throttled'])
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+def assign_cores(count, pin=True):
+    """Core per stream: 1, 2, ... (core 0 left to Flask and encoding), wrapping round; None if not pinning"""
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count() or 1))
+    if not pin or len(cpus) < 2:
+        return [None] * count
+    workers = cpus[1:]
+    if count > len(workers):
+        print(f"⚠ {count} streams on {len(workers)} worker cores: some share a core")
+    return [workers[i % len(workers)] for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('sources', nargs='*', default=[str(CAMERA_INDEX)],
+                        help="Device index, MJPEG URL or synthetic[:trajectory], each optionally @SERIAL_PORT")
+    parser.add_argument('--cpu-budget', type=float, default=None,
+                        help="Max fraction of its core each stream worker may use (e.g. 0.8)")
+    parser.add_argument('--no-pin', action='store_true', help="Let the OS schedule workers on any core")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8080)
+    args = parser.parse_args()
+
+    ctx = mp.get_context('spawn')
+    status = ctx.Array('d', len(args.sources) * STATUS_FIELDS, lock=False)
+    cores = assign_cores(len(args.sources), pin=not args.no_pin)
+    try:
+        for i, (spec, core) in enumerate(zip(args.sources, cores)):
+            streams.append(Stream(i, spec, core, args.cpu_budget, status, ctx))
+            print(f"✓ Stream {i}: {spec} on core {core if core is not None else 'any'}")
+        print(f"\n🌐 {len(streams)} streams at http://localhost:{args.port}  (status: /streams, /metrics)\n")
+        app.run(host=args.host, port=args.port, threaded=True, debug=False)
+    except KeyboardInterrupt:
+        print("\n\n🛑 Shutting down...")
+    finally:
+        for s in streams:
+            s.stop()
+        print("✓ Goodbye!")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+"""
+Replay a recorded tracker session and compare the servo commands with the live run
+
+Record with DISRUPTOR_RECORD set, then replay the file through the same code:
+LaserTracker for test.py sessions, track() for object_tracker.py sessions.
+Clicks, stops and centres are re-applied at the frame they happened on, every
+replayed servo command is compared with the recorded one for the same frame,
+and the first divergent frame is reported. Set DISRUPTOR_TRACKER to replay a
+session with another backend.
+
+A click initialises a tracker on the frame it was made on, but live, that
+tracker only takes over once init returns, which for CSRT is tens of frames
+later; a stop or centre likewise lands wherever the video loop happens to be,
+possibly while a frame's tracker is updating. test.py sessions therefore
+record the frame each tracker change took effect on (TRACK events, see
+session_log.py) and whether a centre landed mid-update, and replay initialises
+the tracker at the click frame but installs it, stops or centres exactly
+there. Sessions recorded before TRACK events existed apply clicks and stops at
+their own frame, so diverge by the init latency.
+
+test.py records camera frames as JPEG by default, so a replay sees slightly
+different pixels than the live tracker did; set DISRUPTOR_RECORD_FORMAT=raw
+(laser_tracker.RECORD_FORMAT) for bit-exact sessions. object_tracker.py stores
+the stream's JPEG bytes unchanged. Its --pipeline mode drops frames live that
+replay still tracks, so only sequential recordings replay exactly.
+
+    DISRUPTOR_RECORD=run.hxs python3 tests/test.py
+    DISRUPTOR_RECORD=run.hxs python3 object_tracker/object_tracker.py
+    python3 tests/replay_session.py run.hxs               # as fast as possible
+    python3 tests/replay_session.py run.hxs --realtime    # at the recorded pace
+    python3 tests/replay_session.py run.hxs --info
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+
+import cv2
+
+import laser_tracker
+from laser_tracker import LaserTracker
+from session_log import SessionLog  # tracking/, on the path via laser_tracker
+
+OBJECT_TRACKER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'object_tracker')
+
+
+class ReplayCamera:
+    """VideoCapture-like source over a session's frames, optionally at the recorded pace"""
+
+    def __init__(self, log, realtime=False):
+        self.log = log
+        self.realtime = realtime
+        self.index = 0
+        self.start = None
+
+    def wait(self, n):
+        """Sleep until frame n's recorded time (realtime mode only)"""
+        if not self.realtime:
+            return
+        if self.start is None:
+            self.start = time.monotonic() - self.log.frame_time(n)
+        delay = self.start + self.log.frame_time(n) - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def read(self, image=None):
+        while self.index < len(self.log):
+            n = self.index
+            self.index += 1
+            self.wait(n)
+            frame = self.log.decode(n, image)
+            if frame is not None:
+                return True, frame
+        return False, None
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        pass
+
+
+def events_by_frame(log):
+    """({frame: [(kind, value)]} for operator events, {frame: (tilt, pan)} of recorded servo commands)"""
+    events, servo = defaultdict(list), {}
+    for kind, frame, _, value in log.events():
+        if kind == 'servo':
+            servo[frame] = value
+        else:
+            events[frame].append((kind, value))
+    return events, servo
+
+
+def replay_laser_tracker(log, realtime=False):
+    """Feed the session through LaserTracker; returns ({frame: (tilt, pan)}, tracking seconds, frames)"""
+    laser_tracker.USE_ARDUINO = False
+    events, _ = events_by_frame(log)
+    camera = ReplayCamera(log, realtime)
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracker = LaserTracker(camera=camera)
+    commands, current = {}, [None]
+
+    def send(tilt, pan):
+        if current[0] is not None:  # centre_servos() between frames is an event, not output
+            commands[current[0]] = (tilt, pan)
+    tracker.send_servo_command = send
+
+    # Each tracker change is applied where it took effect live (TRACK events), with its
+    # tracker initialised on the frame it was clicked on, as start_tracking did
+    changes = [(frame, value) for frame, evs in events.items() for kind, value in evs if kind == 'track']
+    clicks = defaultdict(set)  # click frame -> (x, y) of trackers installed from it
+    for _, (_, _, tracking, x, y, source) in changes:
+        if tracking:
+            clicks[source].add((x, y))
+    prepared = {}  # (x, y, click frame) -> (tracker, bbox, source)
+
+    def change(kind, value):
+        """Apply one TRACK event's tracker (or stop) or a centre; called with tracker.lock held"""
+        if kind == 'center':
+            tracker.prev_pan = tracker.prev_tilt = 90
+            return
+        _, _, tracking, x, y, source = value
+        tracker._set_tracker(*prepared.pop((x, y, source))) if tracking else tracker._set_tracker(None)
+
+    update_state, during = tracker._update_state, []
+
+    def change_during_update(track_id, *args):
+        """Changes that landed while this frame's tracker updated (live, one ran): applied before its result"""
+        for kind, value in during:
+            change(kind, value)
+        return update_state(track_id, *args)
+    tracker._update_state = change_during_update
+
+    elapsed, frames = 0.0, 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        while camera.index < len(log):
+            n = current[0] = camera.index
+            frame_events = events.get(n, ())
+            if clicks.get(n):
+                # Live, init ran on this frame once published; the tracker may take over within it
+                clean = cv2.flip(log.decode(n), 1)
+                for x, y in clicks[n]:
+                    prepared[(x, y, n)] = tracker.prepare_tracker(x, y, frame=clean)
+            during[:] = [(kind, value) for kind, value in frame_events
+                         if kind == 'track' and value[1] == 1 or kind == 'center' and value == (1,)]
+            with tracker.lock:
+                for kind, value in frame_events:
+                    if kind == 'track' and value[1] == 0:
+                        change(kind, value)
+            start = time.perf_counter()
+            if tracker.process_frame() is None:
+                break
+            elapsed += time.perf_counter() - start
+            frames += 1
+            current[0] = None
+            for kind, value in frame_events:
+                if kind == 'center' and value != (1,):
+                    tracker.center_servos()
+                elif not changes and kind == 'click':  # Sessions recorded without TRACK events
+                    tracker.start_tracking(*value)
+                elif not changes and kind == 'stop':
+                    tracker.stop_tracking()
+    return commands, elapsed, frames
+
+
+def replay_object_tracker(log, realtime=False):
+    """Feed the session through object_tracker.track(); returns ({frame: (tilt, pan)}, tracking seconds, frames)"""
+    sys.path.insert(0, OBJECT_TRACKER_DIR)
+    import object_tracker
+    events, _ = events_by_frame(log)
+    camera = ReplayCamera(log, realtime)
+    commands, elapsed, frames = {}, 0.0, 0
+    for n in range(len(log)):
+        camera.wait(n)
+        frame = log.decode(n)
+        if frame is None:
+            continue  # Skipped live as well
+        for kind, value in events.get(n, ()):
+            if kind == 'click':
+                object_tracker.pending_click = value  # Applied by track() on this frame, as it was live
+        start = time.perf_counter()
+        _, result = object_tracker.track(frame)
+        elapsed += time.perf_counter() - start
+        frames += 1
+        if result is not None:
+            commands[n] = result[6], result[7]
+    return commands, elapsed, frames
+
+
+REPLAYERS = {'laser_tracker': replay_laser_tracker, 'object_tracker': replay_object_tracker}
+
+
+def compare(recorded, replayed):
+    """Per-frame servo agreement between two {frame: (tilt, pan)} maps"""
+    frames = sorted(set(recorded) | set(replayed))
+    diverged = [n for n in frames if recorded.get(n) != replayed.get(n)]
+    both = [n for n in frames if n in recorded and n in replayed]
+    max_diff = max((max(abs(a - b) for a, b in zip(recorded[n], replayed[n])) for n in both), default=0)
+    return {
+        'recorded': len(recorded),
+        'replayed': len(replayed),
+        'matching': len(frames) - len(diverged),
+        'max_diff_deg': max_diff,
+        'first_divergence': diverged[0] if diverged else None,
+    }
+
+
+def print_info(log):
+    kinds = Counter(kind for kind, *_ in log.events())
+    duration = log.frame_time(len(log) - 1) - log.frame_time(0) if len(log) else 0.0
+    print(f"Session: {log.meta}")
+    print(f"  {len(log)} frames over {duration:.1f} s"
+          f"{'  (index rebuilt: recording was not closed)' if log.recovered else ''}")
+    print(f"  events: {dict(kinds) or 'none'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('session', help="File written with DISRUPTOR_RECORD")
+    parser.add_argument('--realtime', action='store_true', help="Pace frames as recorded")
+    parser.add_argument('--info', action='store_true', help="Describe the session and exit")
+    args = parser.parse_args()
+
+    log = SessionLog(args.session)
+    print_info(log)
+    if args.info:
+        return
+    source = log.meta.get('source')
+    if source not in REPLAYERS:
+        sys.exit(f"Unknown session source {source!r}")
+    _, recorded = events_by_frame(log)
+
+    start = time.perf_counter()
+    replayed, elapsed, frames = REPLAYERS[source](log, args.realtime)
+    wall = time.perf_counter() - start
+    tracker = laser_tracker.TRACKER_TYPE
+    if log.meta.get('tracker') != tracker:
+        print(f"  recorded with {log.meta.get('tracker')}, replayed with {tracker}")
+    print(f"Replayed {frames} frames in {wall:.2f} s ({frames / wall if wall else 0:.1f} fps, "
+          f"tracking {1000 * elapsed / max(1, frames):.2f} ms/frame)")
+
+    result = compare(recorded, replayed)
+    print(f"Servo commands: {result['recorded']} recorded, {result['replayed']} replayed, "
+          f"{result['matching']} frames identical, max difference {result['max_diff_deg']}°")
+    if result['first_divergence'] is None:
+        print("✓ Replay matches the recording")
+    else:
+        n = result['first_divergence']
+        print(f"✗ First divergence at frame {n}: recorded {recorded.get(n)}, replayed {replayed.get(n)}")
+    log.close()
+
+
+if __name__ == '__main__':
+    main()
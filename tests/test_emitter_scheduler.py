@@ -0,0 +1,63 @@
+"""
+EmitterScheduler safety checks on the simulated backend (src/hal_sim.py)
+
+    python3 -m pytest tests/test_emitter_scheduler.py
+    python3 tests/test_emitter_scheduler.py
+"""
+
+import os
+import sys
+import threading
+import time
+
+os.environ['DISRUPTOR_BACKEND'] = 'sim'
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from drivers import EmitterDriver, EmitterScheduler  # noqa: E402
+
+LASER_PIN = 18
+
+
+class SlowDriver(EmitterDriver):
+    """EmitterDriver whose switch-on takes a while, widening the window a cancel() can land in"""
+
+    def __init__(self, pin, delay=0.05):
+        super().__init__(pin)
+        self.delay = delay
+        self.firing = threading.Event()
+
+    def set_power(self, duty_cycle):
+        if duty_cycle:
+            self.firing.set()
+            time.sleep(self.delay)
+        super().set_power(duty_cycle)
+
+
+def test_cancel_while_pulse_fires():
+    scheduler = EmitterScheduler()
+    laser = SlowDriver(LASER_PIN)
+    scheduler.pulse(laser, 5.0, duty=80)
+    assert laser.firing.wait(1.0), "pulse never fired"
+    scheduler.cancel()  # Trip while the "on" change is being applied
+    time.sleep(laser.delay * 2)
+    assert laser.pwm.duty == 0
+    assert not scheduler.busy()
+
+
+def test_cancel_drops_pending_off():
+    scheduler = EmitterScheduler()
+    laser = EmitterDriver(LASER_PIN)
+    scheduler.pulse(laser, 0.05, duty=80)
+    time.sleep(0.02)
+    assert laser.pwm.duty == 80
+    scheduler.cancel()
+    assert laser.pwm.duty == 0
+    time.sleep(0.05)
+    assert laser.pwm.duty == 0
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✓ {name}")
@@ -0,0 +1,116 @@
+"""
+Colour tracking speed: cam_test's original full-frame pipeline vs ColorTracker
+
+Synthetic clips show a solid blob moving on a Lissajous path over a noisy
+background with a few differently coloured distractors, at 640x480 and
+1280x720. The blob disappears for the last HIDDEN of every 100 frames, so
+the windowed tracker also has to widen its search and re-acquire it. Only
+the tracking step is timed; rendering is not. Each run also reports mean
+centroid error against ground truth and the fraction of visible frames
+where the blob was found.
+
+    python3 tracking/bench_color_tracker.py --frames 300
+"""
+
+import argparse
+import math
+import time
+
+import cv2
+import numpy as np
+
+from color_tracker import ColorTracker, color_range
+
+RESOLUTIONS = ((640, 480), (1280, 720))
+BLOB_BGR = (255, 80, 0)  # Blue
+DISTRACTORS = ((0, 0, 255), (0, 200, 0), (0, 200, 255))
+HIDDEN = 10
+
+
+class BlobClip:
+    """Renders frame i of a moving-blob clip into a reused buffer; returns (frame, (cx, cy) or None)"""
+
+    def __init__(self, width, height, seed=0):
+        rng = np.random.default_rng(seed)
+        self.background = cv2.GaussianBlur(rng.integers(40, 200, (height, width, 3), dtype=np.uint8), (0, 0), 2)
+        for i, color in enumerate(DISTRACTORS):
+            center = (int(width * (0.2 + 0.3 * i)), int(height * 0.85))
+            cv2.circle(self.background, center, height // 14, color, -1)
+        self.frame = np.empty_like(self.background)
+        self.width, self.height = width, height
+        self.radius = height // 16
+
+    def render(self, i):
+        w, h = self.width, self.height
+        cx = int(w / 2 + (w / 2 - 2 * self.radius) * math.sin(i * 0.031))
+        cy = int(h / 2 + (h / 3 - self.radius) * math.sin(i * 0.047 + 1.0))
+        np.copyto(self.frame, self.background)
+        if i % 100 >= 100 - HIDDEN:
+            return self.frame, None
+        cv2.circle(self.frame, (cx, cy), self.radius, BLOB_BGR, -1)
+        return self.frame, (cx, cy)
+
+
+def legacy_track(frame, lower, upper, kernel=np.ones((5, 5), np.uint8)):
+    """cam_test.py's colour mode as originally written: whole frame, contours, moments"""
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    mask = cv2.inRange(hsv, lower, upper)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+    largest = max(contours, key=cv2.contourArea)
+    if cv2.contourArea(largest) <= 500:
+        return None
+    m = cv2.moments(largest)
+    if m["m00"] == 0:
+        return None
+    return int(m["m10"] / m["m00"]), int(m["m01"] / m["m00"])
+
+
+def run(clip, step, frames):
+    elapsed, errors, found, visible, false = 0.0, [], 0, 0, 0
+    for i in range(frames):
+        frame, truth = clip.render(i)
+        start = time.perf_counter()
+        center = step(frame)
+        elapsed += time.perf_counter() - start
+        if truth is None:
+            false += center is not None
+            continue
+        visible += 1
+        if center is not None:
+            found += 1
+            errors.append(math.hypot(center[0] - truth[0], center[1] - truth[1]))
+    error = float(np.mean(errors)) if errors else float('nan')
+    return frames / elapsed, error, found / max(1, visible), false
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=300)
+    args = parser.parse_args()
+
+    for width, height in RESOLUTIONS:
+        clip = BlobClip(width, height)
+        frame, (cx, cy) = clip.render(0)
+        lower, upper = color_range(frame, cx, cy)
+        tracker = ColorTracker(lower, upper)
+
+        def windowed(frame):
+            blob = tracker.update(frame)
+            return (blob.cx, blob.cy) if blob else None
+
+        print(f"{width}x{height}")
+        results = {}
+        for name, step in (('legacy', lambda f: legacy_track(f, lower, upper)), ('windowed', windowed)):
+            results[name] = fps, err, rate, false = run(clip, step, args.frames)
+            print(f"  {name:<9} {fps:8.1f} fps   centroid error {err:5.2f} px   "
+                  f"found {rate:6.1%} of visible   {false} false detections")
+        print(f"  speedup   {results['windowed'][0] / results['legacy'][0]:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
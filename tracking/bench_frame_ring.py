@@ -0,0 +1,208 @@
+"""
+Frame path throughput: one process vs capture, tracker and encoder processes sharing a FrameRing
+
+Every configuration runs the same work on a looped synthetic MJPEG clip:
+decode + flip (capture), tracker.update (track) and cv2.imencode (encode).
+Frames arrive at --fps like a camera's (0: as fast as capture can go).
+
+  single     all three stages in sequence in one loop, as test.py and
+             object_tracker.py do today
+  threads    one thread per stage, linked by a FrameRing (tracking/frame_ring.py):
+             parallel in native code, serialised by the GIL in the Python glue
+  processes  one process per stage; the capture process decodes and flips straight
+             into a ring slot, the tracker and encoder read it in place
+
+Reported per stage: frames per second, frames it skipped because a newer one was
+already waiting, and frames overwritten while read (should stay 0). A stage
+rate above the single-process rate is the gain; it needs at least as many
+free cores as stages.
+
+    python3 tracking/bench_frame_ring.py --seconds 5
+    python3 tracking/bench_frame_ring.py --tracker KCF --fps 0 --width 1280 --height 720
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from frame_ring import FrameRing
+from synthetic_video import SyntheticVideo
+from trackers import create_tracker, default_tracker
+
+CLIP_FRAMES = 120
+
+
+def make_clip(width, height):
+    """(JPEG bytes, mirrored ground-truth box) per frame"""
+    video = SyntheticVideo(width=width, height=height, frames=CLIP_FRAMES, trajectory='lissajous')
+    clip = []
+    for i in range(CLIP_FRAMES):
+        jpg = cv2.imencode('.jpg', video.render(i), [cv2.IMWRITE_JPEG_QUALITY, 85])[1].tobytes()
+        (x, y, w, h), _ = video.ground_truth(i)
+        clip.append((jpg, (width - x - w, y, w, h)))  # Box in the flipped frame
+    return clip
+
+
+def decode(jpg):
+    return cv2.imdecode(np.frombuffer(jpg, np.uint8), cv2.IMREAD_COLOR)
+
+
+class TrackStep:
+    """tracker.update on each frame; re-initialised from ground truth when it loses the target"""
+
+    def __init__(self, name, clip):
+        self.name = name
+        self.clip = clip
+        self.tracker = None
+
+    def __call__(self, frame, index):
+        if self.tracker is not None:
+            ok, _ = self.tracker.update(frame)
+            if ok:
+                return
+        self.tracker = create_tracker(self.name)
+        self.tracker.init(frame, self.clip[index % len(self.clip)][1])
+
+
+class Camera:
+    """Hands out clip frames no faster than fps (0: unpaced); returns (frame number, JPEG)"""
+
+    def __init__(self, clip, fps):
+        self.clip = clip
+        self.period = 1.0 / fps if fps else 0.0
+        self.start = time.perf_counter()
+        self.last = -1
+
+    def read(self):
+        if not self.period:
+            number = self.last + 1
+        else:
+            # The newest frame the camera has produced; wait for the next one if it was taken already
+            now = time.perf_counter()
+            number = int((now - self.start) / self.period)
+            if number <= self.last:
+                number = self.last + 1
+                time.sleep(max(0.0, self.start + number * self.period - now))
+        self.last = number
+        return number, self.clip[number % len(self.clip)][0]
+
+
+def run_single(clip, tracker_name, seconds, fps):
+    track = TrackStep(tracker_name, clip)
+    params = [cv2.IMWRITE_JPEG_QUALITY, 85]
+    camera = Camera(clip, fps)
+    flipped = None
+    frames, skipped, start = 0, 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        number, jpg = camera.read()
+        skipped = number - frames
+        flipped = cv2.flip(decode(jpg), 1, dst=flipped)
+        track(flipped, number)
+        cv2.imencode('.jpg', flipped, params)
+        frames += 1
+    rate = frames / (time.perf_counter() - start)
+    return {stage: {'fps': rate, 'skipped': skipped, 'torn': 0} for stage in ('capture', 'track', 'encode')}
+
+
+def capture_worker(name, clip, fps, ready, go, stop, results):
+    ring = FrameRing.attach(name)
+    ready.put('capture')
+    go.wait()
+    camera = Camera(clip, fps)
+    frames, skipped, start = 0, 0, time.perf_counter()
+    while not stop.is_set():
+        number, jpg = camera.read()
+        skipped = number - frames
+        cv2.flip(decode(jpg), 1, dst=ring.begin())  # Written straight into shared memory
+        ring.commit(tag=number)
+        frames += 1
+    elapsed = time.perf_counter() - start
+    ring.close()
+    results.put(('capture', {'fps': frames / elapsed, 'skipped': skipped, 'torn': 0}))
+    ring.detach()
+
+
+def reader_worker(stage, reader, name, clip, tracker_name, ready, go, stop, results):
+    ring = FrameRing.attach(name, reader=reader)
+    if stage == 'track':
+        track = TrackStep(tracker_name, clip)
+        work = lambda frame, tag: track(frame, tag)
+    else:
+        params = [cv2.IMWRITE_JPEG_QUALITY, 85]
+        work = lambda frame, tag: cv2.imencode('.jpg', frame, params)
+    ready.put(stage)
+    go.wait()
+    frames, torn, start = 0, 0, time.perf_counter()
+    while not stop.is_set():
+        frame = ring.acquire(timeout=0.5)
+        if frame is None:
+            continue
+        work(frame, ring.info()[1])
+        frame = None
+        torn += not ring.release()
+        frames += 1
+    elapsed = time.perf_counter() - start
+    results.put((stage, {'fps': frames / elapsed, 'skipped': ring.missed, 'torn': torn}))
+    track = work = None
+    ring.detach()
+
+
+def run_parallel(clip, tracker_name, seconds, fps, shape, kind):
+    """Stages as threads or processes around one FrameRing"""
+    ctx = mp.get_context('spawn')
+    make, Event, Queue = ((threading.Thread, threading.Event, queue.Queue) if kind == 'threads'
+                          else (ctx.Process, ctx.Event, ctx.Queue))
+    ring = FrameRing.create(shape, slots=4, readers=2)
+    ready, results = Queue(), Queue()
+    go, stop = Event(), Event()
+    workers = [make(target=capture_worker, args=(ring.name, clip, fps, ready, go, stop, results))]
+    for reader, stage in enumerate(('track', 'encode')):
+        workers.append(make(target=reader_worker,
+                            args=(stage, reader, ring.name, clip, tracker_name, ready, go, stop, results)))
+    for worker in workers:
+        worker.start()
+    for _ in workers:
+        ready.get()  # Everyone attached (spawned processes take a while to import cv2)
+    go.set()
+    time.sleep(seconds)
+    stop.set()
+    out = dict(results.get() for _ in workers)
+    for worker in workers:
+        worker.join()
+    ring.detach()
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=5.0, help="Per configuration")
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--fps', type=float, default=30.0, help="Camera frame rate (0: unpaced)")
+    parser.add_argument('--tracker', default=default_tracker('CSRT'))
+    args = parser.parse_args()
+
+    clip = make_clip(args.width, args.height)
+    shape = (args.height, args.width, 3)
+    print(f"{args.width}x{args.height} at {args.fps or 'unpaced'} fps, tracker {args.tracker}, "
+          f"{os.cpu_count()} CPUs, {args.seconds:.0f} s each")
+    print(f"  {'config':<10} {'stage':<8} {'fps':>7} {'skipped':>8} {'torn':>5}")
+    for kind in ('single', 'threads', 'processes'):
+        if kind == 'single':
+            stages = run_single(clip, args.tracker, args.seconds, args.fps)
+        else:
+            stages = run_parallel(clip, args.tracker, args.seconds, args.fps, shape, kind)
+        for stage in ('capture', 'track', 'encode'):
+            r = stages[stage]
+            print(f"  {kind if stage == 'capture' else '':<10} {stage:<8} {r['fps']:7.1f} {r['skipped']:8d} {r['torn']:5d}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+Throughput and accuracy of every available tracker backend (tracking/trackers.py)
+
+Each backend runs over the same clips: synthetic ones by default (a textured
+80x80 target on known trajectories, tracking/synthetic_video.py), or a recording
+with ground truth. It is initialised on the first frame's ground-truth box.
+Frames where the target is hidden are timed but not scored. Reported per backend:
+  - fps:        tracker.update() calls per second (decode/render not included)
+  - mean IoU:   overlap with ground truth over the frames where it held lock
+  - loss rate:  lock losses per 100 frames. A loss is update() failing or IoU
+                dropping below --lost-iou. After a loss the tracker is
+                re-initialised from ground truth on the next frame.
+
+--mode scale|roi runs each backend through ScaledTracker (tracking/scaled_tracker.py)
+with a --budget ms per-frame target instead of on the full frame.
+
+The last line names the most accurate backend that sustains --min-fps, i.e. what
+to set DISRUPTOR_TRACKER to on this machine.
+
+    python3 tracking/bench_trackers.py --frames 200 --min-fps 30
+    python3 tracking/bench_trackers.py --mode roi --budget 20
+    python3 tracking/bench_trackers.py --speed 3 --occlusion 0.1 --noise 6
+    python3 tracking/bench_trackers.py --clip run.avi --gt run.csv   # CSV rows: x,y,w,h[,visible]
+"""
+
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+from scaled_tracker import make_tracker
+from synthetic_video import TRAJECTORIES, SyntheticVideo
+from trackers import available_trackers
+
+def synthetic_clip(trajectory, frames, **options):
+    """(frames, ground truth) rendered by SyntheticVideo; ground truth is (box, visible) per frame"""
+    video = SyntheticVideo(frames=frames, trajectory=trajectory, **options)
+    return [video.render(i) for i in range(frames)], [video.ground_truth(i) for i in range(frames)]
+
+
+def recorded_clip(path, gt_path):
+    """(frames, ground truth) from a video file and a CSV of x,y,w,h[,visible] per frame"""
+    boxes = []
+    with open(gt_path) as f:
+        for line in f:
+            if line.strip():
+                values = [int(float(v)) for v in line.split(',')]
+                boxes.append((tuple(values[:4]), bool(values[4]) if len(values) > 4 else True))
+    cap = cv2.VideoCapture(path)
+    clip = []
+    while len(clip) < len(boxes):
+        ok, frame = cap.read()
+        if not ok:
+            break
+        clip.append(frame)
+    cap.release()
+    return clip, boxes[:len(clip)]
+
+
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def run_backend(make, clip, boxes, lost_iou):
+    """Track one clip with trackers from make(); returns (update seconds, IoUs while locked, losses, updates)"""
+    tracker = make()
+    tracker.init(clip[0], boxes[0][0])
+    elapsed, ious, losses, updates = 0.0, [], 0, 0
+    reinit = False
+    for frame, (truth, visible) in zip(clip[1:], boxes[1:]):
+        if reinit and visible:
+            tracker = make()
+            tracker.init(frame, truth)
+            reinit = False
+            continue
+        start = time.perf_counter()
+        ok, bbox = tracker.update(frame)
+        elapsed += time.perf_counter() - start
+        updates += 1
+        if not visible or reinit:
+            continue  # Hidden target: timed, but there is nothing to overlap with
+        overlap = iou(bbox, truth) if ok else 0.0
+        if overlap < lost_iou:
+            losses += 1
+            reinit = True
+        else:
+            ious.append(overlap)
+    return elapsed, ious, losses, updates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=200, help="Frames per synthetic clip")
+    parser.add_argument('--trajectories', default='linear,circle,lissajous',
+                        help=f"Comma-separated, from {', '.join(TRAJECTORIES)}")
+    parser.add_argument('--speed', type=float, default=1.0, help="Synthetic laps per 300 frames")
+    parser.add_argument('--occlusion', type=float, default=0.0, help="Hidden fraction of every 100 frames")
+    parser.add_argument('--blur', type=float, default=0.0)
+    parser.add_argument('--noise', type=float, default=0.0)
+    parser.add_argument('--clip', help="Recorded video instead of synthetic clips")
+    parser.add_argument('--gt', help="Ground truth CSV for --clip")
+    parser.add_argument('--trackers', help="Comma-separated backends (default: all available)")
+    parser.add_argument('--mode', choices=('full', 'scale', 'roi'), default='full')
+    parser.add_argument('--budget', type=float, default=20.0, help="ScaledTracker budget, ms per frame")
+    parser.add_argument('--lost-iou', type=float, default=0.2)
+    parser.add_argument('--min-fps', type=float, default=30.0, help="CPU budget: required update rate")
+    parser.add_argument('--json', help="Also save results here")
+    args = parser.parse_args()
+
+    if args.clip:
+        clips = {args.clip: recorded_clip(args.clip, args.gt)}
+    else:
+        options = dict(speed=args.speed, occlusion=args.occlusion, blur=args.blur, noise=args.noise)
+        clips = {t: synthetic_clip(t, args.frames, **options) for t in args.trajectories.split(',')}
+    names = args.trackers.upper().split(',') if args.trackers else list(available_trackers())
+
+    print(f"OpenCV {cv2.__version__}, mode {args.mode}, clips: {', '.join(f'{k} ({len(v[0])} frames)' for k, v in clips.items())}")
+    print(f"  {'backend':<11} {'fps':>8} {'mean IoU':>9} {'loss/100f':>10}")
+    results = {}
+    for name in names:
+        last = [None]
+
+        def make():
+            # Like LaserTracker.create_tracker: a new lock starts from the adapted settings
+            last[0] = make_tracker(name, args.mode, args.budget / 1000, previous=last[0])
+            return last[0]
+        elapsed, ious, losses, updates = 0.0, [], 0, 0
+        for clip, boxes in clips.values():
+            e, i, l, u = run_backend(make, clip, boxes, args.lost_iou)
+            elapsed, losses, updates = elapsed + e, losses + l, updates + u
+            ious += i
+        results[name] = {
+            'fps': updates / elapsed if elapsed else 0.0,
+            'mean_iou': float(np.mean(ious)) if ious else 0.0,
+            'loss_per_100_frames': 100.0 * losses / max(1, updates),
+        }
+        r = results[name]
+        extra = ''
+        if args.mode != 'full':
+            r['final'] = last[0].stats()
+            extra = f"   scale {r['final']['scale']} margin {r['final']['margin']}"
+        print(f"  {name:<11} {r['fps']:8.1f} {r['mean_iou']:9.3f} {r['loss_per_100_frames']:10.2f}{extra}")
+
+    # Most reliable backend within budget: fewest losses, then best overlap
+    fits = [n for n in results if results[n]['fps'] >= args.min_fps]
+    if fits:
+        best = min(fits, key=lambda n: (results[n]['loss_per_100_frames'], -results[n]['mean_iou']))
+        print(f"\nBest at >= {args.min_fps:.0f} fps: {best}  (export DISRUPTOR_TRACKER={best})")
+    else:
+        print(f"\nNo backend reaches {args.min_fps:.0f} fps on this machine")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'opencv': cv2.__version__, 'mode': args.mode, 'min_fps': args.min_fps, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
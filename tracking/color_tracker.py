@@ -0,0 +1,122 @@
+"""
+Windowed HSV colour blob tracker (used by tests/cam_test/cam_test.py)
+
+Per frame, only a window around the previous centroid is converted to HSV,
+thresholded, cleaned with one open and one close pass, and labelled with
+connectedComponentsWithStats. The largest component gives area, bbox and
+centroid directly, so no contour extraction, sorting or moments are needed.
+
+The window is sized from the last blob. It grows by GROW each frame the target
+is missing, or when the blob touches a window edge, until it covers the whole
+frame. All buffers are frame-sized and reused through views, so steady state
+allocates no images.
+"""
+
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+MIN_AREA = 500      # Pixels; smaller components are noise
+MIN_HALF = 48       # Smallest window half-size, pixels
+GROW = 2.0          # Window growth per miss / edge contact
+TOLERANCE = 20      # Hue tolerance of color_range()
+
+# cx, cy, area in pixels; bbox (x, y, w, h); all in full-frame coordinates
+ColorBlob = namedtuple('ColorBlob', 'cx cy area bbox')
+
+
+def color_range(frame, x, y, tolerance=TOLERANCE):
+    """(lower, upper) HSV bounds around the hue at (x, y); converts that one pixel only"""
+    hue = int(cv2.cvtColor(frame[y:y + 1, x:x + 1], cv2.COLOR_BGR2HSV)[0, 0, 0])
+    return hue_range(hue, tolerance)
+
+
+def hue_range(hue, tolerance=TOLERANCE):
+    """(lower, upper) HSV bounds around an OpenCV hue (0-179)"""
+    lower = np.array([max(0, hue - tolerance), 100, 100])
+    upper = np.array([min(179, hue + tolerance), 255, 255])
+    return lower, upper
+
+
+class ColorTracker:
+    """Tracks the largest blob of one HSV colour range, searching near where it last was"""
+
+    def __init__(self, lower=None, upper=None, min_area=MIN_AREA, kernel_size=5):
+        self.lower = lower
+        self.upper = upper
+        self.min_area = min_area
+        self.kernel = np.ones((kernel_size, kernel_size), np.uint8)
+        self.hsv = self.mask = self.mask_tmp = None
+        self.center = None   # Last centroid, None = search the whole frame
+        self.half = None     # Window half-size (w, h)
+        self.window = None   # (x, y, w, h) searched on the last update
+        self.window_mask = None  # Cleaned mask of that window (view into a reused buffer)
+
+    def set_color(self, lower, upper):
+        self.lower, self.upper = lower, upper
+        self.reset()
+
+    def reset(self):
+        """Forget the target position; the next update searches the whole frame"""
+        self.center = None
+        self.half = None
+
+    def _allocate(self, shape):
+        self.hsv = np.empty(shape, np.uint8)
+        self.mask = np.empty(shape[:2], np.uint8)
+        self.mask_tmp = np.empty(shape[:2], np.uint8)
+
+    def _place_window(self, fw, fh):
+        if self.center is None or self.half is None:
+            return 0, 0, fw, fh
+        cx, cy = self.center
+        hw, hh = self.half
+        x0, y0 = max(0, int(cx - hw)), max(0, int(cy - hh))
+        x1, y1 = min(fw, int(cx + hw)), min(fh, int(cy + hh))
+        return x0, y0, x1 - x0, y1 - y0
+
+    def _grow(self, fw, fh):
+        if self.half is None:
+            return
+        hw, hh = self.half
+        if 2 * hw >= fw and 2 * hh >= fh:
+            self.reset()  # Window already covers the frame: fall back to a full search
+        else:
+            self.half = (hw * GROW, hh * GROW)
+
+    def update(self, frame):
+        """Find the blob in frame; returns a ColorBlob or None"""
+        if self.lower is None:
+            return None
+        if self.hsv is None or self.hsv.shape != frame.shape:
+            self._allocate(frame.shape)
+        fh, fw = frame.shape[:2]
+        x, y, w, h = self.window = self._place_window(fw, fh)
+
+        # Convert once, and only the window
+        hsv = cv2.cvtColor(frame[y:y + h, x:x + w], cv2.COLOR_BGR2HSV, dst=self.hsv[:h, :w])
+        mask = cv2.inRange(hsv, self.lower, self.upper, dst=self.mask[:h, :w])
+        tmp = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel, dst=self.mask_tmp[:h, :w])
+        mask = cv2.morphologyEx(tmp, cv2.MORPH_CLOSE, self.kernel, dst=mask)
+        self.window_mask = mask
+
+        count, _, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        if count < 2:
+            self._grow(fw, fh)
+            return None
+        best = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+        bx, by, bw, bh, area = stats[best]
+        if area <= self.min_area:
+            self._grow(fw, fh)
+            return None
+
+        cx = x + float(centroids[best][0])
+        cy = y + float(centroids[best][1])
+        self.center = (cx, cy)
+        # Window: the blob plus its own size on each side; wider if it was clipped by the window
+        touching = ((bx == 0 and x > 0) or (by == 0 and y > 0) or
+                    (bx + bw == w and x + w < fw) or (by + bh == h and y + h < fh))
+        scale = GROW if touching else 1.0
+        self.half = (max(MIN_HALF, bw * scale * 1.5), max(MIN_HALF, bh * scale * 1.5))
+        return ColorBlob(int(cx), int(cy), int(area), (x + int(bx), y + int(by), int(bw), int(bh)))
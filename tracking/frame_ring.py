@@ -0,0 +1,226 @@
+"""
+Shared-memory frame ring: one writer process publishes frames, reader processes use them in place
+
+The ring is one multiprocessing.shared_memory block: a control header, a slot
+table and `slots` fixed-size frame buffers of one shape. Frames are never
+pickled or copied between processes: the writer fills a slot in place
+(camera.read(slot), cv2.flip(..., dst=slot), np.copyto) and each reader gets a
+numpy view of it.
+
+Delivery is latest-frame-wins, like object_tracker/pipeline.py's
+LatestFrameSlot, but with any number of readers each seeing every newest
+frame (e.g. a tracker and an encoder):
+
+  - write_seq counts committed frames; latest_slot says where the newest is
+  - each slot carries the seq of the frame in it, or WRITING while it is filled
+  - each reader has a hold index: the slot it is using, or -1. The writer never
+    picks a held slot, so with slots >= readers + 2 it never blocks or waits
+
+A reader re-checks the slot's seq after claiming it and again on release(), so
+a frame overwritten in the narrow claim window is reported instead of used
+silently. Waiting for a new frame polls the header every POLL_INTERVAL.
+
+    ring = FrameRing.create((480, 640, 3), slots=4, readers=2)   # capture process
+    slot = ring.begin(); cv2.flip(frame, 1, dst=slot); ring.commit()
+
+    ring = FrameRing.attach(name, reader=0)                        # tracker process
+    frame = ring.acquire(timeout=1.0)      # view into shared memory, or None
+    ok, bbox = tracker.update(frame)
+    if not ring.release(): ...             # frame changed underneath us; drop the result
+"""
+
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+MAGIC = 0x4858524E47  # 'HXRNG'
+WRITING = -2          # Slot seq while the writer is filling it
+EMPTY = -1
+POLL_INTERVAL = 0.0005  # Seconds between header checks while waiting for a frame
+ALIGN = 64
+
+# Control header, int64 words
+H_MAGIC, H_HEIGHT, H_WIDTH, H_CHANNELS, H_SLOTS, H_READERS, H_WRITE_SEQ, H_LATEST, H_CLOSED = range(9)
+HEADER_WORDS = 16
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _layout(shape, slots, readers):
+    """(header words incl. reader holds, slot table offset, times offset, data offset, slot bytes, total bytes)"""
+    words = HEADER_WORDS + readers
+    table = _align(words * 8)
+    times = _align(table + slots * 2 * 8)
+    data = _align(times + slots * 8)
+    slot_bytes = _align(int(np.prod(shape)))
+    return words, table, times, data, slot_bytes, data + slots * slot_bytes
+
+
+class FrameRing:
+    """Fixed-slot frame ring in shared memory; see the module docstring for the protocol"""
+
+    def __init__(self, shm, owner, reader=None):
+        self.shm = shm
+        self.owner = owner
+        self.reader = reader
+        buf = shm.buf
+        header = np.ndarray((HEADER_WORDS,), np.int64, buf)
+        if header[H_MAGIC] != MAGIC:
+            raise ValueError(f"Shared memory {shm.name} is not a frame ring")
+        self.shape = tuple(int(v) for v in header[[H_HEIGHT, H_WIDTH, H_CHANNELS]] if v)
+        self.slots = int(header[H_SLOTS])
+        self.readers = int(header[H_READERS])
+        words, table, times, data, slot_bytes, _ = _layout(self.shape, self.slots, self.readers)
+        self.header = np.ndarray((words,), np.int64, buf)
+        self.holds = self.header[HEADER_WORDS:]
+        self.table = np.ndarray((self.slots, 2), np.int64, buf, table)  # seq, tag per slot
+        self.times = np.ndarray((self.slots,), np.float64, buf, times)
+        self.frames = [np.ndarray(self.shape, np.uint8, buf, data + i * slot_bytes) for i in range(self.slots)]
+        self.writing = None  # Writer: slot being filled
+        self.held = None     # Reader: (slot, seq) acquired and not yet released
+        self.last_seq = 0    # Reader: newest seq seen
+        self.missed = 0      # Reader: frames committed after last_seq that it never acquired
+
+    @classmethod
+    def create(cls, shape, slots=4, readers=1, name=None):
+        """New ring for frames of shape (h, w[, c]) uint8; the creating process is its writer and owner"""
+        if slots < readers + 2:
+            raise ValueError(f"{readers} readers need at least {readers + 2} slots")
+        *_, size = _layout(shape, slots, readers)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        words = HEADER_WORDS + readers
+        header = np.ndarray((words,), np.int64, shm.buf)
+        header[:] = 0
+        h, w = shape[:2]
+        header[[H_HEIGHT, H_WIDTH, H_CHANNELS, H_SLOTS, H_READERS]] = (h, w, shape[2] if len(shape) > 2 else 0,
+                                                                        slots, readers)
+        header[H_LATEST] = -1
+        header[HEADER_WORDS:] = -1
+        table = np.ndarray((slots, 2), np.int64, shm.buf, _layout(shape, slots, readers)[1])
+        table[:, 0] = EMPTY
+        header[H_MAGIC] = MAGIC  # Last, so attach() never sees a half-initialised ring
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name, reader=None):
+        """Open an existing ring; reader is this process's hold index (0..readers-1), None for the writer"""
+        # track=False: the creator owns the block, so the resource tracker must not unlink it
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:  # Python < 3.13
+            shm = shared_memory.SharedMemory(name=name)
+        ring = cls(shm, owner=False, reader=reader)
+        if reader is not None and not 0 <= reader < ring.readers:
+            raise ValueError(f"Reader index {reader} out of range (ring has {ring.readers})")
+        return ring
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def write_seq(self):
+        return int(self.header[H_WRITE_SEQ])
+
+    @property
+    def closed(self):
+        return bool(self.header[H_CLOSED])
+
+    # ---- Writer ----
+
+    def begin(self):
+        """Pick a free slot and return it as a writable view; publish it with commit()"""
+        latest = int(self.header[H_LATEST])
+        held = set(int(h) for h in self.holds)
+        for step in range(1, self.slots + 1):
+            slot = (latest + step) % self.slots
+            if slot != latest and slot not in held:
+                break
+        self.table[slot, 0] = WRITING
+        self.writing = slot
+        return self.frames[slot]
+
+    def commit(self, tag=0, stamp=None):
+        """Publish the slot from begin(); tag is a free int (e.g. a source frame number). Returns the seq"""
+        slot = self.writing
+        seq = self.write_seq + 1
+        self.table[slot, 1] = tag
+        self.times[slot] = time.monotonic() if stamp is None else stamp
+        self.table[slot, 0] = seq
+        self.header[H_LATEST] = slot
+        self.header[H_WRITE_SEQ] = seq
+        self.writing = None
+        return seq
+
+    def write(self, frame, tag=0):
+        """Copy frame into the ring (when it cannot be produced in place)"""
+        np.copyto(self.begin(), frame)
+        return self.commit(tag)
+
+    def close(self):
+        """Writer: tell readers no more frames will come"""
+        self.header[H_CLOSED] = 1
+
+    # ---- Reader ----
+
+    def acquire(self, timeout=None, newer=True):
+        """Newest frame as a read-only view, held until release(); None on timeout or when the ring closed.
+
+        newer: wait for a frame this reader has not seen yet (False returns the current one at once).
+        """
+        if self.held is not None:
+            self.release()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            seq = self.write_seq
+            if seq > 0 and (seq > self.last_seq or not newer):
+                slot = int(self.header[H_LATEST])
+                self.holds[self.reader] = slot
+                if self.table[slot, 0] == seq:  # Still that frame now that the writer can see our hold
+                    self.held = (slot, seq)
+                    if self.last_seq:
+                        self.missed += max(0, seq - self.last_seq - 1)
+                    self.last_seq = seq
+                    view = self.frames[slot].view()
+                    view.flags.writeable = False
+                    return view
+                self.holds[self.reader] = -1
+                continue  # Overtaken while claiming; take the newer one
+            if self.closed:
+                return None
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(POLL_INTERVAL)
+
+    def info(self):
+        """(seq, tag, commit time) of the held frame"""
+        slot, seq = self.held
+        return seq, int(self.table[slot, 1]), float(self.times[slot])
+
+    def release(self):
+        """Give the held slot back; returns False if it was overwritten while held"""
+        if self.held is None:
+            return True
+        slot, seq = self.held
+        intact = self.table[slot, 0] == seq
+        self.holds[self.reader] = -1
+        self.held = None
+        return bool(intact)
+
+    # ---- Both ----
+
+    def detach(self):
+        """Close this process's mapping; the owner also frees the shared memory.
+
+        Drop every view from acquire()/begin() first: shared memory with live views cannot be closed.
+        """
+        if self.held is not None:
+            self.release()
+        self.header = self.holds = self.table = self.times = None
+        self.frames = []
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
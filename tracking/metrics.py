@@ -0,0 +1,188 @@
+"""
+Fixed-bucket timing histograms, counters and a sampling logger for the frame path
+
+Histograms never grow: observe() is a bisect into a fixed bucket list plus two
+adds under a lock, so it can sit in the per-frame loop. A Registry renders
+everything in the Prometheus text format, which test.py serves on /metrics:
+
+    tracker_stage_seconds_bucket{stage="update",le="0.025"} 412
+    tracker_stage_seconds_sum{stage="update"} 9.87
+    tracker_stage_seconds_count{stage="update"} 450
+
+REGISTRY is the process-wide default that LaserTracker and FrameBroadcaster
+report into.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+# Seconds; covers a 0.1 ms flip up to a stalled 1 s camera read
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class Histogram:
+    """Counts of observations per bucket (upper bounds), plus their sum"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot: above every bound (+Inf)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        """(per-bucket counts, sum, count), consistent with each other"""
+        with self.lock:
+            return list(self.counts), self.sum, self.count
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding quantile q (inf if beyond the last bound), None if empty"""
+        counts, _, count = self.snapshot()
+        if not count:
+            return None
+        rank, seen = q * count, 0
+        for bound, n in zip(self.buckets + (float('inf'),), counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def summary(self):
+        """'mean 3.1 ms, p95 <5 ms' for console reports"""
+        _, total, count = self.snapshot()
+        if not count:
+            return 'no samples'
+        p95 = self.quantile(0.95)
+        return f"mean {1000 * total / count:.2f} ms, p95 <{1000 * p95:g} ms"
+
+
+class Counter:
+    """Monotonic count (or, for gauges, a value that is set)"""
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+
+class Family:
+    """One metric name; a child Histogram/Counter per label value (or a single one if unlabelled)"""
+
+    def __init__(self, name, help, kind, label=None, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.kind = kind  # 'histogram', 'counter' or 'gauge'
+        self.label = label
+        self.buckets = buckets
+        self.children = {}
+        self.lock = threading.Lock()
+
+    def labels(self, value=None):
+        """Child for one label value, created on first use"""
+        child = self.children.get(value)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(
+                    value, Histogram(self.buckets) if self.kind == 'histogram' else Counter())
+        return child
+
+    def remove(self, value):
+        """Drop a child whose label value is gone (e.g. a disconnected client)"""
+        with self.lock:
+            self.children.pop(value, None)
+
+    def _selector(self, value, extra=''):
+        parts = []
+        if self.label is not None:
+            parts.append(f'{self.label}="{value}"')
+        if extra:
+            parts.append(extra)
+        return '{' + ','.join(parts) + '}' if parts else ''
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        with self.lock:
+            children = sorted(self.children.items(), key=lambda item: str(item[0]))
+        for value, child in children:
+            if self.kind != 'histogram':
+                lines.append(f"{self.name}{self._selector(value)} {child.value}")
+                continue
+            counts, total, count = child.snapshot()
+            cumulative = 0
+            for bound, n in zip(child.buckets + (float('inf'),), counts):
+                cumulative += n
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{self._selector(value, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._selector(value)} {total:.6f}")
+            lines.append(f"{self.name}_count{self._selector(value)} {count}")
+
+
+class Registry:
+    """Named metric families; asking for an existing name returns the same family"""
+
+    def __init__(self):
+        self.families = {}
+        self.lock = threading.Lock()
+
+    def _family(self, name, help, kind, label, buckets=DEFAULT_BUCKETS):
+        with self.lock:
+            family = self.families.get(name)
+            if family is None:
+                family = self.families[name] = Family(name, help, kind, label, buckets)
+            return family
+
+    def histogram(self, name, help, label=None, buckets=DEFAULT_BUCKETS):
+        return self._family(name, help, 'histogram', label, buckets)
+
+    def counter(self, name, help, label=None):
+        return self._family(name, help, 'counter', label)
+
+    def gauge(self, name, help, label=None):
+        return self._family(name, help, 'gauge', label)
+
+    def render(self):
+        """All families in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            families = list(self.families.values())
+        for family in families:
+            family.render(lines)
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class SampledLog:
+    """print() at most once per interval; later messages in the interval are counted, not printed"""
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.next = 0.0
+        self.suppressed = 0
+
+    def __call__(self, message):
+        now = time.monotonic()
+        if now < self.next:
+            self.suppressed += 1
+            return
+        if self.suppressed:
+            message = f"{message}  (+{self.suppressed} not shown)"
+            self.suppressed = 0
+        self.next = now + self.interval
+        print(message)
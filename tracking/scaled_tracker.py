@@ -0,0 +1,187 @@
+"""
+Tracking on a downscaled frame or a crop around the target
+
+CSRT and friends cost roughly in proportion to the pixels they search, but the
+target is only ~80x80 of a 640x480 frame. ScaledTracker runs a registry Tracker
+(tracking/trackers.py) on a window of the frame: the whole frame ('scale' mode)
+or the last box grown by `margin` box-sizes on each side ('roi' mode). The window
+is resized by `scale`. Boxes are mapped back to full-frame pixels using the
+window's offset and its exact resize ratio, so overlays and servo mapping are
+unchanged.
+
+The wrapped tracker keeps its own coordinates, so the window only moves when
+the target nears its edge, or when the budget controller changes scale/margin.
+The tracker is then re-initialised on the new window. With adapt=True the
+update time is averaged over ADAPT_EVERY frames and compared to `budget`
+seconds per frame. Over budget, the scale drops first and then the margin. If the
+bottom of that ladder is still over budget, the cheapest settings measured on
+the way down are kept. Well under budget, both grow back in reverse order.
+"""
+
+import time
+
+import cv2
+
+from trackers import create_tracker
+
+MIN_SCALE = 0.25
+MIN_MARGIN = 0.5
+MAX_MARGIN = 2.0
+ADAPT_EVERY = 10    # Frames averaged per budget decision
+
+
+class ScaledTracker:
+    """Tracker on a scaled window of the frame, same init/update interface as trackers.Tracker"""
+
+    def __init__(self, name=None, mode='roi', budget=1 / 30, scale=1.0, margin=MAX_MARGIN, adapt=True):
+        if mode not in ('scale', 'roi'):
+            raise ValueError(f"Unknown tracking mode {mode!r} (expected 'scale' or 'roi')")
+        self.name = name
+        self.mode = mode
+        self.budget = budget
+        self.scale = scale
+        self.margin = margin
+        self.adapt = adapt
+        self.tracker = None
+        self.bbox = None
+        self.frame_shape = None
+        self.window = None       # (x, y, w, h) of the full-frame region tracked
+        self.view_scale = scale  # Scale the current window was initialised with
+        self.factor = (1.0, 1.0)  # Exact resized/original ratio of the window, x and y
+        self.small = None        # Reused resize target
+        self.cost = None         # Mean update() seconds over the last ADAPT_EVERY frames
+        self.spent = 0.0
+        self.frames = 0
+        self.reinits = 0
+        self.retune = False      # Scale or margin changed; apply at the next re-window
+        self.best = None         # (cost, (scale, margin)) cheapest measured while over budget
+        self.floor = False       # Ladder exhausted; hold the best settings until well under budget
+
+    def _place_window(self, shape, bbox):
+        h, w = shape[:2]
+        if self.mode == 'scale':
+            return 0, 0, w, h
+        x, y, bw, bh = bbox
+        pad = int(self.margin * max(bw, bh))
+        x0, y0 = max(0, x - pad), max(0, y - pad)
+        x1, y1 = min(w, x + bw + pad), min(h, y + bh + pad)
+        return x0, y0, x1 - x0, y1 - y0
+
+    def _view(self, frame):
+        """The window of frame the wrapped tracker sees (resized into a reused buffer)"""
+        x, y, w, h = self.window
+        crop = frame[y:y + h, x:x + w]
+        if self.view_scale >= 1.0:
+            return crop
+        size = (max(1, round(w * self.view_scale)), max(1, round(h * self.view_scale)))
+        if self.small is None or self.small.shape[1::-1] != size:
+            self.small = cv2.resize(crop, size, interpolation=cv2.INTER_AREA)
+        else:
+            cv2.resize(crop, size, dst=self.small, interpolation=cv2.INTER_AREA)
+        return self.small
+
+    def _to_local(self, bbox):
+        x, y, w, h = bbox
+        fx, fy = self.factor
+        return ((x - self.window[0]) * fx, (y - self.window[1]) * fy, w * fx, h * fy)
+
+    def _to_full(self, bbox):
+        x, y, w, h = bbox
+        fx, fy = self.factor
+        return (round(self.window[0] + x / fx), round(self.window[1] + y / fy),
+                round(w / fx), round(h / fy))
+
+    def init(self, frame, bbox):
+        """Place a window around bbox and start the wrapped tracker on it"""
+        self.frame_shape = frame.shape
+        self.window = self._place_window(frame.shape, bbox)
+        self.view_scale = self.scale  # A retune changes self.scale; the window keeps this one
+        view = self._view(frame)
+        self.factor = (view.shape[1] / self.window[2], view.shape[0] / self.window[3])
+        self.tracker = create_tracker(self.name)
+        self.bbox = tuple(int(v) for v in bbox)
+        self.retune = False
+        return self.tracker.init(view, self._to_local(self.bbox))
+
+    def _near_edge(self, bbox):
+        """Target within half a margin of a window edge that is not also the frame edge"""
+        if self.mode == 'scale':
+            return False
+        x, y, w, h = bbox
+        wx, wy, ww, wh = self.window
+        slack = self.margin * max(w, h) / 2
+        fh, fw = self.frame_shape[:2]
+        return ((x - wx < slack and wx > 0) or (y - wy < slack and wy > 0) or
+                (wx + ww - (x + w) < slack and wx + ww < fw) or
+                (wy + wh - (y + h) < slack and wy + wh < fh))
+
+    def _adapt(self, cost):
+        """Budget controller, run every ADAPT_EVERY frames on their mean update() cost"""
+        self.cost = cost
+        settings = (self.scale, self.margin)
+        if self.best is None or cost < self.best[0]:
+            self.best = (cost, settings)
+        if cost > self.budget:
+            if self.floor:
+                return
+            if self.scale > MIN_SCALE:
+                self.scale = max(MIN_SCALE, self.scale * 0.8)
+            elif self.mode == 'roi' and self.margin > MIN_MARGIN:
+                self.margin = max(MIN_MARGIN, self.margin * 0.75)
+            else:
+                # Whole ladder tried and still over budget. Cost is not monotonic in scale
+                # (CSRT resamples the target to a fixed template), so settle on the cheapest seen
+                self.floor = True
+                if self.best[1] != settings:
+                    self.scale, self.margin = self.best[1]
+                    self.retune = True
+                return
+            self.retune = True
+        elif cost < self.budget / 2:
+            self.floor = False
+            self.best = None
+            if self.mode == 'roi' and self.margin < MAX_MARGIN:
+                self.margin = min(MAX_MARGIN, self.margin * 1.25)
+            elif self.scale < 1.0:
+                self.scale = min(1.0, self.scale * 1.25)
+            else:
+                return
+            self.retune = True
+
+    def update(self, frame):
+        """Returns (ok, (x, y, w, h)) in full-frame pixels"""
+        self.frame_shape = frame.shape
+        retuning = self.retune
+        start = time.perf_counter()
+        ok, local = self.tracker.update(self._view(frame))
+        if ok:
+            self.bbox = self._to_full(local)
+            if self.retune or self._near_edge(self.bbox):
+                self.reinits += 1
+                ok = self.init(frame, self.bbox)
+        elapsed = time.perf_counter() - start
+        if not retuning:
+            # The one-off re-init after a settings change is not part of their steady cost
+            self.spent += elapsed
+            self.frames += 1
+        if self.adapt and self.frames >= ADAPT_EVERY:
+            self._adapt(self.spent / self.frames)
+            self.spent, self.frames = 0.0, 0
+        return ok, self.bbox
+
+    def stats(self):
+        return {'mode': self.mode, 'scale': round(self.scale, 3), 'margin': round(self.margin, 2),
+                'window': self.window, 'update_ms': round((self.cost or 0) * 1000, 2),
+                'budget_ms': round(self.budget * 1000, 2), 'reinits': self.reinits}
+
+
+def make_tracker(name=None, mode='full', budget=1 / 30, previous=None):
+    """Registry Tracker for mode 'full', else a ScaledTracker.
+
+    A new ScaledTracker starts from the scale/margin that previous had adapted to.
+    """
+    if mode == 'full':
+        return create_tracker(name)
+    if isinstance(previous, ScaledTracker):
+        return ScaledTracker(name, mode, budget, scale=previous.scale, margin=previous.margin)
+    return ScaledTracker(name, mode, budget)
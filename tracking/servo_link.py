@@ -0,0 +1,223 @@
+"""
+Host-side servo channel for hardware/arduino_servo.ino
+
+Only the newest (tilt, pan) target is ever sent: send() overwrites any
+target the writer thread has not sent yet, and repeats of the last sent
+angles are skipped. Commands are compact binary frames at SERVO_BAUD:
+
+    A5 5A | seq | tilt | pan | checksum     (checksum = seq + tilt + pan, mod 256)
+
+The Arduino answers each accepted frame with A5 5B | seq | tilt | pan | checksum.
+A reader thread matches those ACKs to sent commands by sequence number and
+records command->ACK round-trip times, lost commands and malformed replies.
+"""
+
+import threading
+import time
+from collections import deque
+
+import serial
+
+SERVO_BAUD = 115200
+SYNC = 0xA5
+CMD = 0x5A
+ACK = 0x5B
+FRAME_LEN = 6
+MIN_INTERVAL = 0.005  # Seconds between writes; the sketch steps servos every 5 ms
+ACK_TIMEOUT = 0.5     # Seconds without an ACK before a command counts as dropped
+
+
+def checksum(seq, tilt, pan):
+    return (seq + tilt + pan) & 0xFF
+
+
+def encode_command(seq, tilt, pan):
+    """Pack one binary servo command frame"""
+    tilt = max(0, min(180, int(tilt)))
+    pan = max(0, min(180, int(pan)))
+    return bytes((SYNC, CMD, seq & 0xFF, tilt, pan, checksum(seq & 0xFF, tilt, pan)))
+
+
+def percentiles(samples, points=(50, 95, 99)):
+    """{'p50': .., 'p95': .., 'p99': ..} of a list (nearest rank), empty dict if no samples"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+    return {f'p{p}': ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+            for p in points}
+
+
+class AckTracker:
+    """Matches Arduino ACK frames to sent commands and records round-trip times"""
+
+    def __init__(self, timeout=ACK_TIMEOUT, history=1000):
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.inflight = {}  # seq -> (send time, tilt, pan)
+        self.rtt = deque(maxlen=history)  # Seconds, most recent ACKs
+        self.buf = bytearray()
+        self.acked = 0
+        self.dropped = 0     # No ACK within timeout (or seq reused before it came)
+        self.malformed = 0   # Bad checksum, unknown frame type, or echoed angles differ
+        self.unmatched = 0   # Valid ACK for a seq we are not waiting on (e.g. arrived late)
+        self.text_lines = 0  # Banner / text-protocol lines from the sketch
+
+    def sent(self, seq, tilt, pan, stamp):
+        with self.lock:
+            if seq in self.inflight:
+                self.dropped += 1
+            self.inflight[seq] = (stamp, tilt, pan)
+
+    def expire(self, now):
+        with self.lock:
+            stale = [seq for seq, (stamp, _, _) in self.inflight.items() if now - stamp > self.timeout]
+            for seq in stale:
+                del self.inflight[seq]
+            self.dropped += len(stale)
+
+    def feed(self, data, now):
+        """Parse received bytes; complete ACKs are matched against in-flight commands"""
+        buf = self.buf
+        buf += data
+        while buf:
+            start = buf.find(SYNC)
+            if start < 0:
+                self.text_lines += buf.count(b'\n')
+                buf.clear()
+                return
+            if start:
+                self.text_lines += buf.count(b'\n', 0, start)
+                del buf[:start]
+            if len(buf) < FRAME_LEN:
+                return
+            _, kind, seq, tilt, pan, total = buf[:FRAME_LEN]
+            if kind != ACK or checksum(seq, tilt, pan) != total:
+                self.malformed += 1
+                del buf[:1]  # Resync on the next SYNC byte
+                continue
+            del buf[:FRAME_LEN]
+            with self.lock:
+                entry = self.inflight.pop(seq, None)
+                if entry is None:
+                    self.unmatched += 1
+                    continue
+                stamp, sent_tilt, sent_pan = entry
+                self.rtt.append(now - stamp)
+                self.acked += 1
+                if (tilt, pan) != (sent_tilt, sent_pan):
+                    self.malformed += 1
+
+    def stats(self):
+        """Counts plus command->ACK round-trip percentiles in ms"""
+        with self.lock:
+            samples = [r * 1000 for r in self.rtt]
+            out = {'acked': self.acked, 'dropped': self.dropped, 'malformed': self.malformed,
+                   'unmatched': self.unmatched, 'in_flight': len(self.inflight)}
+        out.update({f'rtt_{k}_ms': v for k, v in percentiles(samples).items()})
+        return out
+
+
+class ServoChannel:
+    """Coalescing, rate-limited servo command writer running on a background thread"""
+
+    def __init__(self, port, baudrate=SERVO_BAUD, min_interval=MIN_INTERVAL, ser=None, reset_wait=2.0,
+                 read_acks=True):
+        if ser is None:
+            ser = serial.Serial(port, baudrate, timeout=0.1)
+            time.sleep(reset_wait)  # Opening the port resets the Arduino
+            ser.reset_input_buffer()  # Drop the boot banner
+        self.ser = ser
+        self.acks = AckTracker()
+        self.min_interval = min_interval
+        self.cond = threading.Condition()
+        self.pending = None     # Newest (tilt, pan) not yet written
+        self.last_sent = None
+        self.seq = 0
+        self.sent = 0
+        self.coalesced = 0      # Targets overwritten before they were written
+        self.skipped = 0        # send() calls equal to the last sent angles
+        self.write_errors = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name='servo-writer', daemon=True)
+        self.thread.start()
+        self.reader = None
+        if read_acks:
+            # Reading also keeps unread ACKs from filling the host's input buffer
+            self.reader = threading.Thread(target=self._read_acks, name='servo-ack-reader', daemon=True)
+            self.reader.start()
+
+    @property
+    def is_open(self):
+        return self.running and self.ser.is_open
+
+    def send(self, tilt, pan):
+        """Queue a target; never blocks on the serial port"""
+        target = (int(tilt), int(pan))
+        with self.cond:
+            if self.pending is not None:
+                self.coalesced += 1
+            elif target == self.last_sent:
+                self.skipped += 1
+                return
+            self.pending = target
+            self.cond.notify()
+
+    def _run(self):
+        last_write = 0.0
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending is not None or not self.running)
+                if not self.running:
+                    return
+            # Let further targets coalesce until the rate limit allows a write
+            wait = last_write + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            with self.cond:
+                target, self.pending = self.pending, None
+                if target is None or target == self.last_sent:
+                    continue
+                self.seq = (self.seq + 1) & 0xFF
+                seq = self.seq
+            frame = encode_command(seq, *target)
+            self.acks.sent(seq, frame[3], frame[4], time.monotonic())
+            try:
+                self.ser.write(frame)
+            except Exception as e:
+                self.write_errors += 1
+                print(f"Servo write error: {e}")
+                continue
+            last_write = time.monotonic()
+            with self.cond:
+                self.last_sent = target
+                self.sent += 1
+
+    def _read_acks(self):
+        while self.running:
+            try:
+                data = self.ser.read(max(1, self.ser.in_waiting))
+            except Exception as e:
+                if self.running:
+                    print(f"Servo read error: {e}")
+                return
+            now = time.monotonic()
+            if data:
+                self.acks.feed(data, now)
+            self.acks.expire(now)
+
+    def stats(self):
+        out = {'sent': self.sent, 'coalesced': self.coalesced,
+               'skipped': self.skipped, 'write_errors': self.write_errors}
+        if self.reader:
+            out.update(self.acks.stats())
+        return out
+
+    def close(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        self.thread.join(timeout=1)
+        if self.reader:
+            self.reader.join(timeout=1)
+        if self.ser.is_open:
+            self.ser.close()
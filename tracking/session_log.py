@@ -0,0 +1,226 @@
+"""
+Tracker session recording: frames, operator events and servo output in one indexed file
+
+Layout (little-endian). A reader mmaps the file and gets zero-copy payload views:
+
+    header   MAGIC (8) | index offset u64 | index count u64 | reserved u64
+    records  length u32 | kind u16 | 0 u16 | frame u32 | 0 u32 | time f64 | payload, padded to 8
+    index    one INDEX_DTYPE entry per record (written by close())
+
+`frame` is the frame a record belongs to: its own number for frames, the frame
+an event was applied to, or the frame a servo command was computed from. A
+click is applied to (initialises a tracker on) the frame published when it
+arrived, but the tracker only takes over frames later, once init returns;
+TRACK records the frame on which each tracker change (install or stop) first
+took effect, so a replay can apply it there too. `time`
+is seconds since the recording started. If the recorder never closed (crash,
+power cut), the header's index offset is still 0 and the reader rebuilds the
+index by walking the records.
+
+Payloads: META is JSON (source script, tracker, ...). JPEG is the encoded
+bytes as received. RAW is u16 height, width, channels, pad, then BGR pixels.
+CLICK is i16 x, y. SERVO is u8 tilt, pan. STOP is empty. CENTER is u8 during
+(1: it landed while the frame's tracker updated, so that update already used
+it; 0, or empty in older files: the next frame uses it). TRACK is
+u32 track id, u8 phase, u8 tracking, i16 x, y, u32 source frame: the change to
+that track id (a tracker initialised at the click (x, y) on the source frame,
+or no tracker) was seen before the frame's tracker update (phase 0: the frame
+already uses it) or after it (phase 1: the frame's result was discarded; the
+next frame uses it).
+"""
+
+import json
+import mmap
+import struct
+import threading
+import time
+
+import cv2
+import numpy as np
+
+MAGIC = b'HXSESS\x00\x01'
+HEADER = struct.Struct('<8sQQQ')
+RECORD = struct.Struct('<IHHIId')
+RAW_HEADER = struct.Struct('<HHHH')
+CLICK = struct.Struct('<hh')
+SERVO = struct.Struct('<BB')
+TRACK = struct.Struct('<IBBhhI')
+CENTER = struct.Struct('<B')
+
+META, JPEG, RAW, CLICK_EVENT, STOP_EVENT, CENTER_EVENT, SERVO_CMD, TRACK_EVENT = range(8)
+FRAME_KINDS = (JPEG, RAW)
+KIND_NAMES = {META: 'meta', JPEG: 'jpeg', RAW: 'raw', CLICK_EVENT: 'click', STOP_EVENT: 'stop',
+              CENTER_EVENT: 'center', SERVO_CMD: 'servo', TRACK_EVENT: 'track'}
+
+INDEX_DTYPE = np.dtype([('offset', '<u8'), ('length', '<u4'), ('kind', '<u2'), ('pad', '<u2'),
+                        ('frame', '<u4'), ('pad2', '<u4'), ('time', '<f8')])
+
+
+def _padding(length):
+    return -length % 8
+
+
+class SessionRecorder:
+    """Appends frames, events and servo commands to a session file; safe to call from any thread"""
+
+    def __init__(self, path, meta=None, frame_format='jpeg', quality=95):
+        """frame_format: 'jpeg' (compact) or 'raw' (bit-exact) for image() frames"""
+        if frame_format not in ('jpeg', 'raw'):
+            raise ValueError(f"Unknown frame format {frame_format!r}")
+        self.path = path
+        self.frame_format = frame_format
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        self.lock = threading.Lock()
+        self.file = open(path, 'wb', buffering=1 << 20)
+        self.file.write(HEADER.pack(MAGIC, 0, 0, 0))
+        self.offset = HEADER.size
+        self.index = []
+        self.frames = 0
+        self.start = time.monotonic()
+        self._write(META, 0, json.dumps(dict(meta or {}, frame_format=frame_format,
+                                             created=time.time())).encode())
+
+    def _write(self, kind, frame, *parts):
+        """Append one record; caller holds no lock"""
+        length = sum(memoryview(p).nbytes for p in parts)
+        with self.lock:
+            stamp = time.monotonic() - self.start
+            if kind in FRAME_KINDS:
+                frame = self.frames
+                self.frames += 1
+            self.file.write(RECORD.pack(length, kind, 0, frame, 0, stamp))
+            for part in parts:
+                self.file.write(part)
+            self.file.write(bytes(_padding(length)))
+            self.index.append((self.offset + RECORD.size, length, kind, 0, frame, 0, stamp))
+            self.offset += RECORD.size + length + _padding(length)
+        return frame
+
+    def jpeg(self, data):
+        """Record one encoded frame exactly as received; returns its frame number"""
+        return self._write(JPEG, 0, data)
+
+    def image(self, frame):
+        """Record one BGR frame in the recorder's frame_format; returns its frame number"""
+        if self.frame_format == 'jpeg':
+            return self._write(JPEG, 0, cv2.imencode('.jpg', frame, self.params)[1].data)
+        h, w = frame.shape[:2]
+        c = frame.shape[2] if frame.ndim == 3 else 1
+        return self._write(RAW, 0, RAW_HEADER.pack(h, w, c, 0), np.ascontiguousarray(frame).data)
+
+    def click(self, x, y, frame):
+        self._write(CLICK_EVENT, frame, CLICK.pack(int(x), int(y)))
+
+    def stop(self, frame):
+        self._write(STOP_EVENT, frame)
+
+    def center(self, frame, during=False):
+        self._write(CENTER_EVENT, frame, CENTER.pack(bool(during)))
+
+    def servo(self, tilt, pan, frame):
+        self._write(SERVO_CMD, frame, SERVO.pack(int(tilt), int(pan)))
+
+    def track(self, frame, track_id, source=None, phase=0):
+        """Tracker change track_id took effect on frame; source: (x, y, click frame) of the tracker, None for a stop"""
+        x, y, click_frame = source or (0, 0, 0)
+        self._write(TRACK_EVENT, frame, TRACK.pack(track_id, phase, source is not None, x, y, click_frame))
+
+    def close(self):
+        """Write the index and point the header at it"""
+        with self.lock:
+            if self.file.closed:
+                return
+            index = np.array(self.index, dtype=INDEX_DTYPE)
+            self.file.write(index.tobytes())
+            self.file.seek(0)
+            self.file.write(HEADER.pack(MAGIC, self.offset, len(index), 0))
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SessionLog:
+    """Memory-mapped, read-only view of a recorded session"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_offset, count, _ = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a session recording")
+        self.recovered = index_offset == 0
+        if self.recovered:
+            self.index = self._scan()
+        else:
+            self.index = np.frombuffer(self.mm, INDEX_DTYPE, count, index_offset)
+        self.meta = json.loads(bytes(self.payload(0))) if len(self.index) else {}
+        self.frame_index = self.index[np.isin(self.index['kind'], FRAME_KINDS)]
+
+    def _scan(self):
+        """Rebuild the index of a recording that was never closed (truncated records dropped)"""
+        entries = []
+        offset, size = HEADER.size, len(self.mm)
+        while offset + RECORD.size <= size:
+            length, kind, _, frame, _, stamp = RECORD.unpack_from(self.mm, offset)
+            if offset + RECORD.size + length > size:
+                break
+            entries.append((offset + RECORD.size, length, kind, 0, frame, 0, stamp))
+            offset += RECORD.size + length + _padding(length)
+        return np.array(entries, dtype=INDEX_DTYPE)
+
+    def payload(self, i):
+        entry = self.index[i]
+        start = int(entry['offset'])
+        return memoryview(self.mm)[start:start + int(entry['length'])]
+
+    def __len__(self):
+        return len(self.frame_index)
+
+    def frame_payload(self, n):
+        """(kind, memoryview) of frame n"""
+        entry = self.frame_index[n]
+        start = int(entry['offset'])
+        return int(entry['kind']), memoryview(self.mm)[start:start + int(entry['length'])]
+
+    def frame_time(self, n):
+        return float(self.frame_index[n]['time'])
+
+    def decode(self, n, out=None):
+        """Frame n as a BGR image (RAW frames are copied into out when it fits)"""
+        kind, data = self.frame_payload(n)
+        if kind == JPEG:
+            return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        h, w, c, _ = RAW_HEADER.unpack_from(data, 0)
+        image = np.frombuffer(data, np.uint8, h * w * c, RAW_HEADER.size).reshape((h, w, c) if c > 1 else (h, w))
+        if out is not None and out.shape == image.shape:
+            np.copyto(out, image)
+            return out
+        return image.copy()
+
+    def events(self):
+        """[(kind name, frame, time, value)] for clicks, stops, centres, servo commands and tracker changes, in order"""
+        out = []
+        for i, entry in enumerate(self.index):
+            kind = int(entry['kind'])
+            if kind in (META,) + FRAME_KINDS:
+                continue
+            data = self.payload(i)
+            value = None
+            if kind == CLICK_EVENT:
+                value = CLICK.unpack(data)
+            elif kind == SERVO_CMD:
+                value = SERVO.unpack(data)
+            elif kind == TRACK_EVENT:
+                value = TRACK.unpack(data)
+            elif kind == CENTER_EVENT and len(data):
+                value = CENTER.unpack(data)
+            out.append((KIND_NAMES[kind], int(entry['frame']), float(entry['time']), value))
+        return out
+
+    def close(self):
+        self.index = self.frame_index = None
+        self.mm.close()
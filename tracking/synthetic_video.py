@@ -0,0 +1,322 @@
+"""
+Deterministic synthetic video with ground truth, for running trackers without a camera
+
+A SyntheticVideo renders frame i of a clip: a textured square or a solid
+coloured disc moving over a textured background on a known trajectory. Speed,
+hiding (occlusion), blur, sensor noise and static distractor blobs are all
+configurable. Frame i is always the same image, and ground_truth(i) is its
+(x, y, w, h) box plus a visible flag.
+
+It can be consumed four ways:
+
+    cap = SyntheticCapture(SyntheticVideo(trajectory='lissajous'))   # cv2.VideoCapture stand-in
+    LaserTracker(camera=cap)
+
+    python3 tracking/synthetic_video.py serve --port 8000       # MJPEG at /stream.mjpg
+    DISRUPTOR_STREAM_URL=http://127.0.0.1:8000/stream.mjpg python3 object_tracker/object_tracker.py
+
+    DISRUPTOR_TRACK_HUE=0 python3 tracking/synthetic_video.py run tests/cam_test/cam_test.py --headless --target color
+        # runs a script unmodified, with cv2.VideoCapture replaced by SyntheticCapture
+
+    python3 tracking/synthetic_video.py write clip.avi --gt clip.csv   # for bench_trackers --clip
+
+Capture and server run at full speed unless a frame rate is given.
+"""
+
+import argparse
+import math
+import os
+import runpy
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+TRAJECTORIES = ('static', 'linear', 'circle', 'lissajous', 'zigzag')
+PERIOD = 300           # Frames per lap at speed 1.0
+NOISE_FIELDS = 8       # Pre-generated noise frames, cycled
+BOUNDARY = b'FRAME'
+
+
+class SyntheticVideo:
+    """Renders deterministic frames of one moving target; ground_truth(i) gives its box"""
+
+    def __init__(self, width=640, height=480, frames=PERIOD, fps=30, target='textured', size=80,
+                 color=(0, 0, 255), trajectory='circle', speed=1.0, occlusion=0.0, blur=0.0,
+                 noise=0.0, distractors=0, seed=0):
+        """
+        target:     'textured' (square of random texture) or 'color' (solid disc of `color`, BGR)
+        speed:      laps of the trajectory per PERIOD frames
+        occlusion:  fraction of every 100 frames (at their end) during which the target is hidden
+        blur:       Gaussian sigma applied to the whole frame (defocus / motion smear)
+        noise:      standard deviation of additive sensor noise, in grey levels
+        distractors: static discs in other hues, placed at random (seeded)
+        """
+        if trajectory not in TRAJECTORIES:
+            raise ValueError(f"Unknown trajectory {trajectory!r}, expected one of {TRAJECTORIES}")
+        self.width, self.height = width, height
+        self.frames, self.fps = frames, fps
+        self.target, self.size, self.color = target, size, color
+        self.trajectory, self.speed = trajectory, speed
+        self.occlusion, self.blur, self.noise = occlusion, blur, noise
+
+        rng = np.random.default_rng(seed)
+        background = rng.integers(30, 220, (height, width, 3), dtype=np.uint8)
+        self.background = cv2.GaussianBlur(background, (0, 0), 3)
+        for i in range(distractors):
+            center = (int(rng.integers(size, width - size)), int(rng.integers(size, height - size)))
+            hue = (int(cv2.cvtColor(np.uint8([[color]]), cv2.COLOR_BGR2HSV)[0, 0, 0]) + 45 * (i + 1)) % 180
+            bgr = cv2.cvtColor(np.uint8([[[hue, 220, 220]]]), cv2.COLOR_HSV2BGR)[0, 0].tolist()
+            cv2.circle(self.background, center, size // 3, bgr, -1)
+        texture = cv2.GaussianBlur(rng.integers(0, 255, (size, size, 3), dtype=np.uint8), (0, 0), 1.5)
+        self.texture = texture
+        disc = np.zeros((size, size), np.uint8)
+        cv2.circle(disc, (size // 2, size // 2), size // 2, 255, -1)
+        self.disc = disc.astype(bool)[:, :, None]
+        self.solid = np.full((size, size, 3), color, np.uint8)
+        self.noise_fields = None
+        if noise:
+            self.noise_fields = [rng.normal(0, noise, (height, width, 3)).astype(np.int16)
+                                 for _ in range(NOISE_FIELDS)]
+            self._work = np.empty((height, width, 3), np.int16)
+
+    def position(self, i):
+        """Top-left corner of the target in frame i"""
+        w, h, s = self.width, self.height, self.size
+        span_x, span_y = (w - s) / 2, (h - s) / 2
+        phase = 2 * math.pi * self.speed * i / PERIOD
+        if self.trajectory == 'static':
+            u, v = 0.0, 0.0
+        elif self.trajectory == 'linear':
+            u, v = 2 / math.pi * math.asin(math.sin(phase)), 0.0  # Triangle wave: constant speed
+        elif self.trajectory == 'circle':
+            u, v = math.cos(phase), math.sin(phase)
+        elif self.trajectory == 'lissajous':
+            u, v = math.sin(3 * phase), math.sin(2 * phase + math.pi / 4)
+        else:  # zigzag
+            u = 2 / math.pi * math.asin(math.sin(phase))
+            v = 2 / math.pi * math.asin(math.sin(5 * phase))
+        return int(round(span_x + 0.9 * span_x * u)), int(round(span_y + 0.9 * span_y * v))
+
+    def visible(self, i):
+        return (i % 100) < 100 - int(round(self.occlusion * 100))
+
+    def ground_truth(self, i):
+        """((x, y, w, h), visible) for frame i; the box is where the target is even when hidden"""
+        x, y = self.position(i)
+        return (x, y, self.size, self.size), self.visible(i)
+
+    def render(self, i, out=None):
+        """Frame i as BGR uint8, written into out if it has the right shape"""
+        shape = self.background.shape
+        if out is None or out.shape != shape or out.dtype != np.uint8:
+            out = np.empty(shape, np.uint8)
+        np.copyto(out, self.background)
+        if self.visible(i):
+            x, y = self.position(i)
+            patch = out[y:y + self.size, x:x + self.size]
+            if self.target == 'color':
+                np.copyto(patch, self.solid, where=self.disc)
+            else:
+                np.copyto(patch, self.texture)
+        if self.blur:
+            cv2.GaussianBlur(out, (0, 0), self.blur, dst=out)
+        if self.noise_fields:
+            work = self._work
+            np.add(out, self.noise_fields[i % NOISE_FIELDS], out=work)
+            np.clip(work, 0, 255, out=work)
+            np.copyto(out, work, casting='unsafe')
+        return out
+
+
+class SyntheticCapture:
+    """cv2.VideoCapture stand-in over a SyntheticVideo; truth holds the last frame's ground truth"""
+
+    def __init__(self, video=None, fps=None, loop=True):
+        """fps: pace read() to this rate (None = as fast as it is called)"""
+        self.video = video or SyntheticVideo()
+        self.fps = fps
+        self.loop = loop
+        self.index = 0
+        self.truth = None
+        self.opened = True
+        self._next = None
+
+    def isOpened(self):
+        return self.opened
+
+    def read(self, image=None):
+        if not self.opened:
+            return False, None
+        if self.index >= self.video.frames:
+            if not self.loop:
+                return False, None
+            self.index = 0
+        if self.fps:
+            now = time.monotonic()
+            if self._next is not None and now < self._next:
+                time.sleep(self._next - now)
+            self._next = max(now, self._next or now) + 1 / self.fps
+        frame = self.video.render(self.index, image)
+        self.truth = self.video.ground_truth(self.index)
+        self.index += 1
+        return True, frame
+
+    def grab(self):
+        return self.read()[0]
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.index = int(value)
+            return True
+        return False  # Resolution and the like are fixed by the SyntheticVideo
+
+    def get(self, prop):
+        return {cv2.CAP_PROP_FRAME_WIDTH: self.video.width,
+                cv2.CAP_PROP_FRAME_HEIGHT: self.video.height,
+                cv2.CAP_PROP_FPS: self.fps or self.video.fps,
+                cv2.CAP_PROP_FRAME_COUNT: self.video.frames,
+                cv2.CAP_PROP_POS_FRAMES: self.index}.get(prop, 0.0)
+
+    def release(self):
+        self.opened = False
+
+
+def make_handler(video, fps, quality, path):
+    class MJPEGHandler(BaseHTTPRequestHandler):
+        """Each client gets the clip from frame 0, tagged with X-Frame-Index"""
+
+        def do_GET(self):
+            if self.path != path:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Cache-Control', 'no-cache, private')
+            self.send_header('Content-Type', f'multipart/x-mixed-replace; boundary={BOUNDARY.decode()}')
+            self.end_headers()
+            cap = SyntheticCapture(video, fps=fps)
+            frame = None
+            params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+            try:
+                while True:
+                    index = cap.index % video.frames
+                    _, frame = cap.read(frame)
+                    jpeg = cv2.imencode('.jpg', frame, params)[1]
+                    self.wfile.write(b'--' + BOUNDARY + b'\r\nContent-Type: image/jpeg\r\n' +
+                                     f'Content-Length: {len(jpeg)}\r\nX-Frame-Index: {index}\r\n\r\n'.encode())
+                    self.wfile.write(jpeg.data)
+                    self.wfile.write(b'\r\n')
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, format, *args):
+            pass
+
+    return MJPEGHandler
+
+
+def serve_mjpeg(video, host='127.0.0.1', port=8000, fps=None, quality=85, path='/stream.mjpg'):
+    """Start a background MJPEG server for video; returns the server (call shutdown() to stop)"""
+    server = ThreadingHTTPServer((host, port), make_handler(video, fps, quality, path))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='synthetic-mjpeg', daemon=True).start()
+    return server
+
+
+def patch_capture(video, fps=None, headless=False):
+    """Make cv2.VideoCapture(...) return SyntheticCaptures of video; headless also no-ops the HighGUI calls"""
+    cv2.VideoCapture = lambda *args, **kwargs: SyntheticCapture(video, fps=fps)
+    if headless:
+        keys = {'n': 0}
+
+        def wait_key(delay=0):
+            keys['n'] += 1  # Press 'q' once the clip has played through once
+            return ord('q') if keys['n'] > video.frames else -1
+
+        cv2.imshow = lambda *args: None
+        cv2.namedWindow = lambda *args: None
+        cv2.setMouseCallback = lambda *args, **kwargs: None
+        cv2.destroyAllWindows = lambda: None
+        cv2.waitKey = wait_key
+
+
+def write_clip(video, path, gt_path=None):
+    """Encode the clip to a video file and its ground truth to CSV rows x,y,w,h,visible"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), video.fps, (video.width, video.height))
+    frame = None
+    rows = []
+    for i in range(video.frames):
+        frame = video.render(i, frame)
+        writer.write(frame)
+        (x, y, w, h), visible = video.ground_truth(i)
+        rows.append(f"{x},{y},{w},{h},{int(visible)}\n")
+    writer.release()
+    if gt_path:
+        with open(gt_path, 'w') as f:
+            f.writelines(rows)
+
+
+def video_from_args(args):
+    return SyntheticVideo(width=args.width, height=args.height, frames=args.frames, fps=args.clip_fps,
+                          target=args.target, size=args.size, trajectory=args.trajectory, speed=args.speed,
+                          occlusion=args.occlusion, blur=args.blur, noise=args.noise,
+                          distractors=args.distractors, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    serve = sub.add_parser('serve', help="MJPEG HTTP server")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8000)
+    serve.add_argument('--quality', type=int, default=85)
+    run = sub.add_parser('run', help="Run a tracking script with cv2.VideoCapture patched")
+    run.add_argument('script')
+    run.add_argument('--headless', action='store_true', help="No windows; quit after one pass of the clip")
+    write = sub.add_parser('write', help="Write the clip to a video file")
+    write.add_argument('output')
+    write.add_argument('--gt', help="Ground truth CSV (x,y,w,h,visible per frame)")
+    for p in (serve, run, write):
+        p.add_argument('--width', type=int, default=640)
+        p.add_argument('--height', type=int, default=480)
+        p.add_argument('--frames', type=int, default=PERIOD)
+        p.add_argument('--clip-fps', type=float, default=30, help="Nominal clip frame rate")
+        p.add_argument('--fps', type=float, default=None, help="Pace delivery (default: full speed)")
+        p.add_argument('--target', choices=('textured', 'color'), default='textured')
+        p.add_argument('--size', type=int, default=80)
+        p.add_argument('--trajectory', choices=TRAJECTORIES, default='circle')
+        p.add_argument('--speed', type=float, default=1.0)
+        p.add_argument('--occlusion', type=float, default=0.0)
+        p.add_argument('--blur', type=float, default=0.0)
+        p.add_argument('--noise', type=float, default=0.0)
+        p.add_argument('--distractors', type=int, default=0)
+        p.add_argument('--seed', type=int, default=0)
+    args, script_args = parser.parse_known_args()  # Unrecognised options go to the run script
+    if script_args and args.command != 'run':
+        parser.error(f"unrecognized arguments: {' '.join(script_args)}")
+    video = video_from_args(args)
+
+    if args.command == 'serve':
+        server = serve_mjpeg(video, args.host, args.port, fps=args.fps, quality=args.quality)
+        print(f"Serving http://{args.host}:{args.port}/stream.mjpg (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.shutdown()
+    elif args.command == 'run':
+        patch_capture(video, fps=args.fps, headless=args.headless)
+        sys.argv = [args.script] + script_args
+        sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))  # As `python3 script` would
+        runpy.run_path(args.script, run_name='__main__')
+    else:
+        write_clip(video, args.output, args.gt)
+        print(f"Wrote {video.frames} frames to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+OpenCV single-object tracker registry
+
+OpenCV has moved its tracker factories around between releases: cv2.TrackerX_create,
+cv2.TrackerX.create, cv2.legacy.TrackerX_create and cv2.legacy.TrackerX.create.
+Which ones exist depends on the version and on whether opencv-contrib is installed.
+The legacy API also behaves differently: init() returns a bool and boxes come back
+as floats, while the current API's init() returns None. This module resolves each
+backend name to whichever factory works, checks it on a tiny probe frame, and hands
+back a Tracker with one interface:
+
+    from trackers import create_tracker, available_trackers
+    tracker = create_tracker('KCF')      # Falls back to the best available backend
+    ok = tracker.init(frame, (x, y, w, h))
+    ok, (x, y, w, h) = tracker.update(frame)  # ints
+
+Set DISRUPTOR_TRACKER to override a script's default backend on a deployment
+(tracking/bench_trackers.py shows which one fits the CPU budget).
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+TRACKER_ENV = 'DISRUPTOR_TRACKER'
+
+# Backend name -> factory paths under cv2, current API first. Order of the dict is the
+# fallback preference when a requested backend is missing.
+FACTORIES = {
+    'CSRT': ('TrackerCSRT_create', 'TrackerCSRT.create', 'legacy.TrackerCSRT_create', 'legacy.TrackerCSRT.create'),
+    'KCF': ('TrackerKCF_create', 'TrackerKCF.create', 'legacy.TrackerKCF_create', 'legacy.TrackerKCF.create'),
+    'MOSSE': ('TrackerMOSSE_create', 'legacy.TrackerMOSSE_create', 'legacy.TrackerMOSSE.create'),
+    'MEDIANFLOW': ('TrackerMedianFlow_create', 'legacy.TrackerMedianFlow_create', 'legacy.TrackerMedianFlow.create'),
+    'MIL': ('TrackerMIL_create', 'TrackerMIL.create', 'legacy.TrackerMIL_create', 'legacy.TrackerMIL.create'),
+    'BOOSTING': ('TrackerBoosting_create', 'legacy.TrackerBoosting_create', 'legacy.TrackerBoosting.create'),
+    'TLD': ('TrackerTLD_create', 'legacy.TrackerTLD_create', 'legacy.TrackerTLD.create'),
+}
+
+_available = None  # name -> factory path, filled by available_trackers()
+
+
+def _resolve(path):
+    obj = cv2
+    for part in path.split('.'):
+        obj = getattr(obj, part, None)
+        if obj is None:
+            return None
+    return obj
+
+
+def _probe_frame():
+    """Small textured frame with a bright square, enough for every backend to init"""
+    rng = np.random.default_rng(0)
+    frame = cv2.GaussianBlur(rng.integers(0, 255, (120, 160, 3), dtype=np.uint8), (0, 0), 2)
+    cv2.rectangle(frame, (60, 40), (90, 70), (255, 255, 255), -1)
+    return frame
+
+
+class Tracker:
+    """One tracker instance behind the current-API interface, whatever the backend"""
+
+    def __init__(self, name, factory_path):
+        self.name = name
+        self.factory_path = factory_path
+        self.impl = _resolve(factory_path)()
+
+    def init(self, frame, bbox):
+        """Start tracking bbox (x, y, w, h) on frame; returns True on success"""
+        bbox = tuple(int(v) for v in bbox)
+        result = self.impl.init(frame, bbox)
+        # Current API returns None and raises on failure; legacy returns a bool
+        return True if result is None else bool(result)
+
+    def update(self, frame):
+        """Returns (ok, (x, y, w, h)) with integer pixel coordinates"""
+        ok, bbox = self.impl.update(frame)
+        return ok, tuple(int(round(v)) for v in bbox)
+
+
+def _works(name, path):
+    try:
+        tracker = Tracker(name, path)
+        frame = _probe_frame()
+        if not tracker.init(frame, (55, 35, 40, 40)):
+            return False
+        tracker.update(frame)
+        return True
+    except Exception:
+        return False
+
+
+def available_trackers():
+    """{name: factory path} of the backends that construct, init and update here (probed once)"""
+    global _available
+    if _available is None:
+        _available = {}
+        for name, paths in FACTORIES.items():
+            for path in paths:
+                if _resolve(path) is not None and _works(name, path):
+                    _available[name] = path
+                    break
+    return dict(_available)
+
+
+def default_tracker(fallback='CSRT'):
+    """Backend name from DISRUPTOR_TRACKER, else the script's own default"""
+    return os.environ.get(TRACKER_ENV, fallback).upper()
+
+
+def create_tracker(name=None):
+    """New Tracker for name (default: default_tracker()); falls back if it is unavailable"""
+    name = (name or default_tracker()).upper()
+    available = available_trackers()
+    if not available:
+        raise RuntimeError("No OpenCV tracker backends available (is opencv-contrib installed?)")
+    if name not in available:
+        fallback = next(iter(available))
+        print(f"Warning: tracker {name} not available in OpenCV {cv2.__version__}, using {fallback}")
+        name = fallback
+    return Tracker(name, available[name])
+
+
+if __name__ == '__main__':
+    print(f"OpenCV {cv2.__version__}")
+    found = available_trackers()
+    for name in FACTORIES:
+        print(f"  {name:<11} {found.get(name, '-')}")